@@ -6,6 +6,10 @@ from contextlib import asynccontextmanager
 from . import middlewares, routers
 from api_app.models import init_beanie
 from api_app.api.core.redis import redis_client
+from api_app.api.core.inventory_engine import inventory_switch
+from api_app.api.core.redis_lock import lock_metrics
+from api_app.api.core.catalog_cache import catalog_cache
+from api_app.api.core.availability_feed import availability_feed
 from loguru import logger
 from .core.app_settings import AppSettings, get_app_settings
 from dotenv import load_dotenv
@@ -32,7 +36,22 @@ def create_app() -> FastAPI:
     @app.get("/health", tags=["health"])
     async def health():
         logger.debug("Health check")
-        return {"ok": True}
+        return {"ok": True, "inventory": inventory_switch.status()}
+
+    @app.get("/health/locks", tags=["health"])
+    async def lock_health():
+        """Per-key lock wait/hold time histograms of this process."""
+        return {"locks": lock_metrics.snapshot()}
+
+    @app.get("/health/catalog", tags=["health"])
+    async def catalog_health():
+        """Hit and miss counts of this process's ticket catalog cache."""
+        return {"catalog": catalog_cache.metrics()}
+
+    @app.get("/health/availability-feed", tags=["health"])
+    async def availability_feed_health():
+        """Watched events, clients and messages of this process's availability feed."""
+        return {"availability_feed": availability_feed.metrics()}
 
     return app
 
@@ -49,6 +68,9 @@ async def lifespan(app: FastAPI):
         logger.info("Redis connected successfully")
     except Exception as e:
         logger.warning(f"Redis connection failed: {e}. Continuing without Redis.")
+    inventory_switch.start()
+    catalog_cache.start()
+    availability_feed.start()
 
     await use_route_names_as_operation_ids(app)
     add_pagination(app)
@@ -60,6 +82,9 @@ async def lifespan(app: FastAPI):
     yield
 
     # Cleanup on shutdown
+    await inventory_switch.stop()
+    await catalog_cache.stop()
+    await availability_feed.stop()
     try:
         await redis_client.disconnect()
     except Exception as e:
@@ -0,0 +1,197 @@
+"""Live ticket availability of events, pushed to watching clients.
+
+Every change to an event's counters is published on the channel of its
+change log (see inventory_log) as "TICKET_TYPE_ID TOTAL", or "*" when the
+whole event was rewritten. Each API process keeps one Redis subscription
+and subscribes to an event's channel only while a client of this process
+watches it, so thousands of clients on one event cost one channel
+subscription per process.
+
+Changes are merged per event and handed to the clients every
+AVAILABILITY_FEED_INTERVAL_SECONDS, so a busy event sends a few updates
+per second whatever its booking rate. Totals are absolute, so a client
+that falls behind just gets the latest value of each ticket type.
+
+Monitoring:
+    # Watch the changes of an event
+    docker exec redis-stack redis-cli SUBSCRIBE "inventory:log:EVENT_ID"
+
+    # Processes subscribed to an event
+    docker exec redis-stack redis-cli PUBSUB NUMSUB "inventory:log:EVENT_ID"
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from loguru import logger
+
+from .config import settings
+from .redis import redis_client
+from .redis_lock import LOG_KEY_PREFIX, TicketInventory
+
+
+class Watcher:
+    """One client's view of an event: the changes it has not been sent yet."""
+
+    def __init__(self, event_id: str):
+        self.event_id = event_id
+        self.changes: dict[str, int] = {}
+        self.snapshot: Optional[dict[str, int]] = None
+        self.ready = asyncio.Event()
+
+    def push(self, changes: dict[str, int], snapshot: bool = False) -> None:
+        if snapshot:
+            self.snapshot = dict(changes)
+            self.changes.clear()
+        elif self.snapshot is not None:
+            self.snapshot.update(changes)
+        else:
+            self.changes.update(changes)
+        self.ready.set()
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """
+        Wait for the next update.
+
+        Returns:
+            {"snapshot": bool, "availability": {...}}, or None after
+            `timeout` seconds without a change
+        """
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+        self.ready.clear()
+        if self.snapshot is not None:
+            update = {"snapshot": True, "availability": self.snapshot}
+        else:
+            update = {"snapshot": False, "availability": self.changes}
+        self.snapshot = None
+        self.changes = {}
+        return update
+
+
+class AvailabilityFeed:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._watchers: dict[str, set[Watcher]] = {}
+        # Changes received since the last tick, and events to read in full
+        self._changes: dict[str, dict[str, int]] = {}
+        self._reload: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.messages = 0
+        self.updates = 0
+
+    def _get_channel(self, event_id: str) -> str:
+        return f"{LOG_KEY_PREFIX}{event_id}"
+
+    @asynccontextmanager
+    async def watch(self, event_id: str) -> AsyncIterator[Watcher]:
+        """
+        Follow an event's availability.
+
+        The first update is a snapshot, read on the next tick after the
+        subscription, so it is ordered with the published changes.
+        """
+        watcher = Watcher(event_id)
+        self._watchers.setdefault(event_id, set()).add(watcher)
+        self._reload.add(event_id)
+        try:
+            yield watcher
+        finally:
+            watchers = self._watchers.get(event_id)
+            if watchers is not None:
+                watchers.discard(watcher)
+                if not watchers:
+                    del self._watchers[event_id]
+
+    def metrics(self) -> dict:
+        return {
+            "events": len(self._watchers),
+            "clients": sum(len(w) for w in self._watchers.values()),
+            "messages": self.messages,
+            "updates": self.updates,
+        }
+
+    def _receive(self, channel: str, data: str) -> None:
+        self.messages += 1
+        event_id = channel[len(LOG_KEY_PREFIX):]
+        if data == "*":
+            self._reload.add(event_id)
+            self._changes.pop(event_id, None)
+            return
+        ticket_type_id, total = data.rsplit(" ", 1)
+        self._changes.setdefault(event_id, {})[ticket_type_id] = int(total)
+
+    async def _tick(self, inventory: TicketInventory) -> None:
+        """Hand the merged changes of every watched event to its watchers."""
+        changes, self._changes = self._changes, {}
+        reload, self._reload = self._reload, set()
+
+        for event_id in reload:
+            if event_id in self._watchers:
+                availability = await inventory.get_event_availability(event_id)
+                for watcher in list(self._watchers.get(event_id, ())):
+                    watcher.push(availability, snapshot=True)
+                self.updates += 1
+        for event_id, event_changes in changes.items():
+            if event_id in reload:
+                continue
+            for watcher in self._watchers.get(event_id, ()):
+                watcher.push(event_changes)
+            self.updates += 1
+
+    async def listen(self) -> None:
+        """Follow the channels of watched events, one tick at a time."""
+        while True:
+            try:
+                redis = await redis_client.get_client()
+                inventory = TicketInventory(redis)
+                async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    subscribed: set[str] = set()
+                    while True:
+                        wanted = set(self._watchers)
+                        added, removed = wanted - subscribed, subscribed - wanted
+                        if added:
+                            await pubsub.subscribe(*map(self._get_channel, added))
+                            # Changes before the subscription were missed
+                            self._reload |= added
+                        if removed:
+                            await pubsub.unsubscribe(*map(self._get_channel, removed))
+                        subscribed = wanted
+
+                        deadline = time.monotonic() + self.interval
+                        while (left := deadline - time.monotonic()) > 0:
+                            if not subscribed:
+                                await asyncio.sleep(left)
+                                break
+                            message = await pubsub.get_message(
+                                ignore_subscribe_messages=True, timeout=left
+                            )
+                            if message and message["type"] == "message":
+                                self._receive(message["channel"], message["data"])
+                        await self._tick(inventory)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Availability feed listener failed: {e}")
+                await asyncio.sleep(1)
+
+    def start(self) -> None:
+        if not self._task:
+            self._task = asyncio.create_task(self.listen())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+availability_feed = AvailabilityFeed(interval=settings.AVAILABILITY_FEED_INTERVAL_SECONDS)
@@ -0,0 +1,144 @@
+"""In-process cache of each event's ticket types (name, price, seat map).
+
+Bookings are priced from this cache instead of trusting the client or
+reading the event from MongoDB. Misses are loaded in bulk from the events
+collection (read-through); entries live for CATALOG_CACHE_TTL_SECONDS and
+at most CATALOG_CACHE_MAX_EVENTS events are kept.
+
+Event updates and deletes invalidate the entry in their own process and
+publish the event ID on INVALIDATE_CHANNEL, so every other API process
+drops it too. If Redis is unavailable the TTL bounds how stale a price
+can get.
+
+Monitoring:
+    # Watch invalidations
+    docker exec redis-stack redis-cli SUBSCRIBE "catalog:invalidate"
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from redis.asyncio import Redis
+from loguru import logger
+
+from .config import settings
+from .redis import redis_client
+
+INVALIDATE_CHANNEL = "catalog:invalidate"
+
+# event_ids -> (event_id -> (ticket_type_id -> {"name", "price", "seat_map"}))
+CatalogLoader = Callable[[list[str]], Awaitable[dict[str, dict[str, dict]]]]
+
+
+class TicketCatalogCache:
+    def __init__(self, max_events: int, ttl: float):
+        self.max_events = max_events
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[dict[str, dict], float]] = OrderedDict()
+        # Bumped on every invalidation; loads that overlap one are not cached
+        self._version = 0
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_many(
+        self, event_ids: list[str], loader: CatalogLoader
+    ) -> dict[str, dict[str, dict]]:
+        """
+        Ticket types of several events, loading all misses in one call.
+
+        Returns:
+            event_id -> (ticket_type_id -> {"name", "price", "seat_map"}); unknown
+            events are absent
+        """
+        now = time.monotonic()
+        catalog = {}
+        missing = []
+        for event_id in dict.fromkeys(event_ids):
+            entry = self._entries.get(event_id)
+            if entry and entry[1] > now:
+                self._entries.move_to_end(event_id)
+                catalog[event_id] = entry[0]
+                self.hits += 1
+            else:
+                missing.append(event_id)
+                self.misses += 1
+
+        if missing:
+            version = self._version
+            loaded = await loader(missing)
+            if version == self._version:
+                expires_at = time.monotonic() + self.ttl
+                for event_id, ticket_types in loaded.items():
+                    self._entries[event_id] = (ticket_types, expires_at)
+                    self._entries.move_to_end(event_id)
+                while len(self._entries) > self.max_events:
+                    self._entries.popitem(last=False)
+            catalog.update(loaded)
+
+        return catalog
+
+    def discard(self, event_id: str) -> None:
+        """Drop an event from this process only."""
+        self._version += 1
+        self.invalidations += 1
+        self._entries.pop(event_id, None)
+
+    async def invalidate(self, event_id: str, redis: Optional[Redis] = None) -> None:
+        """Drop an event here and in every other API process."""
+        self.discard(event_id)
+        if redis:
+            try:
+                await redis.publish(INVALIDATE_CHANNEL, event_id)
+            except Exception as e:
+                logger.error(f"Failed to publish catalog invalidation: {e}")
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "events": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+        }
+
+    async def listen(self) -> None:
+        """Apply invalidations published by other processes."""
+        while True:
+            try:
+                redis = await redis_client.get_client()
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATE_CHANNEL)
+                    # Anything cached before the subscription may be stale
+                    self._entries.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.discard(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Catalog invalidation listener failed: {e}")
+                await asyncio.sleep(1)
+
+    def start(self) -> None:
+        if not self._task:
+            self._task = asyncio.create_task(self.listen())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+catalog_cache = TicketCatalogCache(
+    max_events=settings.CATALOG_CACHE_MAX_EVENTS,
+    ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+)
@@ -74,6 +74,78 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_PASSWORD: str = ""
     REDIS_URL: str = ""
+    REDIS_MAX_CONNECTIONS: int = 10
+    # How long a command waits for a free pool connection
+    REDIS_POOL_TIMEOUT_SECONDS: float = 5.0
+    # Lock waiters per process parked on a blocking wake-up read, each
+    # holding a pool connection; the rest sleep out their backoff. Keep it
+    # well below REDIS_MAX_CONNECTIONS
+    LOCK_WAKE_WAITERS_MAX: int = 3
+
+    # Ticket holds
+    HOLD_TTL_SECONDS: int = 600
+    HOLD_SWEEP_INTERVAL_SECONDS: int = 15
+    HOLD_SWEEP_BATCH_SIZE: int = 500
+
+    # Credit ledger
+    CREDIT_SNAPSHOT_INTERVAL_MINUTES: int = 60
+    # How far each snapshot run looks back before the previous one; must
+    # exceed the longest booking transaction
+    CREDIT_SNAPSHOT_OVERLAP_SECONDS: int = 300
+
+    # Outbox relay
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_LEASE_SECONDS: int = 30
+    OUTBOX_MAX_ATTEMPTS: int = 10
+
+    # Inventory engine fallback (MongoDB-only booking while Redis is down)
+    INVENTORY_FALLBACK_ENABLED: bool = True
+    INVENTORY_HEALTH_INTERVAL_SECONDS: float = 2.0
+    INVENTORY_PING_TIMEOUT_SECONDS: float = 0.5
+    INVENTORY_FAILURE_THRESHOLD: int = 3
+    INVENTORY_RECOVERY_THRESHOLD: int = 5
+
+    # Inventory reconciliation
+    RECONCILE_INTERVAL_MINUTES: int = 15
+    RECONCILE_BATCH_SIZE: int = 200
+    RECONCILE_TIME_BUDGET_SECONDS: float = 30.0
+    RECONCILE_REPAIR: bool = False
+    # Most events one POST /tickets/reconcile call may check
+    RECONCILE_MAX_EVENTS: int = 5000
+
+    # Inventory change log (Redis streams copied to MongoDB)
+    INVENTORY_LOG_FLUSH_INTERVAL_SECONDS: int = 5
+    INVENTORY_LOG_BATCH_SIZE: int = 1000
+
+    # Live availability feed (at most one update per event and interval)
+    AVAILABILITY_FEED_INTERVAL_SECONDS: float = 0.25
+    AVAILABILITY_FEED_HEARTBEAT_SECONDS: float = 15.0
+
+    # Idempotency keys
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_PENDING_TTL_SECONDS: int = 30
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_POLL_INTERVAL_SECONDS: float = 0.05
+
+    # Waiting room (events with waiting_room_rate > 0)
+    WAITING_ROOM_PASS_TTL_SECONDS: int = 300
+    WAITING_ROOM_QUEUE_TTL_SECONDS: int = 86400
+
+    # Ticket catalog cache (prices used by bookings)
+    CATALOG_CACHE_TTL_SECONDS: float = 60.0
+    CATALOG_CACHE_MAX_EVENTS: int = 10000
+
+    # Waitlists of sold-out ticket types
+    WAITLIST_OFFER_TTL_SECONDS: int = 300
+    WAITLIST_ALLOCATE_INTERVAL_SECONDS: int = 30
+
+    # Message publisher: pubsub, memory or file
+    PUBLISHER_BACKEND: str = "pubsub"
+    PUBLISHER_FILE_PATH: str = "logs/published_messages.jsonl"
+    PUBLISHER_QUEUE_SIZE: int = 1000
+    PUBLISHER_BATCH_SIZE: int = 100
+    PUBLISHER_FLUSH_INTERVAL_MS: int = 50
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -0,0 +1,177 @@
+"""Idempotency keys for retried write requests.
+
+A request carrying an `Idempotency-Key` header claims the key with a
+pending marker (SET NX). When the request succeeds, the response replaces
+the marker and is kept for IDEMPOTENCY_TTL_SECONDS. A retry with the same
+key gets the stored response back without running the handler again.
+A duplicate that arrives while the first request is still running waits
+for it to finish.
+
+Failed or cancelled requests drop their marker, so the client can retry
+them. A request whose response cannot be stored fails instead of
+answering, and its marker expires. While Redis is down keys are not
+checked.
+
+Monitoring:
+    # Show a stored response or pending marker
+    docker exec redis-stack redis-cli GET "idempotency:USER_ID:KEY"
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from loguru import logger
+
+from .config import settings
+from .redis_scripts import scripts
+
+# How often a completed response is written before the request fails.
+STORE_ATTEMPTS = 3
+STORE_RETRY_DELAY = 0.1
+
+# Delete the key only if it still holds our pending marker
+DISCARD_SCRIPT = scripts.register(
+    "idempotency.discard",
+    """
+local value = redis.call("get", KEYS[1])
+if value and cjson.decode(value)["token"] == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+""",
+)
+
+
+class IdempotencyStore:
+    def __init__(self, redis: Optional[Redis]):
+        self.redis = redis
+
+    def _get_key(self, scope: str, key: str) -> str:
+        return f"idempotency:{scope}:{key}"
+
+    @staticmethod
+    def fingerprint(payload: Any) -> str:
+        """Hash of the request body, to catch a key reused for another request."""
+        body = json.dumps(jsonable_encoder(payload), sort_keys=True)
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    async def run(
+        self,
+        scope: str,
+        key: Optional[str],
+        fingerprint: str,
+        handler: Callable[[], Awaitable[dict]],
+    ) -> tuple[dict, bool]:
+        """
+        Run `handler` once per (scope, key).
+
+        Returns:
+            The response, and True if it was replayed from an earlier request
+        """
+        if not key or self.redis is None:
+            # Without Redis (inventory fallback) requests run unprotected
+            return await handler(), False
+
+        redis_key = self._get_key(scope, key)
+        token = uuid.uuid4().hex
+        stored = await self._claim(redis_key, token, fingerprint)
+        if stored is not None:
+            return stored, True
+
+        try:
+            response = jsonable_encoder(await handler())
+        except BaseException:
+            # Cancelled requests too, or the key stays pending until it expires
+            await DISCARD_SCRIPT(self.redis, [redis_key], [token])
+            raise
+
+        await self._store(redis_key, fingerprint, response)
+        return response, False
+
+    async def _store(self, redis_key: str, fingerprint: str, response: dict) -> None:
+        """
+        Replace the pending marker with the response.
+
+        The handler's work is already done, so a failed write is retried. If
+        it keeps failing the marker is left to expire and the request fails:
+        answering with success would let a retry run the handler again.
+        """
+        value = json.dumps(
+            {
+                "state": "completed",
+                "fingerprint": fingerprint,
+                "response": response,
+            }
+        )
+        for attempt in range(STORE_ATTEMPTS):
+            try:
+                await self.redis.set(
+                    redis_key, value, ex=settings.IDEMPOTENCY_TTL_SECONDS
+                )
+                return
+            except RedisError as e:
+                logger.warning(
+                    f"Storing idempotent response failed: {redis_key}, "
+                    f"attempt={attempt + 1}, error={e}"
+                )
+                if attempt + 1 < STORE_ATTEMPTS:
+                    await asyncio.sleep(STORE_RETRY_DELAY * (attempt + 1))
+
+        logger.error(f"Idempotent response not stored: {redis_key}")
+        raise HTTPException(
+            500,
+            "The request was carried out but its Idempotency-Key could not be "
+            "recorded; check the result before retrying",
+        )
+
+    async def _claim(
+        self, redis_key: str, token: str, fingerprint: str
+    ) -> Optional[dict]:
+        """
+        Take the key for this request, or wait for the request holding it.
+
+        Returns:
+            None if this request should run, otherwise the stored response
+        """
+        pending = json.dumps(
+            {"state": "pending", "token": token, "fingerprint": fingerprint}
+        )
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+
+        while True:
+            claimed = await self.redis.set(
+                redis_key,
+                pending,
+                ex=settings.IDEMPOTENCY_PENDING_TTL_SECONDS,
+                nx=True,
+            )
+            if claimed:
+                return None
+
+            value = await self.redis.get(redis_key)
+            if value is None:
+                # The first request failed and dropped its marker
+                continue
+
+            record = json.loads(value)
+            if record["fingerprint"] != fingerprint:
+                raise HTTPException(
+                    422, "Idempotency-Key was already used for a different request"
+                )
+            if record["state"] == "completed":
+                logger.info(f"Idempotent replay: {redis_key}")
+                return record["response"]
+
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    409, "A request with this Idempotency-Key is still in progress"
+                )
+            await asyncio.sleep(settings.IDEMPOTENCY_POLL_INTERVAL_SECONDS)
@@ -0,0 +1,146 @@
+"""Health-driven switch between the Redis and MongoDB inventory engines.
+
+A background monitor pings Redis. After INVENTORY_FAILURE_THRESHOLD failed
+pings, bookings move to `MongoInventory`. A failed connection in a request
+moves them at once. After INVENTORY_RECOVERY_THRESHOLD good pings in a row,
+bookings go back to Redis.
+
+While MongoDB is the engine, the Redis counters of the events sold in the
+meantime go stale. Those events are flagged on their MongoDB document by
+whichever process sold them (see mongo_inventory). On recovery every
+flagged event's hash is dropped, and the next reservation hydrates it
+again from MongoDB.
+"""
+
+import asyncio
+from typing import Optional
+
+from pymongo import UpdateOne
+from redis.asyncio import Redis
+from loguru import logger
+
+from ... import models
+from .config import settings
+from .redis import redis_client
+
+
+class InventoryEngineSwitch:
+    def __init__(self):
+        self.engine = "redis"
+        self._failures = 0
+        self._successes = 0
+        self._resynced = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def using_redis(self) -> bool:
+        return self.engine == "redis" or not settings.INVENTORY_FALLBACK_ENABLED
+
+    def status(self) -> dict:
+        return {
+            "engine": self.engine,
+            "consecutive_failures": self._failures,
+            "consecutive_successes": self._successes,
+            "events_resynced": self._resynced,
+        }
+
+    def mark_unhealthy(self, reason: str) -> None:
+        """Switch to MongoDB right away, e.g. when a request cannot connect."""
+        self._successes = 0
+        if self.engine != "mongo":
+            logger.warning(f"Inventory engine switched to mongo: {reason}")
+            self.engine = "mongo"
+
+    async def check(self) -> bool:
+        """Ping Redis once and update the engine."""
+        try:
+            redis = await redis_client.get_client()
+            await asyncio.wait_for(redis.ping(), settings.INVENTORY_PING_TIMEOUT_SECONDS)
+        except Exception as e:
+            self._successes = 0
+            self._failures += 1
+            if self._failures >= settings.INVENTORY_FAILURE_THRESHOLD:
+                self.mark_unhealthy(f"{self._failures} failed pings ({e})")
+            return False
+
+        self._failures = 0
+        self._successes += 1
+        if (
+            self.engine == "mongo"
+            and self._successes >= settings.INVENTORY_RECOVERY_THRESHOLD
+        ):
+            try:
+                await self._recover(redis)
+            except Exception as e:
+                logger.error(f"Inventory engine recovery failed: {e}")
+        return True
+
+    async def _recover(self, redis: Redis) -> None:
+        from .mongo_inventory import STALE_FIELD
+        from .redis_lock import TicketInventory
+
+        # Events sold by any process while it bypassed Redis
+        collection = models.Event.get_motor_collection()
+        stale = await collection.find(
+            {STALE_FIELD: {"$exists": True}}, projection={STALE_FIELD: 1}
+        ).to_list(None)
+
+        inventory = TicketInventory(redis)
+        for event in stale:
+            await inventory.delete_inventory(str(event["_id"]), [])
+        if stale:
+            # Events sold again since they were read stay flagged
+            await collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": event["_id"], STALE_FIELD: event[STALE_FIELD]},
+                        {"$unset": {STALE_FIELD: ""}},
+                    )
+                    for event in stale
+                ],
+                ordered=False,
+            )
+
+        self._resynced = len(stale)
+        self.engine = "redis"
+        logger.info(
+            f"Inventory engine switched back to redis, "
+            f"{len(stale)} events will be hydrated from DB"
+        )
+
+    async def monitor(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(settings.INVENTORY_HEALTH_INTERVAL_SECONDS)
+
+    def start(self) -> None:
+        if settings.INVENTORY_FALLBACK_ENABLED and not self._task:
+            self._task = asyncio.create_task(self.monitor())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+inventory_switch = InventoryEngineSwitch()
+
+
+async def get_inventory_redis() -> Optional[Redis]:
+    """
+    Dependency for booking routes: the Redis client, or None when bookings
+    should use the MongoDB engine.
+    """
+    if not inventory_switch.using_redis:
+        return None
+    try:
+        return await redis_client.get_client()
+    except Exception as e:
+        if not settings.INVENTORY_FALLBACK_ENABLED:
+            raise
+        inventory_switch.mark_unhealthy(f"connection failed ({e})")
+        return None
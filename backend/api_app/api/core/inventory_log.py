@@ -0,0 +1,171 @@
+"""Per-event change log of the Redis ticket counters.
+
+Every script or transaction that changes an event's counters appends one
+entry per ticket type to the event's stream, in the same atomic step, so
+the log always matches the counters it describes. Entries are compact:
+
+    op  reserve, hold, seat, a release reason (cancelled, hold_expired, ...),
+        an adjust reason (reconcile, ...), set, reset or delete
+    t   ticket type ID ("*" for reset and delete)
+    d   signed change applied; absent for set, reset and delete
+    r   ticket type total after the change
+    by  user ID, empty for system writes
+
+Each entry's new total is also published on the channel named like the
+stream, for the live availability feed (see availability_feed).
+
+The stream ID orders entries. A scheduled job copies entries to MongoDB
+(`InventoryLogService.flush`) and trims what it copied, so a stream only
+holds the last few seconds of changes. `replay` rebuilds the counters from
+the entries and reports any entry whose total does not follow from the
+previous one, i.e. a change that bypassed the log.
+
+Keys:
+    inventory:log:EVENT_ID  stream of counter changes
+    inventory:logs          set of event IDs with a stream to copy
+
+Monitoring:
+    # Events with changes waiting to be copied
+    docker exec redis-stack redis-cli SMEMBERS "inventory:logs"
+
+    # Changes of an event not yet copied to MongoDB
+    docker exec redis-stack redis-cli XRANGE "inventory:log:EVENT_ID" - +
+"""
+
+from typing import Iterable, Optional
+
+from redis.asyncio import Redis
+
+from .redis_lock import LOG_INDEX_KEY, LOG_KEY_PREFIX, TicketInventory
+
+
+def parse_entry(event_id: str, entry_id: str, fields: dict) -> dict:
+    """Turn one stream entry into a log record."""
+    ms, seq = entry_id.split("-")
+    return {
+        "event_id": event_id,
+        "entry_id": entry_id,
+        "entry_ms": int(ms),
+        "entry_seq": int(seq),
+        "op": fields["op"],
+        "ticket_type_id": fields["t"],
+        "delta": int(fields["d"]) if "d" in fields else None,
+        "total": int(fields["r"]),
+        "by": fields.get("by", ""),
+    }
+
+
+def replay(entries: Iterable[dict]) -> tuple[dict[str, int], list[dict]]:
+    """
+    Rebuild an event's counters from its log records, oldest first.
+
+    A ticket type starts from its first set, or from the first change seen
+    when the log starts after it was created. Each change is checked
+    against the total it recorded; on a mismatch the recorded total wins,
+    so one lost update is reported once rather than on every later entry.
+
+    Returns:
+        ticket_type_id -> remaining tickets, and the mismatching records
+        with the total the log expected
+    """
+    remaining: dict[str, int] = {}
+    mismatches = []
+    for entry in entries:
+        ticket_type_id = entry["ticket_type_id"]
+        if entry["op"] in ("reset", "delete"):
+            remaining.clear()
+            continue
+        if entry["delta"] is None or ticket_type_id not in remaining:
+            remaining[ticket_type_id] = entry["total"]
+            continue
+
+        expected = remaining[ticket_type_id] + entry["delta"]
+        if expected != entry["total"]:
+            mismatches.append({**entry, "expected": expected})
+        remaining[ticket_type_id] = entry["total"]
+    return remaining, mismatches
+
+
+def next_id(entry_id: str) -> str:
+    """The smallest stream ID after `entry_id`."""
+    ms, seq = entry_id.split("-")
+    return f"{ms}-{int(seq) + 1}"
+
+
+class InventoryLog:
+    def __init__(self, redis: Redis, inventory: Optional[TicketInventory] = None):
+        self.redis = redis
+        self.inventory = inventory or TicketInventory(redis)
+
+    def _get_key(self, event_id: str) -> str:
+        return self.inventory._get_log_key(event_id)
+
+    async def event_ids(self) -> list[str]:
+        return sorted(await self.redis.smembers(LOG_INDEX_KEY))
+
+    async def discover(self, batch_size: int = 500) -> int:
+        """
+        Index streams written by scripts for events that were never
+        initialized or synced since the log was added.
+
+        Returns:
+            Number of streams found
+        """
+        found = 0
+        batch = []
+        async for key in self.redis.scan_iter(
+            match=f"{LOG_KEY_PREFIX}*", count=batch_size
+        ):
+            batch.append(key[len(LOG_KEY_PREFIX):])
+            if len(batch) >= batch_size:
+                found += await self.redis.sadd(LOG_INDEX_KEY, *batch)
+                batch = []
+        if batch:
+            found += await self.redis.sadd(LOG_INDEX_KEY, *batch)
+        return found
+
+    async def read(self, event_ids: list[str], count: int) -> dict[str, list[dict]]:
+        """
+        Read the oldest entries of several events in one call.
+
+        Returns:
+            event_id -> up to `count` log records; events without entries
+            are absent
+        """
+        if not event_ids:
+            return {}
+        reply = await self.redis.xread(
+            {self._get_key(event_id): "0" for event_id in event_ids}, count=count
+        )
+        records = {}
+        for key, entries in reply:
+            event_id = key[len(LOG_KEY_PREFIX):]
+            records[event_id] = [
+                parse_entry(event_id, entry_id, fields) for entry_id, fields in entries
+            ]
+        return records
+
+    async def entries(self, event_id: str) -> list[dict]:
+        """Every entry of an event still in Redis."""
+        return [
+            parse_entry(event_id, entry_id, fields)
+            for entry_id, fields in await self.redis.xrange(self._get_key(event_id))
+        ]
+
+    async def trim(self, copied: dict[str, str]) -> None:
+        """Drop entries up to the last copied ID of each event."""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for event_id, entry_id in copied.items():
+                pipe.xtrim(
+                    self._get_key(event_id), minid=next_id(entry_id), approximate=False
+                )
+            await pipe.execute()
+
+    async def forget(self, event_ids: list[str]) -> None:
+        """Remove the streams of deleted events once everything was copied."""
+        if not event_ids:
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(*(self._get_key(event_id) for event_id in event_ids))
+            pipe.srem(LOG_INDEX_KEY, *event_ids)
+            await pipe.execute()
@@ -0,0 +1,327 @@
+"""MongoDB-only ticket inventory, used while Redis is unavailable.
+
+Stock is taken straight from `Event.ticket_types.remaining` with one
+conditional update per ticket type:
+
+    {"_id": event_id, "ticket_types": {"$elemMatch": {"ticket_id": t, "remaining": {"$gte": q}}}}
+    {"$inc": {"ticket_types.$.remaining": -q, "inventory_fallback_writes": 1}}
+
+The update only matches while enough stock is left, so it cannot oversell.
+It is slower than the Redis scripts because every reservation writes the
+event document, but bookings keep working.
+
+The booking window is checked against the event document like the reserve
+script does, and cancelled events count as closed. Waiting rooms and purchase caps need Redis state, so events
+using them stop selling (status "paused") until Redis is back rather than
+sell unguarded.
+
+`inventory_fallback_writes` flags the events whose Redis counters went
+stale, for every API process; their counters are dropped on recovery (see
+inventory_engine).
+"""
+
+import time
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from loguru import logger
+
+from ... import models
+from ...utils.schema import PydanticObjectId
+from .redis_lock import (
+    RESERVE_CLOSED,
+    RESERVE_INSUFFICIENT,
+    RESERVE_NOT_INITIALIZED,
+    RESERVE_NOT_OPEN,
+    RESERVE_OK,
+    RESERVE_PAUSED,
+    RESERVE_UNKNOWN_TYPE,
+    epoch_ms,
+    reservation_result,
+)
+
+# Counter of fallback writes on an event document; set means Redis is stale.
+STALE_FIELD = "inventory_fallback_writes"
+
+
+class MongoInventory:
+    """
+    Same interface as `TicketInventory`, backed by the events collection.
+
+    Reservations already change `remaining` in MongoDB, so callers must not
+    decrement it again when persisting a booking (`updates_database`).
+    """
+
+    updates_database = True
+
+    def __init__(self):
+        self.collection = models.Event.get_motor_collection()
+
+    async def get_available_tickets(
+        self, event_id: str, ticket_type_id: str
+    ) -> Optional[int]:
+        return (await self.get_event_availability(event_id)).get(ticket_type_id)
+
+    async def get_event_availability(self, event_id: str) -> dict[str, int]:
+        if not ObjectId.is_valid(event_id):
+            return {}
+
+        event = await self.collection.find_one(
+            {"_id": PydanticObjectId(event_id)},
+            projection={"ticket_types.ticket_id": 1, "ticket_types.remaining": 1},
+        )
+        if not event:
+            return {}
+        return {
+            ticket_type["ticket_id"]: ticket_type["remaining"]
+            for ticket_type in event.get("ticket_types", [])
+        }
+
+    async def reserve_tickets(
+        self, event_id: str, ticket_type_id: str, quantity: int, user_id: str
+    ) -> dict:
+        result = await self.reserve_many(
+            [(event_id, ticket_type_id, quantity)], user_id
+        )
+        if not result["success"]:
+            result.pop("failed_item", None)
+            return result
+
+        return {
+            "success": True,
+            "status": "reserved",
+            "reserved": quantity,
+            "remaining": result["items"][0]["remaining"],
+            "event_id": event_id,
+            "ticket_type_id": ticket_type_id,
+            "user_id": user_id,
+        }
+
+    async def reserve_many(
+        self, items: list[tuple[str, str, int]], user_id: str
+    ) -> dict:
+        """
+        Reserve several ticket types all or nothing.
+
+        Items are taken one conditional update at a time; if one fails, the
+        ones already taken are given back.
+        """
+        rejected = await self._check_sales(items)
+        if rejected:
+            return reservation_result(items, user_id, rejected[0], [rejected[1], 0])
+
+        taken = []
+        remaining = []
+        for index, (event_id, ticket_type_id, quantity) in enumerate(items, start=1):
+            count = await self._take(event_id, ticket_type_id, quantity)
+            if count is None:
+                if taken:
+                    await self.release_many(taken, "reservation_failed")
+                available = await self.get_available_tickets(event_id, ticket_type_id)
+                if available is None:
+                    return reservation_result(
+                        items, user_id, RESERVE_NOT_INITIALIZED, [index, 0]
+                    )
+                return reservation_result(
+                    items, user_id, RESERVE_INSUFFICIENT, [index, available]
+                )
+
+            taken.append((event_id, ticket_type_id, quantity))
+            remaining.append(count)
+
+        return reservation_result(items, user_id, RESERVE_OK, remaining)
+
+    async def release_tickets(
+        self,
+        event_id: str,
+        ticket_type_id: str,
+        quantity: int,
+        reason: str = "cancelled",
+        user_id: Optional[str] = None,
+    ) -> dict:
+        result = await self.release_many([(event_id, ticket_type_id, quantity)], reason)
+        item = result["items"][0]
+
+        if item["status"] == "not_initialized":
+            return {
+                "success": False,
+                "status": "not_initialized",
+                "released": 0,
+                "reason": reason,
+            }
+
+        return {
+            "success": True,
+            "status": "released",
+            "released": quantity,
+            "available": item["available"],
+            "reason": reason,
+        }
+
+    async def release_many(
+        self,
+        items: list[tuple[str, str, int]],
+        reason: str = "cancelled",
+        user_id: Optional[str] = None,
+    ) -> dict:
+        released = []
+        for event_id, ticket_type_id, quantity in items:
+            count = await self._give(event_id, ticket_type_id, quantity)
+            if count is None:
+                logger.error(
+                    f"Release skipped, ticket type not found: event={event_id}, "
+                    f"ticket={ticket_type_id}, quantity={quantity}, reason={reason}"
+                )
+                released.append(
+                    {
+                        "event_id": event_id,
+                        "ticket_type_id": ticket_type_id,
+                        "status": "not_initialized",
+                        "released": 0,
+                    }
+                )
+                continue
+
+            logger.info(
+                f"Tickets released (mongo): event={event_id}, ticket={ticket_type_id}, "
+                f"quantity={quantity}, new_total={count}, reason={reason}"
+            )
+            released.append(
+                {
+                    "event_id": event_id,
+                    "ticket_type_id": ticket_type_id,
+                    "status": "released",
+                    "released": quantity,
+                    "available": count,
+                }
+            )
+
+        return {
+            "success": all(i["status"] == "released" for i in released),
+            "items": released,
+            "reason": reason,
+        }
+
+    async def create_hold(self, items, user_id, ttl, details=None) -> dict:
+        return self._unavailable()
+
+    async def confirm_hold(self, hold_id: str, user_id: str) -> dict:
+        return self._unavailable()
+
+    async def release_hold(self, hold_id: str, user_id: str) -> dict:
+        return self._unavailable()
+
+    async def release_event_holds(
+        self, event_id: str, reason: str, batch_size: int = 500
+    ) -> int:
+        # Holds live in Redis; once it is back they can no longer be
+        # confirmed and expire as usual
+        return 0
+
+    async def _check_sales(
+        self, items: list[tuple[str, str, int]]
+    ) -> Optional[tuple[int, int]]:
+        """
+        Check every item's event is open for sale on this engine.
+
+        Returns:
+            (result code, 1-based item index) of the first refused item
+        """
+        ids = [PydanticObjectId(e) for e, _, _ in items if ObjectId.is_valid(e)]
+        events = {
+            str(event["_id"]): event
+            async for event in self.collection.find(
+                {"_id": {"$in": ids}},
+                projection={
+                    "booking_start_date": 1,
+                    "booking_end_date": 1,
+                    "cancelled": 1,
+                    "waiting_room_rate": 1,
+                    "max_tickets_per_user": 1,
+                    "ticket_types.ticket_id": 1,
+                    "ticket_types.max_per_user": 1,
+                },
+            )
+        }
+
+        now = int(time.time() * 1000)
+        for index, (event_id, ticket_type_id, _) in enumerate(items, start=1):
+            event = events.get(event_id)
+            if not event:
+                return RESERVE_NOT_INITIALIZED, index
+            if now < epoch_ms(event["booking_start_date"]):
+                return RESERVE_NOT_OPEN, index
+            if now > epoch_ms(event["booking_end_date"]) or event.get("cancelled"):
+                return RESERVE_CLOSED, index
+
+            ticket_type = next(
+                (
+                    ticket_type
+                    for ticket_type in event.get("ticket_types", [])
+                    if ticket_type["ticket_id"] == ticket_type_id
+                ),
+                None,
+            )
+            if not ticket_type:
+                return RESERVE_UNKNOWN_TYPE, index
+            if (
+                event.get("waiting_room_rate")
+                or event.get("max_tickets_per_user")
+                or ticket_type.get("max_per_user")
+            ):
+                return RESERVE_PAUSED, index
+        return None
+
+    def _unavailable(self) -> dict:
+        return {
+            "success": False,
+            "status": "unavailable",
+            "error": "Ticket holds are unavailable right now",
+        }
+
+    async def _take(
+        self, event_id: str, ticket_type_id: str, quantity: int
+    ) -> Optional[int]:
+        """Take stock if enough is left; returns the new count or None."""
+        if not ObjectId.is_valid(event_id):
+            return None
+
+        event = await self.collection.find_one_and_update(
+            {
+                "_id": PydanticObjectId(event_id),
+                "ticket_types": {
+                    "$elemMatch": {
+                        "ticket_id": ticket_type_id,
+                        "remaining": {"$gte": quantity},
+                    }
+                },
+            },
+            {"$inc": {"ticket_types.$.remaining": -quantity, STALE_FIELD: 1}},
+            projection={"ticket_types.ticket_id": 1, "ticket_types.remaining": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        return self._remaining_of(event, ticket_type_id)
+
+    async def _give(
+        self, event_id: str, ticket_type_id: str, quantity: int
+    ) -> Optional[int]:
+        if not ObjectId.is_valid(event_id):
+            return None
+
+        event = await self.collection.find_one_and_update(
+            {"_id": PydanticObjectId(event_id), "ticket_types.ticket_id": ticket_type_id},
+            {"$inc": {"ticket_types.$.remaining": quantity, STALE_FIELD: 1}},
+            projection={"ticket_types.ticket_id": 1, "ticket_types.remaining": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        return self._remaining_of(event, ticket_type_id)
+
+    @staticmethod
+    def _remaining_of(event: Optional[dict], ticket_type_id: str) -> Optional[int]:
+        if not event:
+            return None
+        for ticket_type in event.get("ticket_types", []):
+            if ticket_type["ticket_id"] == ticket_type_id:
+                return ticket_type["remaining"]
+        return None
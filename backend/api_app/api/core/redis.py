@@ -3,6 +3,7 @@ from redis.asyncio import Redis
 from typing import Optional
 from loguru import logger
 from .config import settings
+from .redis_scripts import scripts
 
 
 class RedisClient:
@@ -15,15 +16,21 @@ class RedisClient:
         """Establish connection to Redis."""
         if self._redis is None:
             try:
-                self._redis = await aioredis.from_url(
+                # A blocking pool makes commands wait for a free connection
+                # under load instead of failing with MaxConnectionsError
+                pool = aioredis.BlockingConnectionPool.from_url(
                     settings.REDIS_URL,
                     encoding="utf-8",
                     decode_responses=True,
-                    max_connections=10,
+                    max_connections=settings.REDIS_MAX_CONNECTIONS,
+                    timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
                 )
+                self._redis = aioredis.Redis.from_pool(pool)
                 # Test connection
                 await self._redis.ping()
                 logger.info(f"Connected to Redis at {settings.REDIS_URL}")
+                # Preload Lua scripts so calls can go by SHA
+                await scripts.load_all(self._redis)
             except Exception as e:
                 logger.error(f"Failed to connect to Redis: {e}")
                 raise
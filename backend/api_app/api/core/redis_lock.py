@@ -1,4 +1,4 @@
-"""Redis distributed lock for handling race conditions.
+"""Redis distributed lock and atomic ticket inventory.
 
 Monitoring Redis Operations:
     # Monitor all Redis operations in real-time
@@ -10,25 +10,162 @@ Monitoring Redis Operations:
     # List all inventory keys
     docker exec redis-stack redis-cli KEYS "inventory:*"
 
-    # Get specific inventory value
-    docker exec redis-stack redis-cli GET "inventory:event:EVENT_ID:ticket:TICKET_ID"
+    # Get all inventory of an event (one hash field per ticket type)
+    docker exec redis-stack redis-cli HGETALL "inventory:event:EVENT_ID"
 
-    # List all lock keys
+    # List all lock keys (with their fencing counters and wake-up lists)
     docker exec redis-stack redis-cli KEYS "lock:*"
+
+    # List ticket holds with their expiry (epoch ms)
+    docker exec redis-stack redis-cli ZRANGE "holds:expiry" 0 -1 WITHSCORES
+
+    # Taken seats of a reserved-seating ticket type
+    docker exec redis-stack redis-cli BITCOUNT "inventory:seats:EVENT_ID:TICKET_TYPE_ID"
+
+    # Tickets a user has bought of an event, in total and per ticket type
+    docker exec redis-stack redis-cli HGETALL "inventory:usage:EVENT_ID:USER_ID"
+
+    # Counter changes of an event not yet copied to MongoDB (see inventory_log)
+    docker exec redis-stack redis-cli XRANGE "inventory:log:EVENT_ID" - +
 """
 
 import asyncio
+import json
+import random
+import time
 import uuid
-from typing import Optional
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
 from redis.asyncio import Redis
+from redis.exceptions import WatchError
 from loguru import logger
 
+from .config import settings
+from .redis_scripts import scripts
+from .seat_map import SeatLayout
+
+
+class LockError(Exception):
+    """A lock could not be acquired, or was lost before a fenced write."""
+
+
+# Take the lock and issue the next fencing token in one step.
+# KEYS[1] = lock key, KEYS[2] = fencing counter
+# ARGV[1] = owner ID, ARGV[2] = timeout (ms)
+# Returns the token, or minus the lock's remaining TTL (ms) when it is held.
+ACQUIRE_SCRIPT = scripts.register(
+    "lock.acquire",
+    """
+if redis.call("set", KEYS[1], ARGV[1], "NX", "PX", ARGV[2]) then
+    return redis.call("incr", KEYS[2])
+end
+return -math.max(redis.call("pttl", KEYS[1]), 1)
+""",
+)
+
+# Delete the lock if we still own it and wake one waiter.
+# KEYS[1] = lock key, KEYS[2] = wake-up list
+# ARGV[1] = owner ID, ARGV[2] = wake-up list TTL (ms)
+RELEASE_LOCK_SCRIPT = scripts.register(
+    "lock.release",
+    """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    redis.call("del", KEYS[1])
+    redis.call("del", KEYS[2])
+    redis.call("lpush", KEYS[2], 1)
+    redis.call("pexpire", KEYS[2], ARGV[2])
+    return 1
+end
+return 0
+""",
+)
+
+# Upper bounds (ms) of the wait and hold time histogram buckets.
+LOCK_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Keys tracked per process; the oldest key is dropped beyond this.
+LOCK_METRICS_MAX_KEYS = 1000
+
+
+class LockMetrics:
+    """Per-key histograms of how long locks were waited for and held."""
+
+    def __init__(self):
+        self._keys: dict[str, dict] = {}
+
+    def _entry(self, key: str) -> dict:
+        entry = self._keys.get(key)
+        if entry is None:
+            if len(self._keys) >= LOCK_METRICS_MAX_KEYS:
+                self._keys.pop(next(iter(self._keys)))
+            entry = {
+                "acquired": 0,
+                "failed": 0,
+                "contended": 0,
+                "wait_ms": [0] * (len(LOCK_BUCKETS_MS) + 1),
+                "hold_ms": [0] * (len(LOCK_BUCKETS_MS) + 1),
+            }
+            self._keys[key] = entry
+        return entry
+
+    @staticmethod
+    def _bucket(ms: float) -> int:
+        for i, bound in enumerate(LOCK_BUCKETS_MS):
+            if ms <= bound:
+                return i
+        return len(LOCK_BUCKETS_MS)
+
+    def record_wait(self, key: str, ms: float, acquired: bool, attempts: int) -> None:
+        entry = self._entry(key)
+        entry["acquired" if acquired else "failed"] += 1
+        if attempts > 1:
+            entry["contended"] += 1
+        entry["wait_ms"][self._bucket(ms)] += 1
+
+    def record_hold(self, key: str, ms: float) -> None:
+        self._entry(key)["hold_ms"][self._bucket(ms)] += 1
+
+    def snapshot(self) -> dict:
+        labels = [f"le_{bound}" for bound in LOCK_BUCKETS_MS] + ["inf"]
+        return {
+            key: {
+                "acquired": entry["acquired"],
+                "failed": entry["failed"],
+                "contended": entry["contended"],
+                "wait_ms": dict(zip(labels, entry["wait_ms"])),
+                "hold_ms": dict(zip(labels, entry["hold_ms"])),
+            }
+            for key, entry in self._keys.items()
+        }
+
+
+lock_metrics = LockMetrics()
+
+# Lock waiters of this process currently blocked in BLPOP.
+_wake_waiters = 0
+
 
 class RedisLock:
-    """Distributed lock implementation using Redis."""
+    """
+    Distributed lock implementation using Redis.
+
+    Waiters back off exponentially with full jitter, capped by the lock's
+    remaining TTL. A release wakes one waiter through a short-lived list,
+    so nobody sleeps out a full backoff step after the lock is free.
+
+    Each acquire gets a fencing token, which increases on every acquire of
+    the key. Writes that must not happen after the lock was lost can pass
+    `fence` to a store that checks it (see
+    `TicketInventory.sync_event_from_database`) or call `ensure_held`.
+    """
 
     def __init__(
-        self, redis: Redis, key: str, timeout: int = 10, retry_delay: float = 0.1
+        self,
+        redis: Redis,
+        key: str,
+        timeout: int = 10,
+        retry_delay: float = 0.01,
+        max_retry_delay: float = 0.5,
     ):
         """
         Initialize Redis lock.
@@ -37,51 +174,113 @@ class RedisLock:
             redis: Redis client
             key: Lock key (e.g., "lock:event:123:ticket:VIP")
             timeout: Lock timeout in seconds
-            retry_delay: Delay between retries in seconds
+            retry_delay: First backoff step in seconds
+            max_retry_delay: Largest backoff step in seconds
         """
         self.redis = redis
+        self.name = key
         self.key = f"lock:{key}"
+        self.fence_key = f"lock:{key}:fence"
+        self.wake_key = f"lock:{key}:wake"
         self.timeout = timeout
         self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
         self.identifier = str(uuid.uuid4())
+        self.token: Optional[int] = None
         self._locked = False
+        self._acquired_at = 0.0
+
+    @property
+    def fence(self) -> tuple[str, int]:
+        """(fencing counter key, token) for fenced writes."""
+        return self.fence_key, self.token
 
-    async def acquire(self, blocking: bool = True, max_retries: int = 100) -> bool:
+    async def acquire(
+        self, blocking: bool = True, max_retries: int = 100, wait_timeout: float = 10.0
+    ) -> bool:
         """
         Acquire lock.
 
         Args:
             blocking: Wait for lock if True, return immediately if False
             max_retries: Maximum number of retry attempts
+            wait_timeout: Maximum seconds to wait
 
         Returns:
             True if lock acquired, False otherwise
         """
-        retries = 0
-
-        while retries < max_retries:
-            # Try to set lock with NX (only if not exists) and EX (expiration)
-            acquired = await self.redis.set(
-                self.key, self.identifier, ex=self.timeout, nx=True
+        started = time.monotonic()
+        deadline = started + wait_timeout
+        attempts = 0
+
+        while True:
+            attempts += 1
+            result = await ACQUIRE_SCRIPT(
+                self.redis,
+                keys=[self.key, self.fence_key],
+                args=[self.identifier, self.timeout * 1000],
             )
 
-            if acquired:
+            if result > 0:
+                self.token = result
                 self._locked = True
-                logger.debug(f"Lock acquired: {self.key} by {self.identifier}")
+                self._acquired_at = time.monotonic()
+                lock_metrics.record_wait(
+                    self.name, (self._acquired_at - started) * 1000, True, attempts
+                )
+                logger.debug(
+                    f"Lock acquired: {self.key} by {self.identifier}, token={self.token}"
+                )
                 return True
 
-            if not blocking:
-                return False
+            now = time.monotonic()
+            if not blocking or attempts >= max_retries or now >= deadline:
+                break
 
-            # Wait before retry
-            await asyncio.sleep(self.retry_delay)
-            retries += 1
+            # Full jitter, never longer than the lock can still live
+            backoff = min(self.max_retry_delay, self.retry_delay * 2 ** (attempts - 1))
+            delay = min(random.uniform(0, backoff), -result / 1000, deadline - now)
+            await self.wait_for_release(delay)
 
-        logger.warning(
-            f"Failed to acquire lock: {self.key} after {max_retries} retries"
+        lock_metrics.record_wait(
+            self.name, (time.monotonic() - started) * 1000, False, attempts
         )
+        if blocking:
+            logger.warning(
+                f"Failed to acquire lock: {self.key} after {attempts} attempts"
+            )
         return False
 
+    async def wait_for_release(self, delay: float) -> None:
+        """
+        Sleep up to `delay`, returning early when the holder releases.
+
+        A BLPOP keeps its pool connection for the whole wait, and a full
+        pool raises instead of blocking, so only LOCK_WAKE_WAITERS_MAX
+        waiters per process park on it; the others just sleep.
+        """
+        global _wake_waiters
+        if delay >= 0.01 and _wake_waiters < settings.LOCK_WAKE_WAITERS_MAX:
+            _wake_waiters += 1
+            try:
+                # BLPOP takes whole seconds on old servers; it accepts floats since 6.0
+                await self.redis.blpop(self.wake_key, timeout=delay)
+            finally:
+                _wake_waiters -= 1
+        elif delay > 0:
+            await asyncio.sleep(delay)
+
+    async def ensure_held(self) -> None:
+        """Raise LockError if the lock expired or was taken over."""
+        if not self._locked:
+            raise LockError(f"Lock not held: {self.key}")
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(self.key)
+            pipe.get(self.fence_key)
+            owner, token = await pipe.execute()
+        if owner != self.identifier or int(token or 0) != self.token:
+            raise LockError(f"Lock lost: {self.key}, token={self.token}")
+
     async def release(self) -> bool:
         """
         Release lock.
@@ -92,19 +291,17 @@ class RedisLock:
         if not self._locked:
             return False
 
-        # Lua script to ensure we only delete our own lock
-        lua_script = """
-        if redis.call("get", KEYS[1]) == ARGV[1] then
-            return redis.call("del", KEYS[1])
-        else
-            return 0
-        end
-        """
-
-        result = await self.redis.eval(lua_script, 1, self.key, self.identifier)
+        self._locked = False
+        lock_metrics.record_hold(
+            self.name, (time.monotonic() - self._acquired_at) * 1000
+        )
+        result = await RELEASE_LOCK_SCRIPT(
+            self.redis,
+            keys=[self.key, self.wake_key],
+            args=[self.identifier, self.timeout * 1000],
+        )
 
         if result:
-            self._locked = False
             logger.debug(f"Lock released: {self.key} by {self.identifier}")
             return True
         else:
@@ -115,7 +312,8 @@ class RedisLock:
 
     async def __aenter__(self):
         """Context manager entry."""
-        await self.acquire()
+        if not await self.acquire():
+            raise LockError(f"Could not acquire lock: {self.key}")
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -124,20 +322,735 @@ class RedisLock:
         return False
 
 
+# Result codes returned by the inventory scripts.
+RESERVE_OK = 1
+RESERVE_INSUFFICIENT = 0
+RESERVE_NOT_INITIALIZED = -1
+RESERVE_INVALID = -2
+RESERVE_NOT_OPEN = -3
+RESERVE_CLOSED = -4
+RESERVE_UNKNOWN_TYPE = -5
+RESERVE_SEAT_TAKEN = -6
+RESERVE_SEATS_NOT_INITIALIZED = -7
+RESERVE_USER_LIMIT = -8
+# Only from the MongoDB engine, for sales it cannot police (see mongo_inventory).
+RESERVE_PAUSED = -9
+
+# Hold bookkeeping: sorted set of hold_id scored by expiry (epoch ms) and
+# one JSON record per hold.
+HOLDS_KEY = "holds:expiry"
+# Hold records outlive their expiry so the sweeper can still read them.
+HOLD_RECORD_GRACE = 24 * 60 * 60
+# Purchase counters outlive the booking window so late refunds still count.
+USAGE_GRACE = 24 * 60 * 60
+
+# Change log stream of an event, and the channel its changes are published on.
+LOG_KEY_PREFIX = "inventory:log:"
+# Set of event IDs whose change log has to be copied to MongoDB.
+LOG_INDEX_KEY = "inventory:logs"
+
+# Ticket types are passed to the scripts below as a run of consecutive KEYS
+# (the event's change log, then its inventory hash) plus two ARGV entries:
+# quantity and the hash field (ticket type ID). Runs of the reserve and
+# release functions put the buyer's purchase counters (see
+# `TicketInventory._get_usage_key`) before the change log.
+
+# log(key, op, field, delta, total, by): append one counter change to an
+# event's change log (see inventory_log); delta is false for absolute writes.
+# The new total is also published as "field total" on the channel of the
+# same name, for the live availability feed (see availability_feed).
+_LOG_FUNCTION = """
+local function log(key, op, field, delta, total, by)
+    if delta then
+        redis.call("xadd", key, "*", "op", op, "t", field, "d", delta, "r", total, "by", by)
+    else
+        redis.call("xadd", key, "*", "op", op, "t", field, "r", total, "by", by)
+    end
+    redis.call("publish", key, field .. " " .. total)
+end
+"""
+
+# reserve(key_offset, arg_offset, now, op, by): all-or-nothing
+# check-and-decrement over every ticket type after the offsets. Each run
+# starts with the event's booking record (see `TicketInventory.set_event_meta`);
+# when it exists the booking window, the ticket type and the buyer's purchase
+# caps are checked before any counter, and the purchase is added to the
+# buyer's counters. Every decrement is logged as `op` by user `by`.
+# Returns {1, remaining_1, ..., remaining_n} on success, otherwise
+# {code, i, available} for the first ticket type that failed (for a purchase
+# cap, the tickets the buyer may still take).
+_RESERVE_FUNCTION = _LOG_FUNCTION + f"local USAGE_GRACE_MS = {USAGE_GRACE * 1000}\n" + """
+local function reserve(key_offset, arg_offset, now, op, by)
+    local runs = {}
+    local planned = {}
+    for i = 1, (#ARGV - arg_offset) / 2 do
+        local quantity = tonumber(ARGV[arg_offset + i * 2 - 1])
+        local field = ARGV[arg_offset + i * 2]
+        local k = key_offset + (i - 1) * 4
+        local meta = redis.call(
+            "hmget", KEYS[k + 1], "opens", "closes", "type:" .. field,
+            "user_cap", "cap:" .. field
+        )
+        local usage = nil
+        if meta[1] then
+            if now < tonumber(meta[1]) then
+                return {-3, i, 0}
+            end
+            if now > tonumber(meta[2]) then
+                return {-4, i, 0}
+            end
+            if not meta[3] then
+                return {-5, i, 0}
+            end
+            usage = KEYS[k + 2]
+            local used = planned[usage]
+            if not used then
+                used = {total = tonumber(redis.call("hget", usage, "total")) or 0}
+                planned[usage] = used
+            end
+            if not used[field] then
+                used[field] = tonumber(redis.call("hget", usage, field)) or 0
+            end
+            local user_cap = tonumber(meta[4]) or 0
+            local type_cap = tonumber(meta[5]) or 0
+            if user_cap > 0 and used.total + quantity > user_cap then
+                return {-8, i, math.max(user_cap - used.total, 0)}
+            end
+            if type_cap > 0 and used[field] + quantity > type_cap then
+                return {-8, i, math.max(type_cap - used[field], 0)}
+            end
+            used.total = used.total + quantity
+            used[field] = used[field] + quantity
+        end
+        local value = redis.call("hget", KEYS[k + 4], field)
+        if not value then
+            return {-1, i, 0}
+        end
+        value = tonumber(value)
+        if not value then
+            return {-2, i, 0}
+        end
+        if value < quantity then
+            return {0, i, value}
+        end
+        runs[i] = {k, quantity, value, field, usage, meta[2]}
+    end
+    local result = {1}
+    for _, run in ipairs(runs) do
+        local k, quantity, total, field, usage, closes = unpack(run)
+        if usage then
+            redis.call("hincrby", usage, "total", quantity)
+            redis.call("hincrby", usage, field, quantity)
+            redis.call("pexpireat", usage, tonumber(closes) + USAGE_GRACE_MS)
+        end
+        redis.call("hincrby", KEYS[k + 4], field, -quantity)
+        log(KEYS[k + 3], op, field, -quantity, total - quantity, by)
+        result[#result + 1] = total - quantity
+    end
+    return result
+end
+"""
+
+# release(key_offset, arg_offset, count, op, by): give tickets back for
+# `count` ticket types and take them off the buyer's purchase counters when
+# those exist. Every increment is logged as `op` by user `by`.
+# Returns the new total per ticket type (-1 for a missing counter).
+_RELEASE_FUNCTION = _LOG_FUNCTION + """
+local function unuse(usage, field, quantity)
+    if redis.call("hincrby", usage, field, -quantity) < 0 then
+        redis.call("hset", usage, field, 0)
+    end
+end
+
+local function release(key_offset, arg_offset, count, op, by)
+    local result = {}
+    for i = 1, count do
+        local quantity = tonumber(ARGV[arg_offset + i * 2 - 1])
+        local field = ARGV[arg_offset + i * 2]
+        local k = key_offset + (i - 1) * 3
+        local usage = KEYS[k + 1]
+        if redis.call("exists", usage) == 1 then
+            unuse(usage, "total", quantity)
+            unuse(usage, field, quantity)
+        end
+        if redis.call("hexists", KEYS[k + 3], field) == 1 then
+            local total = redis.call("hincrby", KEYS[k + 3], field, quantity)
+            log(KEYS[k + 2], op, field, quantity, total, by)
+            result[i] = total
+        else
+            result[i] = -1
+        end
+    end
+    return result
+end
+"""
+
+# Reserve every ticket type passed in KEYS/ARGV in one atomic call.
+# ARGV[1] = now (epoch ms), ARGV[2] = user ID, then the ticket type arguments
+RESERVE_SCRIPT = scripts.register(
+    "inventory.reserve",
+    _RESERVE_FUNCTION + 'return reserve(0, 2, tonumber(ARGV[1]), "reserve", ARGV[2])',
+    version=6,
+)
+
+# Give tickets back for every ticket type passed in KEYS/ARGV.
+# ARGV[1] = reason, ARGV[2] = user ID, then the ticket type arguments
+RELEASE_SCRIPT = scripts.register(
+    "inventory.release",
+    _RELEASE_FUNCTION
+    + """
+return release(0, 2, (#ARGV - 2) / 2, ARGV[1], ARGV[2])
+""",
+    version=5,
+)
+
+# Reserve stock and record a hold in the same atomic step.
+# KEYS[1] = HOLDS_KEY, KEYS[2] = hold record, then the ticket type runs
+# ARGV[1] = hold ID, ARGV[2] = expiry (epoch ms), ARGV[3] = hold record JSON,
+# ARGV[4] = hold record TTL (s), ARGV[5] = now (epoch ms), ARGV[6] = user ID,
+# then the ticket type arguments
+HOLD_SCRIPT = scripts.register(
+    "holds.create",
+    _RESERVE_FUNCTION
+    + """
+local result = reserve(2, 6, tonumber(ARGV[5]), "hold", ARGV[6])
+if result[1] == 1 then
+    redis.call("set", KEYS[2], ARGV[3], "EX", ARGV[4])
+    redis.call("zadd", KEYS[1], ARGV[2], ARGV[1])
+end
+return result
+""",
+    version=6,
+)
+
+# Take a live hold out of the expiry set so it can be turned into a ticket.
+# KEYS[1] = HOLDS_KEY, KEYS[2] = hold record
+# ARGV[1] = hold ID, ARGV[2] = now (epoch ms), ARGV[3] = user ID
+# Returns {1, record} on success, {0} if expired, {-1} if unknown or already
+# confirmed/released, {-2} if the hold belongs to another user.
+CONFIRM_HOLD_SCRIPT = scripts.register(
+    "holds.confirm",
+    """
+local expires = redis.call("zscore", KEYS[1], ARGV[1])
+if not expires then
+    return {-1}
+end
+if tonumber(expires) < tonumber(ARGV[2]) then
+    return {0}
+end
+local record = redis.call("get", KEYS[2])
+if not record then
+    return {-1}
+end
+if cjson.decode(record)["user_id"] ~= ARGV[3] then
+    return {-2}
+end
+redis.call("zrem", KEYS[1], ARGV[1])
+redis.call("del", KEYS[2])
+return {1, record}
+""",
+)
+
+# Return the stock of several holds and forget them.
+# KEYS[1] = HOLDS_KEY, then per hold: its record key and its ticket type runs
+# ARGV[1] = reason, then per hold: hold ID, user ID, number of ticket types
+# and their arguments
+# A hold is only released if it was still in the expiry set, so a hold that
+# was confirmed concurrently is never given back twice.
+# Returns the IDs of the holds that were released.
+RELEASE_HOLDS_SCRIPT = scripts.register(
+    "holds.release",
+    _RELEASE_FUNCTION
+    + """
+local released = {}
+local key_offset = 1
+local arg_offset = 1
+while arg_offset < #ARGV do
+    local hold_id = ARGV[arg_offset + 1]
+    local count = tonumber(ARGV[arg_offset + 3])
+    if redis.call("zrem", KEYS[1], hold_id) == 1 then
+        release(key_offset + 1, arg_offset + 3, count, ARGV[1], ARGV[arg_offset + 2])
+        released[#released + 1] = hold_id
+    end
+    redis.call("del", KEYS[key_offset + 1])
+    key_offset = key_offset + 1 + count * 3
+    arg_offset = arg_offset + 3 + count * 2
+end
+return released
+""",
+    version=5,
+)
+
+# Move legacy per-ticket-type string counters into the event hashes.
+# KEYS come in pairs (legacy key, target hash), ARGV[i] is the hash field for
+# pair i. A field that already exists in the hash is kept as is.
+# Returns the number of legacy keys removed.
+MIGRATE_SCRIPT = scripts.register(
+    "inventory.migrate_legacy",
+    """
+local moved = 0
+for i = 1, #ARGV do
+    local legacy = KEYS[i * 2 - 1]
+    local value = redis.call("get", legacy)
+    if value then
+        redis.call("hsetnx", KEYS[i * 2], ARGV[i], value)
+        redis.call("del", legacy)
+        moved = moved + 1
+    end
+end
+return moved
+""",
+)
+
+# Apply signed corrections to ticket type counters, one run per ticket type
+# with a delta in place of the quantity. Negative deltas never push a counter
+# below zero.
+# ARGV[1] = reason, then the ticket type arguments
+# Returns the new total per ticket type (-1 for a missing counter).
+ADJUST_SCRIPT = scripts.register(
+    "inventory.adjust",
+    _LOG_FUNCTION
+    + """
+local result = {}
+for i = 1, (#ARGV - 1) / 2 do
+    local delta = tonumber(ARGV[i * 2])
+    local field = ARGV[i * 2 + 1]
+    local key = KEYS[i * 2]
+    local value = tonumber(redis.call("hget", key, field))
+    if value then
+        if delta < 0 then
+            delta = -math.min(-delta, math.max(value, 0))
+        end
+        if delta ~= 0 then
+            value = redis.call("hincrby", key, field, delta)
+            log(KEYS[i * 2 - 1], ARGV[1], field, delta, value, "")
+        end
+        result[i] = value
+    else
+        result[i] = -1
+    end
+end
+return result
+""",
+    version=4,
+)
+
+# Create ticket type counters that do not exist yet.
+# KEYS[1] = event change log, KEYS[2] = event inventory hash
+# ARGV: per ticket type, its hash field and count
+# Returns 1 per ticket type created, 0 per ticket type kept.
+INIT_SCRIPT = scripts.register(
+    "inventory.init",
+    _LOG_FUNCTION
+    + """
+local result = {}
+for a = 1, #ARGV, 2 do
+    if redis.call("hsetnx", KEYS[2], ARGV[a], ARGV[a + 1]) == 1 then
+        log(KEYS[1], "set", ARGV[a], false, tonumber(ARGV[a + 1]), "")
+        result[#result + 1] = 1
+    else
+        result[#result + 1] = 0
+    end
+end
+return result
+""",
+    version=3,
+)
+
+# Reserved seating: one bitmap per ticket type, bit i set when seat i is
+# taken (see seat_map.SeatLayout). The bitmap always has a bit past the last
+# seat, so an existing key means the taken seats are known.
+
+# Create a seat bitmap unless it exists.
+# KEYS[1] = seat bitmap
+# ARGV[1] = seat count, then the taken seats
+# Returns 1 if created.
+SEAT_INIT_SCRIPT = scripts.register(
+    "seats.init",
+    """
+if redis.call("exists", KEYS[1]) == 1 then
+    return 0
+end
+redis.call("setbit", KEYS[1], ARGV[1], 0)
+for i = 2, #ARGV do
+    redis.call("setbit", KEYS[1], ARGV[i], 1)
+end
+return 1
+""",
+)
+
+# Take several seats and their stock, all or nothing.
+# KEYS[1] = seat bitmap, then the ticket type run with its booking record,
+# the buyer's purchase counters and the event's change log
+# ARGV[1] = now (epoch ms), ARGV[2] = user ID, ARGV[3] = seat count n,
+# ARGV[4..3+n] = seats, then the ticket type arguments (quantity n)
+# Returns the reserve reply, {-6, 1, 0, taken seats...} if any seat is
+# taken, or {-7, 1, 0} if the bitmap is missing.
+SEAT_CLAIM_SCRIPT = scripts.register(
+    "seats.claim",
+    _RESERVE_FUNCTION
+    + """
+if redis.call("exists", KEYS[1]) == 0 then
+    return {-7, 1, 0}
+end
+local count = tonumber(ARGV[3])
+local taken = {-6, 1, 0}
+for i = 1, count do
+    if redis.call("getbit", KEYS[1], ARGV[3 + i]) == 1 then
+        taken[#taken + 1] = tonumber(ARGV[3 + i])
+    end
+end
+if #taken > 3 then
+    return taken
+end
+local result = reserve(1, 3 + count, tonumber(ARGV[1]), "seat", ARGV[2])
+if result[1] == 1 then
+    for i = 1, count do
+        redis.call("setbit", KEYS[1], ARGV[3 + i], 1)
+    end
+end
+return result
+""",
+    version=5,
+)
+
+# Free several seats and give their stock back.
+# KEYS[1] = seat bitmap, KEYS[2] = buyer's purchase counters, KEYS[3] = event
+# change log, KEYS[4] = event inventory hash
+# ARGV[1] = reason, ARGV[2] = user ID, ARGV[3] = seat count n,
+# ARGV[4..3+n] = seats, then the hash field
+# Only seats that were taken count; their stock goes back and comes off the
+# purchase counters.
+# Returns {seats freed, new total or -1 for a missing counter}.
+SEAT_RELEASE_SCRIPT = scripts.register(
+    "seats.release",
+    _LOG_FUNCTION
+    + """
+local count = tonumber(ARGV[3])
+local freed = 0
+for i = 1, count do
+    if redis.call("setbit", KEYS[1], ARGV[3 + i], 0) == 1 then
+        freed = freed + 1
+    end
+end
+local field = ARGV[count + 4]
+if freed > 0 and redis.call("exists", KEYS[2]) == 1 then
+    for _, name in ipairs({"total", field}) do
+        if redis.call("hincrby", KEYS[2], name, -freed) < 0 then
+            redis.call("hset", KEYS[2], name, 0)
+        end
+    end
+end
+if redis.call("hexists", KEYS[4], field) == 0 then
+    return {freed, -1}
+end
+local total = redis.call("hincrby", KEYS[4], field, freed)
+if freed > 0 then
+    log(KEYS[3], ARGV[1], field, freed, total, ARGV[2])
+end
+return {freed, total}
+""",
+    version=5,
+)
+
+# How often a best-available seat claim searches again after losing a race.
+SEAT_SEARCH_ATTEMPTS = 3
+
+# How often a sync from the database starts over after holds changed under it.
+SYNC_ATTEMPTS = 5
+
+# Matches the string keys written before inventory moved to hashes:
+# inventory:event:{event_id}:ticket:{ticket_type_id}
+LEGACY_KEY_PATTERN = "inventory:event:*:ticket:*"
+
+# Lazy hydration of missing inventory from the database: how long one
+# process holds the hydration lock, how long others wait for it, and how
+# long an event is not hydrated again after an attempt.
+HYDRATE_LOCK_TIMEOUT = 10
+HYDRATE_WAIT = 5.0
+HYDRATE_COOLDOWN = 5.0
+
+# Most events a process keeps hydration times for.
+PROCESS_CACHE_MAX_EVENTS = 10000
+
+_hydrations: dict[str, asyncio.Future] = {}
+_hydrated_at: OrderedDict[str, float] = OrderedDict()
+
+
+def _remember(cache: OrderedDict, event_id: str, value) -> None:
+    """Store an event's entry as the newest, dropping the oldest past the bound."""
+    cache[event_id] = value
+    cache.move_to_end(event_id)
+    while len(cache) > PROCESS_CACHE_MAX_EVENTS:
+        cache.popitem(last=False)
+
+
+# Returns (ticket_type_id -> remaining, (booking start, booking end),
+# (per-user cap, ticket_type_id -> per-user cap)) for an event, or None
+InventoryLoader = Callable[
+    [str],
+    Awaitable[
+        Optional[
+            tuple[
+                dict[str, int],
+                tuple[datetime, datetime],
+                tuple[int, dict[str, int]],
+            ]
+        ]
+    ],
+]
+
+# Returns the labels of the taken seats of (event_id, ticket_type_id)
+SeatLoader = Callable[[str, str], Awaitable[list[str]]]
+
+
+def epoch_ms(value: datetime) -> int:
+    """Epoch milliseconds of a datetime; naive values are taken as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+# Reservations refused by the event's booking record, before any counter
+RESERVE_REJECTIONS = {
+    RESERVE_NOT_OPEN: ("not_open", "Booking has not opened yet"),
+    RESERVE_CLOSED: ("closed", "Booking has closed"),
+    RESERVE_UNKNOWN_TYPE: ("unknown_ticket_type", "Ticket type not found"),
+    RESERVE_PAUSED: ("paused", "Sales of this event are paused, try again shortly"),
+}
+
+
+def reservation_result(
+    items: list[tuple[str, str, int]], user_id: str, code: int, values: list
+) -> dict:
+    """Turn a reserve reply (code plus values) into the reservation result dict."""
+    if code != RESERVE_OK:
+        index, available = values
+        event_id, ticket_type_id, quantity = items[index - 1]
+        key = f"event={event_id} ticket={ticket_type_id}"
+        failed_item = {"event_id": event_id, "ticket_type_id": ticket_type_id}
+
+        if code == RESERVE_NOT_INITIALIZED:
+            logger.error(f"Inventory not initialized for: {key}")
+            return {
+                "success": False,
+                "status": "not_initialized",
+                "error": "Ticket type not found or inventory not initialized",
+                "available": 0,
+                "failed_item": failed_item,
+            }
+
+        if code == RESERVE_USER_LIMIT:
+            logger.info(
+                f"Reservation rejected (user_limit): {key}, user={user_id}, "
+                f"requested={quantity}, allowed={available}"
+            )
+            return {
+                "success": False,
+                "status": "user_limit",
+                "error": f"Purchase limit reached, {available} more ticket(s) allowed",
+                "available": 0,
+                "allowed": available,
+                "requested": quantity,
+                "failed_item": failed_item,
+            }
+
+        if code in RESERVE_REJECTIONS:
+            status, error = RESERVE_REJECTIONS[code]
+            logger.info(f"Reservation rejected ({status}): {key}")
+            return {
+                "success": False,
+                "status": status,
+                "error": error,
+                "available": 0,
+                "failed_item": failed_item,
+            }
+
+        if code == RESERVE_INVALID:
+            logger.error(f"Invalid inventory value for: {key}")
+            return {
+                "success": False,
+                "status": "invalid",
+                "error": "Invalid inventory data",
+                "available": 0,
+                "failed_item": failed_item,
+            }
+
+        logger.warning(
+            f"Insufficient tickets: event={event_id}, "
+            f"ticket={ticket_type_id}, requested={quantity}, available={available}"
+        )
+        return {
+            "success": False,
+            "status": "insufficient",
+            "error": "Insufficient tickets",
+            "available": available,
+            "requested": quantity,
+            "failed_item": failed_item,
+        }
+
+    reserved = []
+    for (event_id, ticket_type_id, quantity), remaining in zip(items, values):
+        logger.info(
+            f"Tickets reserved: event={event_id}, ticket={ticket_type_id}, "
+            f"quantity={quantity}, remaining={remaining}, user={user_id}"
+        )
+        reserved.append(
+            {
+                "event_id": event_id,
+                "ticket_type_id": ticket_type_id,
+                "reserved": quantity,
+                "remaining": remaining,
+            }
+        )
+
+    return {
+        "success": True,
+        "status": "reserved",
+        "items": reserved,
+        "user_id": user_id,
+    }
+
+
 class TicketInventory:
-    """Handle ticket inventory with Redis to prevent race conditions."""
+    """
+    Handle ticket inventory with Redis to prevent race conditions.
+
+    Stock is stored as one hash per event with a field per ticket type, so a
+    whole event's availability is one read and rewriting it is one write.
+    Reserve and release run as server-side scripts, so each call is a single
+    atomic round trip and no per-ticket-type lock is needed.
 
-    def __init__(self, redis: Redis):
+    With a `loader`, a reservation that finds an event's stock missing (after
+    a Redis flush or restart) loads it from the database and retries. Only
+    one caller per event does the load; the rest wait for it.
+
+    Reserved-seating ticket types also keep a bitmap of taken seats, claimed
+    together with the stock; a `seat_loader` rebuilds a missing bitmap from
+    the booked seats.
+    """
+
+    # Reservations only touch Redis; callers decrement MongoDB themselves
+    updates_database = False
+
+    def __init__(
+        self,
+        redis: Redis,
+        loader: Optional[InventoryLoader] = None,
+        seat_loader: Optional[SeatLoader] = None,
+    ):
         self.redis = redis
+        self.loader = loader
+        self.seat_loader = seat_loader
+
+    def _get_event_key(self, event_id: str) -> str:
+        """Get Redis hash key holding an event's inventory."""
+        return f"inventory:event:{event_id}"
+
+    def _get_meta_key(self, event_id: str) -> str:
+        """Get Redis hash key holding an event's booking window and ticket types."""
+        return f"inventory:meta:{event_id}"
+
+    def _get_usage_key(self, event_id: str, user_id: str) -> str:
+        """Get Redis hash key counting a user's tickets for an event."""
+        return f"inventory:usage:{event_id}:{user_id}"
+
+    def _get_log_key(self, event_id: str) -> str:
+        """Get Redis stream key logging every change to an event's counters."""
+        return f"{LOG_KEY_PREFIX}{event_id}"
 
-    def _get_ticket_key(self, event_id: str, ticket_type_id: str) -> str:
-        """Get Redis key for ticket inventory."""
+    def _get_seats_key(self, event_id: str, ticket_type_id: str) -> str:
+        """Get Redis bitmap key of a reserved-seating ticket type's taken seats."""
+        return f"inventory:seats:{event_id}:{ticket_type_id}"
+
+    def _get_legacy_ticket_key(self, event_id: str, ticket_type_id: str) -> str:
+        """Get the pre-hash string key for a ticket type's inventory."""
         return f"inventory:event:{event_id}:ticket:{ticket_type_id}"
 
     def _get_lock_key(self, event_id: str, ticket_type_id: str) -> str:
         """Get lock key for ticket booking."""
         return f"event:{event_id}:ticket:{ticket_type_id}"
 
+    def _get_hold_key(self, hold_id: str) -> str:
+        """Get Redis key for a hold record."""
+        return f"hold:{hold_id}"
+
+    def _script_args(
+        self,
+        items: list[tuple[str, str, int]],
+        with_meta: bool = False,
+        user_id: Optional[str] = None,
+    ) -> tuple[list[str], list]:
+        """
+        Build KEYS and ARGV for the reserve and release scripts.
+
+        `with_meta` starts each run with the event's booking record, as the
+        reserve function expects; `user_id` adds the user's purchase
+        counters, as the reserve and release functions expect. Every run
+        has the event's change log before its inventory hash.
+        """
+        keys = []
+        args = []
+        for event_id, ticket_type_id, quantity in items:
+            if with_meta:
+                keys.append(self._get_meta_key(event_id))
+            if user_id is not None:
+                keys.append(self._get_usage_key(event_id, user_id))
+            keys.append(self._get_log_key(event_id))
+            keys.append(self._get_event_key(event_id))
+            args.extend([quantity, ticket_type_id])
+        return keys, args
+
+    async def set_event_meta(
+        self,
+        event_id: str,
+        booking_start: datetime,
+        booking_end: datetime,
+        ticket_type_ids: list[str],
+        user_cap: int = 0,
+        type_caps: Optional[dict[str, int]] = None,
+        fence: Optional[tuple[str, int]] = None,
+        only_if_missing: bool = False,
+    ) -> bool:
+        """
+        Precompute the booking record checked by every reservation.
+
+        The record holds the booking window (epoch ms), one field per
+        ticket type and the purchase caps, so bookings that are too early,
+        too late, for an unknown ticket type or over a buyer's cap fail
+        inside the reserve script, before any counter, hydration or MongoDB
+        access. Events without a record are not checked, and their
+        purchases are not counted.
+
+        Args:
+            user_cap: Tickets one user may buy across the event, 0 for no cap
+            type_caps: ticket_type_id -> tickets one user may buy of it
+            fence: `RedisLock.fence` of the lock guarding this write
+            only_if_missing: Keep an existing record (used by hydration)
+
+        Returns:
+            True if the record was written
+        """
+        key = self._get_meta_key(event_id)
+        if only_if_missing and await self.redis.exists(key):
+            return False
+
+        mapping = {"opens": epoch_ms(booking_start), "closes": epoch_ms(booking_end)}
+        mapping.update({f"type:{ticket_type_id}": 1 for ticket_type_id in ticket_type_ids})
+        if user_cap:
+            mapping["user_cap"] = user_cap
+        for ticket_type_id, cap in (type_caps or {}).items():
+            if cap:
+                mapping[f"cap:{ticket_type_id}"] = cap
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if fence:
+                await self._check_fence(pipe, fence)
+            pipe.delete(key)
+            pipe.hset(key, mapping=mapping)
+            await self._execute_fenced(pipe, fence)
+        return True
+
     async def initialize_inventory(
         self, event_id: str, ticket_type_id: str, total_tickets: int
     ) -> bool:
@@ -152,24 +1065,45 @@ class TicketInventory:
         Returns:
             True if initialized successfully
         """
-        key = self._get_ticket_key(event_id, ticket_type_id)
+        created = await self.initialize_event_inventory(
+            event_id, {ticket_type_id: total_tickets}
+        )
+        return created[ticket_type_id]
 
-        # Check if already exists
-        existing = await self.redis.get(key)
-        if existing is not None:
-            logger.debug(f"Inventory already exists: {key} = {existing}")
-            return False
+    async def initialize_event_inventory(
+        self, event_id: str, totals: dict[str, int]
+    ) -> dict[str, bool]:
+        """
+        Initialize every ticket type of an event in one atomic call.
 
-        # Set the inventory value
-        await self.redis.set(key, str(total_tickets))
+        Ticket types that already have stock are left untouched; the others
+        are logged as set to their total.
 
-        # Verify it was set correctly
-        verify = await self.redis.get(key)
-        logger.info(
-            f"Initialized inventory: {key} = {total_tickets} (verified: {verify})"
+        Args:
+            event_id: Event ID
+            totals: ticket_type_id -> total available tickets
+
+        Returns:
+            ticket_type_id -> True if it was initialized
+        """
+        key = self._get_event_key(event_id)
+        args = []
+        for ticket_type_id, total in totals.items():
+            args.extend([ticket_type_id, total])
+        results = await INIT_SCRIPT(
+            self.redis, keys=[self._get_log_key(event_id), key], args=args
         )
+        await self.redis.sadd(LOG_INDEX_KEY, event_id)
 
-        return True
+        created = {}
+        for i, (ticket_type_id, total) in enumerate(totals.items()):
+            created[ticket_type_id] = bool(results[i])
+            if created[ticket_type_id]:
+                logger.info(f"Initialized inventory: {key} {ticket_type_id} = {total}")
+            else:
+                logger.debug(f"Inventory already exists: {key} {ticket_type_id}")
+
+        return created
 
     async def get_available_tickets(
         self, event_id: str, ticket_type_id: str
@@ -180,26 +1114,151 @@ class TicketInventory:
         Returns:
             Number of tickets or None if not found
         """
-        key = self._get_ticket_key(event_id, ticket_type_id)
-        count = await self.redis.get(key)
+        key = self._get_event_key(event_id)
+        count = await self.redis.hget(key, ticket_type_id)
 
         if count is None:
-            logger.warning(f"Inventory not found for key: {key}")
+            logger.warning(f"Inventory not found for: {key} {ticket_type_id}")
             return None
 
         try:
             count_int = int(count)
-            logger.debug(f"Available tickets for {key}: {count_int}")
+            logger.debug(f"Available tickets for {key} {ticket_type_id}: {count_int}")
             return count_int
         except (ValueError, TypeError) as e:
-            logger.error(f"Invalid inventory value for {key}: {count} - Error: {e}")
+            logger.error(
+                f"Invalid inventory value for {key} {ticket_type_id}: "
+                f"{count} - Error: {e}"
+            )
             return None
 
+    async def get_event_availability(self, event_id: str) -> dict[str, int]:
+        """
+        Get available tickets for every ticket type of an event in one read.
+
+        Returns:
+            ticket_type_id -> available tickets; ticket types without stock
+            in Redis are absent
+        """
+        fields = await self.redis.hgetall(self._get_event_key(event_id))
+        return self._parse_counts(event_id, fields)
+
+    async def get_bulk_availability(
+        self, event_ids: list[str]
+    ) -> dict[str, dict[str, int]]:
+        """
+        Get the availability of many events in one pipelined round trip.
+
+        Returns:
+            event_id -> (ticket_type_id -> available tickets)
+        """
+        event_ids = list(dict.fromkeys(event_ids))
+        if not event_ids:
+            return {}
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for event_id in event_ids:
+                pipe.hgetall(self._get_event_key(event_id))
+            hashes = await pipe.execute()
+
+        return {
+            event_id: self._parse_counts(event_id, fields)
+            for event_id, fields in zip(event_ids, hashes)
+        }
+
+    @staticmethod
+    def _parse_counts(event_id: str, fields: dict) -> dict[str, int]:
+        """Read an event's inventory hash, skipping values that are not counts."""
+        counts: dict[str, int] = {}
+        for ticket_type_id, count in fields.items():
+            try:
+                counts[ticket_type_id] = int(count)
+            except (ValueError, TypeError) as e:
+                logger.error(
+                    f"Invalid inventory value for {event_id} {ticket_type_id}: "
+                    f"{count} - Error: {e}"
+                )
+        return counts
+
+    async def get_held_quantities(
+        self, batch_size: int = 500, event_ids: Optional[set[str]] = None
+    ) -> dict[tuple[str, str], int]:
+        """
+        Sum the tickets taken by holds that have not been released yet.
+
+        Expired holds count until the sweeper gives their stock back.
+
+        Args:
+            event_ids: Only count holds on these events
+
+        Returns:
+            (event_id, ticket_type_id) -> held tickets
+        """
+        return await self._read_held(self.redis, batch_size, event_ids)
+
+    async def _read_held(
+        self,
+        client,
+        batch_size: int = 500,
+        event_ids: Optional[set[str]] = None,
+    ) -> dict[tuple[str, str], int]:
+        """`get_held_quantities` through `client`, which may be a WATCHing pipeline."""
+        held: dict[tuple[str, str], int] = {}
+        start = 0
+        while True:
+            hold_ids = await client.zrange(HOLDS_KEY, start, start + batch_size - 1)
+            if not hold_ids:
+                break
+
+            records = await client.mget(
+                [self._get_hold_key(hold_id) for hold_id in hold_ids]
+            )
+            for record in records:
+                if not record:
+                    continue
+                for event_id, ticket_type_id, quantity in json.loads(record)["items"]:
+                    if event_ids is not None and event_id not in event_ids:
+                        continue
+                    key = (event_id, ticket_type_id)
+                    held[key] = held.get(key, 0) + quantity
+
+            if len(hold_ids) < batch_size:
+                break
+            start += batch_size
+
+        return held
+
+    async def adjust_inventory(
+        self, adjustments: list[tuple[str, str, int]], reason: str = "adjust"
+    ) -> list[int]:
+        """
+        Correct several counters by signed deltas in one atomic call.
+
+        Args:
+            adjustments: (event_id, ticket_type_id, delta) tuples
+            reason: Operation recorded in the change log
+
+        Returns:
+            The new total per adjustment, -1 where the counter is missing
+        """
+        if not adjustments:
+            return []
+
+        keys, args = self._script_args(adjustments)
+        totals = await ADJUST_SCRIPT(self.redis, keys, [reason, *args])
+
+        for (event_id, ticket_type_id, delta), total in zip(adjustments, totals):
+            logger.info(
+                f"Inventory adjusted: event={event_id}, ticket={ticket_type_id}, "
+                f"delta={delta}, new_total={total}, reason={reason}"
+            )
+        return totals
+
     async def reserve_tickets(
         self, event_id: str, ticket_type_id: str, quantity: int, user_id: str
     ) -> dict:
         """
-        Reserve tickets with distributed lock to prevent race condition.
+        Reserve tickets with a single atomic check-and-decrement script.
 
         Args:
             event_id: Event ID
@@ -210,68 +1269,138 @@ class TicketInventory:
         Returns:
             dict with status and details
         """
-        lock_key = self._get_lock_key(event_id, ticket_type_id)
-        inventory_key = self._get_ticket_key(event_id, ticket_type_id)
+        result = await self.reserve_many(
+            [(event_id, ticket_type_id, quantity)], user_id
+        )
+        if not result["success"]:
+            result.pop("failed_item", None)
+            return result
+
+        return {
+            "success": True,
+            "status": "reserved",
+            "reserved": quantity,
+            "remaining": result["items"][0]["remaining"],
+            "event_id": event_id,
+            "ticket_type_id": ticket_type_id,
+            "user_id": user_id,
+        }
+
+    async def reserve_many(
+        self, items: list[tuple[str, str, int]], user_id: str
+    ) -> dict:
+        """
+        Reserve several ticket types, possibly across events, all or nothing.
 
-        # Acquire distributed lock
-        async with RedisLock(self.redis, lock_key, timeout=5) as lock:
-            # Get current available tickets
-            available = await self.redis.get(inventory_key)
+        Args:
+            items: (event_id, ticket_type_id, quantity) tuples, one per
+                ticket type
+            user_id: User ID making reservation
 
-            logger.debug(
-                f"Reserve attempt: event={event_id}, ticket={ticket_type_id}, "
-                f"quantity={quantity}, current_available={available}"
+        Returns:
+            dict with status and, on success, the remaining count per item
+        """
+        async def reserve() -> list:
+            keys, args = self._script_args(items, with_meta=True, user_id=user_id)
+            return await RESERVE_SCRIPT(
+                self.redis, keys, [int(time.time() * 1000), user_id, *args]
             )
 
-            if available is None:
-                logger.error(f"Inventory not initialized for: {inventory_key}")
-                return {
-                    "success": False,
-                    "error": "Ticket type not found or inventory not initialized",
-                    "available": 0,
-                }
+        code, *values = await self._run_hydrated(items, reserve)
 
-            try:
-                available = int(available)
-            except (ValueError, TypeError) as e:
-                logger.error(f"Invalid inventory value: {available} - Error: {e}")
-                return {
-                    "success": False,
-                    "error": "Invalid inventory data",
-                    "available": 0,
-                }
+        return reservation_result(items, user_id, code, values)
 
-            # Check if enough tickets available
-            if available < quantity:
-                logger.warning(
-                    f"Insufficient tickets: event={event_id}, "
-                    f"ticket={ticket_type_id}, requested={quantity}, available={available}"
-                )
-                return {
-                    "success": False,
-                    "error": "Insufficient tickets",
-                    "available": available,
-                    "requested": quantity,
-                }
+    async def _run_hydrated(
+        self, items: list[tuple[str, str, int]], run: Callable[[], Awaitable[list]]
+    ) -> list:
+        """
+        Run a reserve-style script, hydrating events it reports as missing.
 
-            # Deduct tickets using atomic operation
-            new_count = await self.redis.decrby(inventory_key, quantity)
+        Each event is hydrated at most once per call before the script is
+        retried.
+        """
+        reply = await run()
+        hydrated = set()
+        while reply[0] == RESERVE_NOT_INITIALIZED and self.loader:
+            event_id = items[reply[1] - 1][0]
+            if event_id in hydrated or not await self.hydrate_event(event_id):
+                break
+            hydrated.add(event_id)
+            reply = await run()
+        return reply
+
+    async def hydrate_event(self, event_id: str) -> bool:
+        """
+        Load an event's missing stock from the database, single-flight.
 
-            # Verify the deduction
-            verify = await self.redis.get(inventory_key)
-            logger.info(
-                f"Tickets reserved: event={event_id}, ticket={ticket_type_id}, "
-                f"quantity={quantity}, remaining={new_count} (verified: {verify}), user={user_id}"
+        Concurrent callers in this process share one load; other processes
+        wait on a Redis lock for the process doing it. Counters that already
+        exist are never overwritten.
+
+        Returns:
+            True if the stock may now be present and the caller should retry
+        """
+        if not self.loader:
+            return False
+
+        pending = _hydrations.get(event_id)
+        if pending:
+            return await asyncio.shield(pending)
+
+        last = _hydrated_at.get(event_id)
+        if last and time.monotonic() - last < HYDRATE_COOLDOWN:
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        _hydrations[event_id] = future
+        result = False
+        try:
+            result = await self._hydrate(event_id)
+        except Exception as e:
+            logger.error(f"Inventory hydration failed for {event_id}: {e}")
+        finally:
+            _hydrations.pop(event_id, None)
+            _remember(_hydrated_at, event_id, time.monotonic())
+            future.set_result(result)
+        return result
+
+    async def _hydrate(self, event_id: str) -> bool:
+        lock = RedisLock(self.redis, f"hydrate:{event_id}", timeout=HYDRATE_LOCK_TIMEOUT)
+
+        if not await lock.acquire(blocking=False):
+            # Another process is loading this event; wait for it to finish
+            deadline = time.monotonic() + HYDRATE_WAIT
+            while time.monotonic() < deadline:
+                await lock.wait_for_release(min(0.1, deadline - time.monotonic()))
+                if not await self.redis.exists(lock.key):
+                    return True
+            logger.warning(f"Timed out waiting for inventory hydration: {event_id}")
+            return False
+
+        try:
+            loaded = await self.loader(event_id)
+            if loaded is None:
+                return False
+
+            remaining, (booking_start, booking_end), (user_cap, type_caps) = loaded
+            await self.set_event_meta(
+                event_id,
+                booking_start,
+                booking_end,
+                list(remaining),
+                user_cap=user_cap,
+                type_caps=type_caps,
+                only_if_missing=True,
             )
 
-            return {
-                "success": True,
-                "reserved": quantity,
-                "remaining": new_count,
-                "event_id": event_id,
-                "ticket_type_id": ticket_type_id,
-                "user_id": user_id,
-            }
+            created = await self.initialize_event_inventory(event_id, remaining)
+            logger.info(
+                f"Hydrated inventory from DB: event={event_id}, "
+                f"initialized={sum(created.values())}/{len(created)}"
+            )
+            return True
+        finally:
+            await lock.release()
 
     async def release_tickets(
         self,
@@ -279,43 +1408,591 @@ class TicketInventory:
         ticket_type_id: str,
         quantity: int,
         reason: str = "cancelled",
+        user_id: Optional[str] = None,
     ) -> dict:
         """
         Release reserved tickets back to inventory.
 
+        The counter is only incremented when it exists, so a release after
+        the inventory was deleted cannot recreate a partial counter.
+
         Args:
             event_id: Event ID
             ticket_type_id: Ticket type ID
             quantity: Number of tickets to release
             reason: Reason for release
+            user_id: Buyer whose purchase counters the tickets come off
 
         Returns:
             dict with status
         """
-        lock_key = self._get_lock_key(event_id, ticket_type_id)
-        inventory_key = self._get_ticket_key(event_id, ticket_type_id)
+        result = await self.release_many(
+            [(event_id, ticket_type_id, quantity)], reason, user_id
+        )
+        item = result["items"][0]
+
+        if item["status"] == "not_initialized":
+            return {
+                "success": False,
+                "status": "not_initialized",
+                "released": 0,
+                "reason": reason,
+            }
+
+        return {
+            "success": True,
+            "status": "released",
+            "released": quantity,
+            "available": item["available"],
+            "reason": reason,
+        }
+
+    async def release_many(
+        self,
+        items: list[tuple[str, str, int]],
+        reason: str = "cancelled",
+        user_id: Optional[str] = None,
+    ) -> dict:
+        """
+        Release several ticket types back to inventory in one call.
+
+        Args:
+            items: (event_id, ticket_type_id, quantity) tuples
+            reason: Reason for release
+            user_id: Buyer whose purchase counters the tickets come off;
+                without it the counters are left as they are
+
+        Returns:
+            dict with the new count per item
+        """
+        # No purchase counters exist for an empty user ID
+        keys, args = self._script_args(items, user_id=str(user_id or ""))
 
-        async with RedisLock(self.redis, lock_key, timeout=5):
-            # Add tickets back using atomic operation
-            new_count = await self.redis.incrby(inventory_key, quantity)
+        counts = await RELEASE_SCRIPT(
+            self.redis, keys, [reason, str(user_id or ""), *args]
+        )
+
+        released = []
+        for (event_id, ticket_type_id, quantity), new_count in zip(items, counts):
+            if new_count == RESERVE_NOT_INITIALIZED:
+                logger.error(
+                    "Release skipped, inventory not initialized: "
+                    f"{self._get_event_key(event_id)} {ticket_type_id}, "
+                    f"quantity={quantity}, reason={reason}"
+                )
+                released.append(
+                    {
+                        "event_id": event_id,
+                        "ticket_type_id": ticket_type_id,
+                        "status": "not_initialized",
+                        "released": 0,
+                    }
+                )
+                continue
 
             logger.info(
                 f"Tickets released: event={event_id}, ticket={ticket_type_id}, "
                 f"quantity={quantity}, new_total={new_count}, reason={reason}"
             )
+            released.append(
+                {
+                    "event_id": event_id,
+                    "ticket_type_id": ticket_type_id,
+                    "status": "released",
+                    "released": quantity,
+                    "available": new_count,
+                }
+            )
+
+        await self._wake_waitlists(
+            [
+                (i["event_id"], i["ticket_type_id"])
+                for i in released
+                if i["status"] == "released"
+            ]
+        )
+
+        return {
+            "success": all(i["status"] == "released" for i in released),
+            "items": released,
+            "reason": reason,
+        }
+
+    async def create_hold(
+        self,
+        items: list[tuple[str, str, int]],
+        user_id: str,
+        ttl: int,
+        details: Optional[dict] = None,
+    ) -> dict:
+        """
+        Reserve tickets as a hold that expires unless it is confirmed.
+
+        Stock is taken and the hold recorded in the same atomic call; an
+        expired hold is returned to stock by `release_expired_holds`.
+
+        Args:
+            items: (event_id, ticket_type_id, quantity) tuples
+            user_id: User ID making reservation
+            ttl: Seconds until the hold expires
+            details: Extra data kept with the hold for the confirm step
+
+        Returns:
+            Reservation result with hold_id and expires_at (epoch ms)
+        """
+        hold_id = uuid.uuid4().hex
+        expires_at = int((time.time() + ttl) * 1000)
+        record = {
+            "hold_id": hold_id,
+            "user_id": user_id,
+            "expires_at": expires_at,
+            "items": [list(item) for item in items],
+            "details": details or {},
+        }
+
+        async def hold() -> list:
+            keys, args = self._script_args(items, with_meta=True, user_id=user_id)
+            return await HOLD_SCRIPT(
+                self.redis,
+                keys=[HOLDS_KEY, self._get_hold_key(hold_id), *keys],
+                args=[
+                    hold_id,
+                    expires_at,
+                    json.dumps(record),
+                    ttl + HOLD_RECORD_GRACE,
+                    int(time.time() * 1000),
+                    user_id,
+                    *args,
+                ],
+            )
+
+        code, *values = await self._run_hydrated(items, hold)
+
+        result = reservation_result(items, user_id, code, values)
+        if result["success"]:
+            result.update(hold_id=hold_id, expires_at=expires_at)
+            logger.info(
+                f"Hold created: hold={hold_id}, user={user_id}, "
+                f"items={len(items)}, ttl={ttl}s"
+            )
+        return result
+
+    async def confirm_hold(self, hold_id: str, user_id: str) -> dict:
+        """
+        Take a live hold so it can be turned into a booking.
+
+        After a successful confirm the stock stays taken; the caller owns
+        releasing it again if persisting the booking fails.
+
+        Returns:
+            dict with status (confirmed, expired, not_found, forbidden) and,
+            when confirmed, the hold record
+        """
+        code, *record = await CONFIRM_HOLD_SCRIPT(
+            self.redis,
+            keys=[HOLDS_KEY, self._get_hold_key(hold_id)],
+            args=[hold_id, int(time.time() * 1000), user_id],
+        )
+
+        if code == 1:
+            logger.info(f"Hold confirmed: hold={hold_id}, user={user_id}")
+            return {"success": True, "status": "confirmed", "hold": json.loads(record[0])}
+
+        status = {0: "expired", -1: "not_found", -2: "forbidden"}[code]
+        logger.warning(f"Hold not confirmed: hold={hold_id}, status={status}")
+        return {"success": False, "status": status}
+
+    async def release_hold(self, hold_id: str, user_id: str) -> dict:
+        """
+        Give a hold's tickets back before it expires.
+
+        Returns:
+            dict with status (released, not_found, forbidden)
+        """
+        record = await self.redis.get(self._get_hold_key(hold_id))
+        if record is None:
+            return {"success": False, "status": "not_found"}
+
+        record = json.loads(record)
+        if record["user_id"] != user_id:
+            return {"success": False, "status": "forbidden"}
+
+        released = await self._release_holds([(hold_id, record)], "hold_released")
+        if not released:
+            return {"success": False, "status": "not_found"}
+
+        logger.info(f"Hold released: hold={hold_id}, user={user_id}")
+        return {"success": True, "status": "released", "hold_id": hold_id}
+
+    async def release_expired_holds(self, batch_size: int = 500) -> int:
+        """
+        Return the stock of every expired hold, in batches.
+
+        Returns:
+            Number of holds released
+        """
+        total = 0
+        while True:
+            hold_ids = await self.redis.zrangebyscore(
+                HOLDS_KEY, "-inf", int(time.time() * 1000), start=0, num=batch_size
+            )
+            if not hold_ids:
+                break
+
+            records = await self.redis.mget(
+                [self._get_hold_key(hold_id) for hold_id in hold_ids]
+            )
+            released = await self._release_holds(
+                [
+                    (hold_id, json.loads(record) if record else None)
+                    for hold_id, record in zip(hold_ids, records)
+                ],
+                "hold_expired",
+            )
+            total += len(released)
+
+            if len(hold_ids) < batch_size:
+                break
+
+        if total:
+            logger.info(f"Expired holds released: {total}")
+        return total
+
+    async def release_event_holds(
+        self, event_id: str, reason: str, batch_size: int = 500
+    ) -> int:
+        """
+        Return the stock of every live hold that includes an event.
+
+        Holds spanning several events are released whole. Meant for an
+        event whose sales are already closed, so no new holds appear.
+
+        Returns:
+            Number of holds released
+        """
+        holds = []
+        start = 0
+        while True:
+            hold_ids = await self.redis.zrange(HOLDS_KEY, start, start + batch_size - 1)
+            if not hold_ids:
+                break
+
+            records = await self.redis.mget(
+                [self._get_hold_key(hold_id) for hold_id in hold_ids]
+            )
+            for hold_id, record in zip(hold_ids, records):
+                if not record:
+                    continue
+                record = json.loads(record)
+                if any(item[0] == event_id for item in record["items"]):
+                    holds.append((hold_id, record))
+
+            if len(hold_ids) < batch_size:
+                break
+            start += batch_size
+
+        total = 0
+        for i in range(0, len(holds), batch_size):
+            released = await self._release_holds(holds[i : i + batch_size], reason)
+            total += len(released)
+
+        if total:
+            logger.info(f"Event holds released: event={event_id}, holds={total}")
+        return total
+
+    async def _release_holds(
+        self, holds: list[tuple[str, Optional[dict]]], reason: str
+    ) -> list[str]:
+        """Release several holds in one script call; returns released IDs."""
+        keys = [HOLDS_KEY]
+        args = [reason]
+        for hold_id, record in holds:
+            hold_items = record["items"] if record else []
+            keys.append(self._get_hold_key(hold_id))
+            args.extend([hold_id, record["user_id"] if record else "", len(hold_items)])
+            for event_id, ticket_type_id, quantity in hold_items:
+                keys.append(self._get_usage_key(event_id, record["user_id"]))
+                keys.append(self._get_log_key(event_id))
+                keys.append(self._get_event_key(event_id))
+                args.extend([quantity, ticket_type_id])
+
+        released = await RELEASE_HOLDS_SCRIPT(self.redis, keys, args)
+
+        records = dict(holds)
+        await self._wake_waitlists(
+            [
+                (e, t)
+                for hold_id in released
+                if records[hold_id]
+                for e, t, _ in records[hold_id]["items"]
+            ]
+        )
+        return released
+
+    async def _wake_waitlists(self, pairs: list[tuple[str, str]]) -> None:
+        """Offer returned stock to whoever waits for it."""
+        from .waitlist import Waitlist
+
+        try:
+            await Waitlist(self.redis, self).wake(pairs)
+        except Exception as e:
+            logger.error(f"Failed to wake waitlists: {e}")
+
+    async def get_seat_bitmap(
+        self, event_id: str, ticket_type_id: str, layout: SeatLayout
+    ) -> Optional[bytes]:
+        """
+        Read a seat bitmap as raw bytes, loading it from the database when
+        missing.
+
+        Returns:
+            The bitmap, or None if it is missing and could not be loaded
+        """
+        key = self._get_seats_key(event_id, ticket_type_id)
+        # Bitmaps are binary: bypass the client's response decoding
+        bitmap = await self.redis.execute_command("GET", key, NEVER_DECODE=[])
+        if bitmap is None and await self.load_seats(event_id, ticket_type_id, layout):
+            bitmap = await self.redis.execute_command("GET", key, NEVER_DECODE=[])
+        return bitmap
+
+    async def load_seats(
+        self, event_id: str, ticket_type_id: str, layout: SeatLayout
+    ) -> bool:
+        """
+        Create a missing seat bitmap from the seats taken in the database.
+
+        An existing bitmap is never overwritten.
+
+        Returns:
+            True if the bitmap may now exist and the caller should retry
+        """
+        if not self.seat_loader:
+            return False
+
+        taken = []
+        for label in await self.seat_loader(event_id, ticket_type_id):
+            try:
+                taken.append(layout.index(label))
+            except ValueError:
+                logger.warning(
+                    f"Booked seat not in seat map: event={event_id}, "
+                    f"ticket={ticket_type_id}, seat={label}"
+                )
+
+        created = await SEAT_INIT_SCRIPT(
+            self.redis,
+            keys=[self._get_seats_key(event_id, ticket_type_id)],
+            args=[layout.capacity, *taken],
+        )
+        if created:
+            logger.info(
+                f"Loaded seat map from DB: event={event_id}, "
+                f"ticket={ticket_type_id}, taken={len(taken)}/{layout.capacity}"
+            )
+        return True
+
+    async def get_seat_availability(
+        self,
+        event_id: str,
+        ticket_type_id: str,
+        layout: SeatLayout,
+        detail: bool = False,
+    ) -> dict:
+        """
+        Free seats per section of a reserved-seating ticket type, from one
+        read of its bitmap.
+
+        Args:
+            detail: Include every row's seats (see `SeatLayout.summary`)
+        """
+        bits = layout.bits(await self.get_seat_bitmap(event_id, ticket_type_id, layout))
+        sections = layout.summary(bits, detail=detail)
+        return {
+            "event_id": event_id,
+            "ticket_type_id": ticket_type_id,
+            "capacity": layout.capacity,
+            "available": sum(section["available"] for section in sections),
+            "sections": sections,
+        }
+
+    async def claim_seats(
+        self,
+        event_id: str,
+        ticket_type_id: str,
+        layout: SeatLayout,
+        user_id: str,
+        seats: Optional[list[str]] = None,
+        quantity: Optional[int] = None,
+    ) -> dict:
+        """
+        Reserve specific seats, or the best `quantity` adjacent ones.
+
+        The seats and the ticket type's stock are taken in one atomic call,
+        so the counters, the booking window check and reconciliation work
+        as for unseated ticket types. A best-available claim that loses a
+        seat to a concurrent buyer searches again.
+
+        Returns:
+            Reservation result with the claimed seat labels; status is
+            seat_taken (with the taken labels), no_adjacent_seats or
+            invalid_seat when seats are the problem
+        """
+        if seats is not None:
+            try:
+                wanted = [layout.index(label) for label in seats]
+            except ValueError as e:
+                return {"success": False, "status": "invalid_seat", "error": str(e)}
+            if len(set(wanted)) != len(wanted):
+                return {
+                    "success": False,
+                    "status": "invalid_seat",
+                    "error": "Seats must not repeat",
+                }
+            attempts = 1
+        else:
+            attempts = SEAT_SEARCH_ATTEMPTS
+
+        for _ in range(attempts):
+            if seats is None:
+                bitmap = await self.get_seat_bitmap(event_id, ticket_type_id, layout)
+                wanted = layout.best_seats(layout.bits(bitmap), quantity)
+                if wanted is None:
+                    logger.info(
+                        f"No {quantity} adjacent seats: event={event_id}, "
+                        f"ticket={ticket_type_id}"
+                    )
+                    return {
+                        "success": False,
+                        "status": "no_adjacent_seats",
+                        "error": f"No {quantity} adjacent seats available",
+                    }
+
+            code, *values = await self._claim_seats(
+                event_id, ticket_type_id, layout, wanted, user_id
+            )
+            if code != RESERVE_SEAT_TAKEN:
+                break
 
+        items = [(event_id, ticket_type_id, len(wanted))]
+        if code == RESERVE_SEAT_TAKEN:
+            taken = [layout.label(seat) for seat in values[2:]]
+            logger.info(
+                f"Seats taken: event={event_id}, ticket={ticket_type_id}, seats={taken}"
+            )
             return {
-                "success": True,
-                "released": quantity,
-                "available": new_count,
-                "reason": reason,
+                "success": False,
+                "status": "seat_taken",
+                "error": "Seats already taken",
+                "seats": taken,
             }
+        if code == RESERVE_SEATS_NOT_INITIALIZED:
+            code = RESERVE_NOT_INITIALIZED
+
+        result = reservation_result(items, user_id, code, values)
+        if not result["success"]:
+            result.pop("failed_item", None)
+            return result
+
+        labels = [layout.label(seat) for seat in wanted]
+        logger.info(
+            f"Seats claimed: event={event_id}, ticket={ticket_type_id}, "
+            f"seats={labels}, user={user_id}"
+        )
+        return {
+            "success": True,
+            "status": "reserved",
+            "reserved": len(wanted),
+            "remaining": result["items"][0]["remaining"],
+            "seats": labels,
+            "event_id": event_id,
+            "ticket_type_id": ticket_type_id,
+            "user_id": user_id,
+        }
+
+    async def _claim_seats(
+        self,
+        event_id: str,
+        ticket_type_id: str,
+        layout: SeatLayout,
+        seats: list[int],
+        user_id: str,
+    ) -> list:
+        """Run the claim script, loading the bitmap or the stock when missing."""
+        items = [(event_id, ticket_type_id, len(seats))]
+
+        async def claim() -> list:
+            keys, args = self._script_args(items, with_meta=True, user_id=user_id)
+            return await SEAT_CLAIM_SCRIPT(
+                self.redis,
+                keys=[self._get_seats_key(event_id, ticket_type_id), *keys],
+                args=[int(time.time() * 1000), user_id, len(seats), *seats, *args],
+            )
+
+        reply = await self._run_hydrated(items, claim)
+        if reply[0] == RESERVE_SEATS_NOT_INITIALIZED and await self.load_seats(
+            event_id, ticket_type_id, layout
+        ):
+            reply = await self._run_hydrated(items, claim)
+        return reply
+
+    async def release_seats(
+        self,
+        event_id: str,
+        ticket_type_id: str,
+        layout: SeatLayout,
+        seats: list[str],
+        reason: str = "cancelled",
+        user_id: Optional[str] = None,
+    ) -> dict:
+        """
+        Free seats and give their stock back. Seats that are already free
+        are skipped, so a repeated release returns nothing twice.
+
+        Returns:
+            dict with the seats freed and the new available count
+        """
+        freed, total = await SEAT_RELEASE_SCRIPT(
+            self.redis,
+            keys=[
+                self._get_seats_key(event_id, ticket_type_id),
+                self._get_usage_key(event_id, str(user_id or "")),
+                self._get_log_key(event_id),
+                self._get_event_key(event_id),
+            ],
+            args=[
+                reason,
+                str(user_id or ""),
+                len(seats),
+                *(layout.index(label) for label in seats),
+                ticket_type_id,
+            ],
+        )
+
+        if total == RESERVE_NOT_INITIALIZED:
+            logger.error(
+                "Seat stock not returned, inventory not initialized: "
+                f"event={event_id}, ticket={ticket_type_id}, freed={freed}, reason={reason}"
+            )
+        else:
+            logger.info(
+                f"Seats released: event={event_id}, ticket={ticket_type_id}, "
+                f"seats={seats}, freed={freed}, new_total={total}, reason={reason}"
+            )
+        return {
+            "success": total != RESERVE_NOT_INITIALIZED,
+            "released": freed,
+            "available": total,
+            "reason": reason,
+        }
 
     async def sync_from_database(
-        self, event_id: str, ticket_type_id: str, remaining_tickets: int
+        self,
+        event_id: str,
+        ticket_type_id: str,
+        remaining_tickets: int,
     ) -> bool:
         """
-        Sync inventory from database (use when Redis data is lost).
+        Sync one ticket type from database (use when Redis data is lost).
 
         Args:
             event_id: Event ID
@@ -325,12 +2002,192 @@ class TicketInventory:
         Returns:
             True if synced successfully
         """
-        key = self._get_ticket_key(event_id, ticket_type_id)
-        await self.redis.set(key, remaining_tickets)
+        key = self._get_event_key(event_id)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, ticket_type_id, remaining_tickets)
+            log_key = self._get_log_key(event_id)
+            pipe.xadd(
+                log_key,
+                {"op": "set", "t": ticket_type_id, "r": remaining_tickets, "by": ""},
+            )
+            pipe.publish(log_key, f"{ticket_type_id} {remaining_tickets}")
+            pipe.sadd(LOG_INDEX_KEY, event_id)
+            await pipe.execute()
 
-        logger.info(f"Synced inventory from DB: {key} = {remaining_tickets}")
+        logger.info(
+            f"Synced inventory from DB: {key} {ticket_type_id} = {remaining_tickets}"
+        )
         return True
 
+    async def sync_event_from_database(
+        self,
+        event_id: str,
+        remaining: dict[str, int],
+        fence: Optional[tuple[str, int]] = None,
+        subtract_holds: bool = False,
+    ) -> dict[str, int]:
+        """
+        Replace an event's whole inventory with database values in one write.
+
+        Ticket types missing from `remaining` are dropped from Redis. The
+        change log gets a reset followed by the new value of every ticket
+        type, so a replay starts over from here.
+
+        Args:
+            event_id: Event ID
+            remaining: ticket_type_id -> remaining tickets from database
+            fence: `RedisLock.fence` of the lock guarding this write; the write
+                is refused with LockError once a newer token was issued
+            subtract_holds: `remaining` comes from MongoDB, which only counts
+                confirmed bookings; take the event's live holds off it. The
+                holds are read under WATCH, so a hold created, confirmed or
+                released meanwhile makes the write start over, and LockError
+                is raised if they keep changing for SYNC_ATTEMPTS tries
+
+        Returns:
+            ticket_type_id -> tickets written to Redis
+        """
+        key = self._get_event_key(event_id)
+        log_key = self._get_log_key(event_id)
+
+        for _ in range(SYNC_ATTEMPTS):
+            async with self.redis.pipeline(transaction=True) as pipe:
+                counts = remaining
+                if subtract_holds:
+                    await pipe.watch(HOLDS_KEY)
+                    held = await self._read_held(pipe, event_ids={event_id})
+                    counts = {
+                        ticket_type_id: max(
+                            count - held.get((event_id, ticket_type_id), 0), 0
+                        )
+                        for ticket_type_id, count in remaining.items()
+                    }
+                if fence:
+                    await self._check_fence(pipe, fence)
+                else:
+                    pipe.multi()
+                pipe.delete(key)
+                if counts:
+                    pipe.hset(key, mapping=counts)
+                pipe.xadd(log_key, {"op": "reset", "t": "*", "r": 0, "by": ""})
+                for ticket_type_id, count in counts.items():
+                    pipe.xadd(
+                        log_key, {"op": "set", "t": ticket_type_id, "r": count, "by": ""}
+                    )
+                # Watchers reload the whole event, dropped ticket types included
+                pipe.publish(log_key, "*")
+                pipe.sadd(LOG_INDEX_KEY, event_id)
+                try:
+                    await pipe.execute()
+                except WatchError:
+                    # The fence is checked again on the next try
+                    continue
+
+            logger.info(
+                f"Synced event inventory from DB: {key} = {counts}"
+            )
+            return counts
+
+        raise LockError(f"Holds kept changing while syncing {key}")
+
+    async def delete_inventory(
+        self,
+        event_id: str,
+        ticket_type_ids: list[str],
+        fence: Optional[tuple[str, int]] = None,
+    ) -> int:
+        """
+        Remove the inventory hash, booking record and lock keys of an event.
+
+        The change log is kept until its last entries, ending with the
+        delete, have been copied to MongoDB.
+
+        Args:
+            fence: `RedisLock.fence` of the lock guarding this write, as in
+                `sync_event_from_database`
+
+        Returns:
+            Number of keys deleted
+        """
+        keys = [self._get_event_key(event_id), self._get_meta_key(event_id)]
+        for ticket_type_id in ticket_type_ids:
+            keys.append(self._get_legacy_ticket_key(event_id, ticket_type_id))
+            keys.append(self._get_seats_key(event_id, ticket_type_id))
+            keys.append(f"lock:{self._get_lock_key(event_id, ticket_type_id)}")
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if fence:
+                await self._check_fence(pipe, fence)
+            pipe.delete(*keys)
+            log_key = self._get_log_key(event_id)
+            pipe.xadd(log_key, {"op": "delete", "t": "*", "r": 0, "by": ""})
+            pipe.publish(log_key, "*")
+            deleted, _, _ = await self._execute_fenced(pipe, fence)
+
+        return deleted
+
+    @staticmethod
+    async def _check_fence(pipe, fence: tuple[str, int]) -> None:
+        """WATCH the fencing counter and start the transaction if it still matches."""
+        fence_key, token = fence
+        await pipe.watch(fence_key)
+        current = await pipe.get(fence_key)
+        if int(current or 0) != token:
+            await pipe.reset()
+            raise LockError(f"Stale fencing token {token} for {fence_key} (now {current})")
+        pipe.multi()
+
+    @staticmethod
+    async def _execute_fenced(pipe, fence: Optional[tuple[str, int]]) -> list:
+        try:
+            return await pipe.execute()
+        except WatchError:
+            raise LockError(f"Fencing token superseded during write: {fence[0]}")
+
+    async def migrate_legacy_inventory(self, batch_size: int = 500) -> int:
+        """
+        Move per-ticket-type string counters into the per-event hashes.
+
+        Scans for keys written before the hash layout and folds each one into
+        the matching event hash; fields that already exist in a hash
+        win over the legacy value. Safe to run repeatedly and while serving
+        traffic.
+
+        Args:
+            batch_size: Legacy keys moved per script call
+
+        Returns:
+            Number of legacy keys migrated
+        """
+        migrated = 0
+        batch: list[str] = []
+
+        async def flush() -> int:
+            keys = []
+            fields = []
+            for legacy_key in batch:
+                parts = legacy_key.split(":")
+                event_id, ticket_type_id = parts[2], parts[4]
+                keys.extend([legacy_key, self._get_event_key(event_id)])
+                fields.append(ticket_type_id)
+            batch.clear()
+            return await MIGRATE_SCRIPT(self.redis, keys, fields)
+
+        async for key in self.redis.scan_iter(match=LEGACY_KEY_PATTERN, count=batch_size):
+            parts = key.split(":")
+            if len(parts) != 5:
+                continue
+            batch.append(key)
+            if len(batch) >= batch_size:
+                migrated += await flush()
+
+        if batch:
+            migrated += await flush()
+
+        logger.info(f"Migrated legacy inventory keys: {migrated}")
+        return migrated
+
 
 async def create_ticket_reservation(
     redis: Redis, event_id: str, ticket_type_id: str, quantity: int, user_id: str
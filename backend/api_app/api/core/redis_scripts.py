@@ -0,0 +1,100 @@
+"""Registry of the app's Redis Lua scripts, called by SHA.
+
+Every atomic operation registers its script once at import time:
+
+    RELEASE_LOCK_SCRIPT = scripts.register("lock.release", SOURCE, version=1)
+    await RELEASE_LOCK_SCRIPT(redis, keys=[...], args=[...])
+
+Calls use EVALSHA, so only the 40-byte SHA goes over the wire. The scripts
+are loaded with SCRIPT LOAD when the app connects to Redis (`load_all`);
+if the server lost its script cache (restart, failover, SCRIPT FLUSH) the
+call gets NOSCRIPT, loads the script and retries once.
+
+Bump `version` whenever a script's behaviour changes, so the name@version
+in logs and `scripts/test_redis_scripts.py` identify the script that ran.
+
+Monitoring:
+    # Check which scripts the server has cached (1 = loaded)
+    docker exec redis-stack redis-cli SCRIPT EXISTS SHA [SHA ...]
+"""
+
+import hashlib
+from typing import Any, Iterator, Sequence
+
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
+from loguru import logger
+
+
+class RedisScript:
+    """One Lua script, called by its SHA."""
+
+    def __init__(self, name: str, source: str, version: int = 1):
+        self.name = name
+        self.source = source
+        self.version = version
+        self.sha = hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+    def __repr__(self) -> str:
+        return f"<RedisScript {self.name}@{self.version} {self.sha[:8]}>"
+
+    async def __call__(
+        self, redis: Redis, keys: Sequence[str] = (), args: Sequence[Any] = ()
+    ) -> Any:
+        try:
+            return await redis.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            logger.info(f"Reloading Redis script after NOSCRIPT: {self!r}")
+            await self.load(redis)
+            return await redis.evalsha(self.sha, len(keys), *keys, *args)
+
+    async def load(self, redis: Redis) -> str:
+        sha = await redis.script_load(self.source)
+        if sha != self.sha:
+            raise RuntimeError(f"Redis returned SHA {sha} for {self!r}")
+        return sha
+
+
+class ScriptRegistry:
+    def __init__(self):
+        self._scripts: dict[str, RedisScript] = {}
+
+    def register(self, name: str, source: str, version: int = 1) -> RedisScript:
+        """
+        Add a script under a unique name.
+
+        Raises:
+            ValueError: If the name is taken by a different script
+        """
+        script = RedisScript(name, source, version)
+        existing = self._scripts.get(name)
+        if existing and existing.sha != script.sha:
+            raise ValueError(f"Redis script name already registered: {existing!r}")
+        self._scripts[name] = script
+        return script
+
+    def get(self, name: str) -> RedisScript:
+        return self._scripts[name]
+
+    def __iter__(self) -> Iterator[RedisScript]:
+        return iter(self._scripts.values())
+
+    def __len__(self) -> int:
+        return len(self._scripts)
+
+    async def load_all(self, redis: Redis) -> dict[str, str]:
+        """
+        SCRIPT LOAD every registered script.
+
+        Returns:
+            name@version -> SHA
+        """
+        loaded = {}
+        for script in self:
+            loaded[f"{script.name}@{script.version}"] = await script.load(redis)
+        logger.info(f"Loaded {len(loaded)} Redis scripts")
+        return loaded
+
+
+# Global script registry
+scripts = ScriptRegistry()
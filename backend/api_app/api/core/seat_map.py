@@ -0,0 +1,106 @@
+"""Seat numbering of reserved-seating ticket types.
+
+A ticket type with a `seat_map` is sold seat by seat. Its seats are kept
+in one Redis bitmap (see `TicketInventory.claim_seats`), one bit per seat,
+1 when taken. Seats are numbered section by section, row by row, so seat
+`i` is bit `i`; a 50,000 seat stadium is a 6.25 KB value read in one GET.
+
+Seat labels are SECTION-ROW-SEAT, rows and seats counted from 1:
+"A-3-12" is section A, row 3, seat 12.
+"""
+
+from typing import Iterable, Optional
+
+
+class SeatLayout:
+    def __init__(self, sections: Iterable[dict]):
+        self.sections: list[tuple[str, int, int, int]] = []
+        self._by_name: dict[str, tuple[int, int, int]] = {}
+        offset = 0
+        for section in sections:
+            name, rows, per_row = section["name"], section["rows"], section["seats_per_row"]
+            self.sections.append((name, rows, per_row, offset))
+            self._by_name[name] = (rows, per_row, offset)
+            offset += rows * per_row
+        self.capacity = offset
+
+    def index(self, label: str) -> int:
+        """
+        Bit of a seat label.
+
+        Raises:
+            ValueError: the label is malformed or not in the layout
+        """
+        try:
+            name, row, seat = label.rsplit("-", 2)
+            rows, per_row, offset = self._by_name[name]
+            row, seat = int(row), int(seat)
+        except (ValueError, KeyError):
+            raise ValueError(f"Unknown seat: {label}")
+        if not (1 <= row <= rows and 1 <= seat <= per_row):
+            raise ValueError(f"Unknown seat: {label}")
+        return offset + (row - 1) * per_row + seat - 1
+
+    def label(self, index: int) -> str:
+        for name, rows, per_row, offset in self.sections:
+            if index < offset + rows * per_row:
+                row, seat = divmod(index - offset, per_row)
+                return f"{name}-{row + 1}-{seat + 1}"
+        raise ValueError(f"Seat index out of range: {index}")
+
+    def bits(self, bitmap: Optional[bytes]) -> str:
+        """The bitmap as a string of "0" (free) and "1" (taken), one per seat."""
+        if not bitmap:
+            return "0" * self.capacity
+        bits = bin(int.from_bytes(bitmap, "big"))[2:].zfill(len(bitmap) * 8)
+        return bits[: self.capacity].ljust(self.capacity, "0")
+
+    def best_seats(self, bits: str, quantity: int) -> Optional[list[int]]:
+        """
+        Best block of `quantity` adjacent free seats in one row.
+
+        Sections are tried in their listed order and rows front to back; the
+        first row with room wins, taking the block closest to its centre.
+
+        Returns:
+            Seat indexes, or None if no row has room
+        """
+        block = "0" * quantity
+        for _, rows, per_row, offset in self.sections:
+            if quantity > per_row:
+                continue
+            centre = (per_row - quantity) / 2
+            for row in range(rows):
+                start = offset + row * per_row
+                line = bits[start : start + per_row]
+                best = None
+                position = line.find(block)
+                while position != -1:
+                    if best is None or abs(position - centre) < abs(best - centre):
+                        best = position
+                    position = line.find(block, position + 1)
+                if best is not None:
+                    return list(range(start + best, start + best + quantity))
+        return None
+
+    def summary(self, bits: str, detail: bool = False) -> list[dict]:
+        """
+        Free seats per section; with `detail`, each row as a string of
+        "0" (free) and "1" (taken), seat 1 first.
+        """
+        sections = []
+        for name, rows, per_row, offset in self.sections:
+            seats = bits[offset : offset + rows * per_row]
+            section = {
+                "section": name,
+                "rows": rows,
+                "seats_per_row": per_row,
+                "capacity": rows * per_row,
+                "available": seats.count("0"),
+            }
+            if detail:
+                section["seat_rows"] = [
+                    seats[row * per_row : (row + 1) * per_row] for row in range(rows)
+                ]
+            sections.append(section)
+        return sections
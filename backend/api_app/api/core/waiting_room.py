@@ -0,0 +1,282 @@
+"""Virtual waiting room for flash-sale events.
+
+An event with `waiting_room_rate` > 0 only sells to buyers admitted from its
+queue. Buyers join the queue and poll their status; buyers are admitted in
+join order at `waiting_room_rate` per second. An admitted buyer gets an
+admission token, valid for WAITING_ROOM_PASS_TTL_SECONDS, which
+/tickets/book, /tickets/cart/book and /tickets/holds require in the
+`Waiting-Room-Token` header: the bare token, or "EVENT_ID:TOKEN" pairs
+separated by commas for a cart spanning several waiting rooms. A token is
+used up by the booking or hold it admitted.
+
+Admission is computed lazily: every join or status poll runs one script
+that moves the admission cursor forward by rate x elapsed time. No
+background job is needed, and the rate holds across all API processes.
+
+The rates live in RATES_KEY. Its "*" field marks that it holds every
+event's rate; when it is missing (e.g. Redis restarted) the rates are
+reloaded from MongoDB before admission is checked, so no waiting room is
+skipped.
+
+Keys per event:
+    waitroom:EVENT_ID            hash: seq (last position handed out),
+                                 admitted (positions admitted so far),
+                                 last (epoch ms the cursor last moved)
+    waitroom:EVENT_ID:queue      sorted set of user_id by position
+    waitroom:EVENT_ID:pass:USER  admission token
+
+Monitoring:
+    # Rates of the events with a waiting room
+    docker exec redis-stack redis-cli HGETALL "waitroom:rates"
+
+    # Queue length and admission cursor of an event
+    docker exec redis-stack redis-cli HGETALL "waitroom:EVENT_ID"
+"""
+
+import math
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from redis.asyncio import Redis
+from loguru import logger
+
+from .config import settings
+from .redis_scripts import scripts
+
+# Hash of event_id -> admissions per second, for events with a waiting room.
+RATES_KEY = "waitroom:rates"
+# Field of RATES_KEY set once the hash was loaded with every event's rate.
+RATES_LOADED_FIELD = "*"
+
+# Returns event_id -> rate of every event with a waiting room
+RateLoader = Callable[[], Awaitable[dict[str, int]]]
+
+
+def parse_tokens(header: Optional[str]) -> dict[str, str]:
+    """
+    Read a `Waiting-Room-Token` header.
+
+    Returns:
+        event_id -> admission token; a bare token is stored under "*" and
+        stands for any event
+    """
+    tokens = {}
+    for part in (header or "").split(","):
+        event_id, _, token = part.strip().rpartition(":")
+        if token:
+            tokens[event_id or "*"] = token
+    return tokens
+
+
+# Hand out a queue position (when joining) and move the admission cursor.
+# KEYS[1] = event state hash, KEYS[2] = event queue
+# ARGV[1] = user ID, ARGV[2] = now (epoch ms), ARGV[3] = admissions per second,
+# ARGV[4] = "1" to join the queue, ARGV[5] = TTL of the queue keys (s)
+# Returns {position or 0 if not queued, positions admitted so far}.
+# An idle room keeps one admission ready, never a backlog for a later crowd.
+ADVANCE_SCRIPT = scripts.register(
+    "waitroom.advance",
+    """
+local now = tonumber(ARGV[2])
+local rate = tonumber(ARGV[3])
+local interval = math.ceil(1000 / rate)
+local state = redis.call("hmget", KEYS[1], "seq", "admitted", "last")
+local seq = tonumber(state[1]) or 0
+local admitted = tonumber(state[2]) or 0
+local last = tonumber(state[3]) or (now - interval)
+if admitted >= seq then
+    -- Nobody waiting: at most one admission is ready for the next buyer
+    last = math.max(last, now - interval)
+end
+local position = tonumber(redis.call("zscore", KEYS[2], ARGV[1]))
+if not position and ARGV[4] == "1" then
+    position = redis.call("hincrby", KEYS[1], "seq", 1)
+    redis.call("zadd", KEYS[2], position, ARGV[1])
+    seq = position
+end
+local grant = math.min(math.floor((now - last) * rate / 1000), seq - admitted)
+if grant > 0 then
+    admitted = admitted + grant
+    last = last + math.floor(grant * 1000 / rate)
+end
+redis.call("hset", KEYS[1], "admitted", admitted, "last", last)
+redis.call("expire", KEYS[1], ARGV[5])
+redis.call("expire", KEYS[2], ARGV[5])
+return {position or 0, admitted}
+""",
+)
+
+
+class WaitingRoom:
+    def __init__(self, redis: Redis, loader: Optional[RateLoader] = None):
+        self.redis = redis
+        self.loader = loader
+
+    def _get_state_key(self, event_id: str) -> str:
+        return f"waitroom:{event_id}"
+
+    def _get_queue_key(self, event_id: str) -> str:
+        return f"waitroom:{event_id}:queue"
+
+    def _get_pass_key(self, event_id: str, user_id: str) -> str:
+        return f"waitroom:{event_id}:pass:{user_id}"
+
+    async def set_rate(self, event_id: str, rate: int) -> None:
+        """Turn an event's waiting room on (rate > 0) or off."""
+        if rate > 0:
+            await self.redis.hset(RATES_KEY, event_id, rate)
+        else:
+            await self.redis.hdel(RATES_KEY, event_id)
+
+    async def get_rate(self, event_id: str) -> int:
+        return (await self.get_rates([event_id]))[event_id]
+
+    async def get_rates(self, event_ids: list[str]) -> dict[str, int]:
+        """
+        Waiting room rates of several events, 0 for events without one.
+
+        Rates are reloaded through `loader` when RATES_KEY was lost.
+        """
+        loaded, *rates = await self.redis.hmget(
+            RATES_KEY, [RATES_LOADED_FIELD, *event_ids]
+        )
+        if loaded or not self.loader:
+            return {
+                event_id: int(rate or 0) for event_id, rate in zip(event_ids, rates)
+            }
+
+        all_rates = await self.loader()
+        await self.redis.hset(RATES_KEY, mapping={**all_rates, RATES_LOADED_FIELD: 1})
+        logger.info(f"Waiting room rates reloaded: {len(all_rates)} events")
+        return {event_id: all_rates.get(event_id, 0) for event_id in event_ids}
+
+    async def join(self, event_id: str, user_id: str, rate: int) -> dict:
+        """
+        Queue the user for an event, or return their current place.
+
+        `rate` comes from the event document, so the waiting room keeps
+        working if its entry in RATES_KEY was lost.
+        """
+        await self.set_rate(event_id, rate)
+        return await self._status(event_id, user_id, rate, join=True)
+
+    async def get_status(self, event_id: str, user_id: str) -> dict:
+        """
+        Position, ETA and, once admitted, the admission token of a user.
+        """
+        rate = await self.get_rate(event_id)
+        return await self._status(event_id, user_id, rate, join=False)
+
+    async def require_admission(
+        self, event_ids: list[str], user_id: str, token: Optional[str]
+    ) -> list[str]:
+        """
+        Check that the user was admitted to every event that has a waiting room.
+
+        Args:
+            token: `Waiting-Room-Token` header (see `parse_tokens`)
+
+        Returns:
+            The events with a waiting room, whose admission the booking
+            uses up (`consume_admission`) once it succeeds
+
+        Raises:
+            HTTPException: 403 naming the first event without admission
+        """
+        event_ids = list(dict.fromkeys(event_ids))
+        rates = await self.get_rates(event_ids)
+        gated = [event_id for event_id in event_ids if rates[event_id] > 0]
+        if not gated:
+            return []
+
+        tokens = parse_tokens(token)
+        passes = await self.redis.mget(
+            [self._get_pass_key(event_id, user_id) for event_id in gated]
+        )
+        for event_id, admission in zip(gated, passes):
+            expected = tokens.get(event_id, tokens.get("*"))
+            if not expected or admission != expected:
+                raise HTTPException(
+                    403,
+                    detail={
+                        "message": "Waiting room admission required",
+                        "event_id": event_id,
+                    },
+                )
+        return gated
+
+    async def consume_admission(self, event_ids: list[str], user_id: str) -> None:
+        """Use up the user's admission to events, once a booking went through."""
+        if event_ids:
+            await self.redis.delete(
+                *(self._get_pass_key(event_id, user_id) for event_id in event_ids)
+            )
+
+    async def _status(
+        self, event_id: str, user_id: str, rate: int, join: bool
+    ) -> dict:
+        status = {
+            "event_id": event_id,
+            "enabled": rate > 0,
+            "admitted": rate <= 0,
+            "queued": False,
+            "position": 0,
+            "eta_seconds": 0,
+            "admission_token": None,
+            "token_expires_in": None,
+        }
+        if rate <= 0:
+            return status
+
+        pass_key = self._get_pass_key(event_id, user_id)
+        admission = await self._get_admission(pass_key)
+        if admission:
+            return {**status, **admission}
+
+        position, admitted = await ADVANCE_SCRIPT(
+            self.redis,
+            keys=[self._get_state_key(event_id), self._get_queue_key(event_id)],
+            args=[
+                user_id,
+                int(time.time() * 1000),
+                rate,
+                "1" if join else "0",
+                settings.WAITING_ROOM_QUEUE_TTL_SECONDS,
+            ],
+        )
+        if not position:
+            return status
+
+        ahead = position - admitted
+        if ahead > 0:
+            return {
+                **status,
+                "queued": True,
+                "position": ahead,
+                "eta_seconds": math.ceil(ahead / rate),
+            }
+
+        # Admitted: swap the queue entry for an admission token
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(
+                pass_key,
+                uuid.uuid4().hex,
+                ex=settings.WAITING_ROOM_PASS_TTL_SECONDS,
+                nx=True,
+            )
+            pipe.zrem(self._get_queue_key(event_id), user_id)
+            await pipe.execute()
+        logger.info(f"Waiting room admitted: event={event_id}, user={user_id}")
+
+        return {**status, **(await self._get_admission(pass_key))}
+
+    async def _get_admission(self, pass_key: str) -> Optional[dict]:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(pass_key)
+            pipe.ttl(pass_key)
+            token, ttl = await pipe.execute()
+        if not token:
+            return None
+        return {"admitted": True, "admission_token": token, "token_expires_in": ttl}
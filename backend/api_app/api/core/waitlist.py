@@ -0,0 +1,250 @@
+"""Per-ticket-type waitlist, served when stock comes back.
+
+A buyer who finds a ticket type sold out joins its waitlist instead of
+retrying. When stock is returned (a release, a failed booking, an expired
+hold) the waitlist is served in join order: the first buyer gets a hold on
+the tickets they asked for, valid WAITLIST_OFFER_TTL_SECONDS, and the
+worker notifies them. They confirm it like any hold
+(/tickets/holds/{hold_id}/confirm); if they don't, the hold expires and
+its stock goes to the next buyer.
+
+Serving is strictly in order: if the first buyer wants more tickets than
+are free, later buyers wait too.
+
+Keys per ticket type (EVENT_ID:TICKET_TYPE_ID):
+    waitlist:EVENT_ID:TICKET_TYPE_ID          sorted set of user_id by join order
+    waitlist:EVENT_ID:TICKET_TYPE_ID:entries  hash of user_id -> requested item JSON
+    waitlist:EVENT_ID:TICKET_TYPE_ID:offer:USER  hold_id offered to the user
+
+Monitoring:
+    # Ticket types with a non-empty waitlist
+    docker exec redis-stack redis-cli SMEMBERS "waitlist:active"
+
+    # Users waiting for a ticket type, in order
+    docker exec redis-stack redis-cli ZRANGE "waitlist:EVENT_ID:TICKET_TYPE_ID" 0 -1
+"""
+
+import asyncio
+import json
+from typing import Optional
+
+from redis.asyncio import Redis
+from loguru import logger
+
+from .config import settings
+from .redis_lock import RedisLock, TicketInventory
+
+# Set of "event_id:ticket_type_id" with someone waiting.
+ACTIVE_KEY = "waitlist:active"
+# Join order counter shared by all waitlists.
+SEQUENCE_KEY = "waitlist:seq"
+# Topic the worker publishes offers to.
+OFFER_TOPIC = "waitlist-offers"
+
+# Allocation tasks started by releases in this process.
+_allocations: set[asyncio.Task] = set()
+
+
+class Waitlist:
+    def __init__(self, redis: Redis, inventory: Optional[TicketInventory] = None):
+        self.redis = redis
+        self.inventory = inventory or TicketInventory(redis)
+
+    def _get_queue_key(self, event_id: str, ticket_type_id: str) -> str:
+        return f"waitlist:{event_id}:{ticket_type_id}"
+
+    def _get_entries_key(self, event_id: str, ticket_type_id: str) -> str:
+        return f"waitlist:{event_id}:{ticket_type_id}:entries"
+
+    def _get_offer_key(self, event_id: str, ticket_type_id: str, user_id: str) -> str:
+        return f"waitlist:{event_id}:{ticket_type_id}:offer:{user_id}"
+
+    async def join(self, item: dict, user: dict) -> dict:
+        """
+        Add a user to a ticket type's waitlist; joining again keeps the place
+        but updates the request.
+
+        Args:
+            item: Priced cart item (event_id, ticket_type_id, quantity, ...)
+            user: user_id plus the contact details used for the offer
+
+        Returns:
+            The user's waitlist status
+        """
+        event_id, ticket_type_id = item["event_id"], item["ticket_type_id"]
+        queue_key = self._get_queue_key(event_id, ticket_type_id)
+
+        position = await self.redis.incr(SEQUENCE_KEY)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zadd(queue_key, {user["user_id"]: position}, nx=True)
+            pipe.hset(
+                self._get_entries_key(event_id, ticket_type_id),
+                user["user_id"],
+                json.dumps({"item": item, "user": user}),
+            )
+            pipe.sadd(ACTIVE_KEY, f"{event_id}:{ticket_type_id}")
+            await pipe.execute()
+
+        logger.info(
+            f"Waitlist joined: event={event_id}, ticket={ticket_type_id}, "
+            f"user={user['user_id']}, quantity={item['quantity']}"
+        )
+        # Stock may have come back between the sold-out answer and the join
+        self.schedule([(event_id, ticket_type_id)])
+        return await self.get_status(event_id, ticket_type_id, user["user_id"])
+
+    async def leave(self, event_id: str, ticket_type_id: str, user_id: str) -> bool:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(self._get_queue_key(event_id, ticket_type_id), user_id)
+            pipe.hdel(self._get_entries_key(event_id, ticket_type_id), user_id)
+            removed, _ = await pipe.execute()
+        return bool(removed)
+
+    async def get_status(self, event_id: str, ticket_type_id: str, user_id: str) -> dict:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrank(self._get_queue_key(event_id, ticket_type_id), user_id)
+            pipe.get(self._get_offer_key(event_id, ticket_type_id, user_id))
+            rank, hold_id = await pipe.execute()
+
+        return {
+            "event_id": event_id,
+            "ticket_type_id": ticket_type_id,
+            "waiting": rank is not None,
+            "position": rank + 1 if rank is not None else None,
+            "offered_hold_id": hold_id,
+        }
+
+    async def wake(self, pairs: list[tuple[str, str]]) -> None:
+        """Serve the waitlists of ticket types whose stock was just returned."""
+        fields = list(dict.fromkeys(f"{e}:{t}" for e, t in pairs))
+        if not fields:
+            return
+        active = await self.redis.smismember(ACTIVE_KEY, fields)
+        self.schedule(
+            [tuple(field.split(":", 1)) for field, on in zip(fields, active) if on]
+        )
+
+    def schedule(self, pairs: list[tuple[str, str]]) -> None:
+        """Serve waitlists in the background, without delaying the caller."""
+        for event_id, ticket_type_id in pairs:
+            task = asyncio.create_task(self.allocate(event_id, ticket_type_id))
+            _allocations.add(task)
+            task.add_done_callback(_allocations.discard)
+
+    async def allocate_all(self) -> int:
+        """Serve every waitlist; run periodically to catch missed wake-ups."""
+        offered = 0
+        for field in await self.redis.smembers(ACTIVE_KEY):
+            event_id, ticket_type_id = field.split(":", 1)
+            offered += await self.allocate(event_id, ticket_type_id)
+        return offered
+
+    async def allocate(self, event_id: str, ticket_type_id: str) -> int:
+        """
+        Offer returned stock to the waitlist, first come first served.
+
+        One allocator runs per ticket type. Every wake-up first sets a rerun
+        flag, then tries the lock: the holder clears the flag before each
+        pass and checks it again after releasing the lock, so stock returned
+        during or right after a run is not left waiting for the periodic job.
+
+        Returns:
+            Number of offers made
+        """
+        name = f"waitlist:{event_id}:{ticket_type_id}"
+        rerun_key = f"{name}:rerun"
+        offered = 0
+
+        while True:
+            await self.redis.set(rerun_key, 1, ex=30)
+            lock = RedisLock(self.redis, name, timeout=30)
+            if not await lock.acquire(blocking=False):
+                return offered
+
+            try:
+                while await self.redis.getdel(rerun_key):
+                    offered += await self._allocate(event_id, ticket_type_id)
+            except Exception as e:
+                logger.error(f"Waitlist allocation failed for {name}: {e}")
+                return offered
+            finally:
+                await lock.release()
+
+            # A wake-up between the last pass and the release
+            if not await self.redis.exists(rerun_key):
+                return offered
+
+    async def _allocate(self, event_id: str, ticket_type_id: str) -> int:
+        queue_key = self._get_queue_key(event_id, ticket_type_id)
+        entries_key = self._get_entries_key(event_id, ticket_type_id)
+        offered = 0
+
+        while True:
+            head = await self.redis.zrange(queue_key, 0, 0)
+            if not head:
+                await self.redis.srem(ACTIVE_KEY, f"{event_id}:{ticket_type_id}")
+                return offered
+
+            user_id = head[0]
+            entry = await self.redis.hget(entries_key, user_id)
+            if not entry:
+                await self.redis.zrem(queue_key, user_id)
+                continue
+
+            entry = json.loads(entry)
+            item = entry["item"]
+            result = await self.inventory.create_hold(
+                [(event_id, ticket_type_id, item["quantity"])],
+                user_id,
+                ttl=settings.WAITLIST_OFFER_TTL_SECONDS,
+                details={"items": [item], "waitlist": True},
+            )
+
+            if not result["success"] and result["status"] in (
+                "insufficient",
+                "not_initialized",
+                "invalid",
+            ):
+                # Not enough stock for the first in line yet
+                return offered
+
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.zrem(queue_key, user_id)
+                pipe.hdel(entries_key, user_id)
+                if result["success"]:
+                    pipe.set(
+                        self._get_offer_key(event_id, ticket_type_id, user_id),
+                        result["hold_id"],
+                        ex=settings.WAITLIST_OFFER_TTL_SECONDS,
+                    )
+                await pipe.execute()
+
+            if not result["success"]:
+                # Booking closed, ticket type gone or the user's purchase cap
+                # reached: this entry can never be served
+                logger.info(
+                    f"Waitlist entry dropped ({result['status']}): "
+                    f"event={event_id}, ticket={ticket_type_id}, user={user_id}"
+                )
+                continue
+
+            offered += 1
+            await self._notify(entry, result)
+
+    async def _notify(self, entry: dict, result: dict) -> None:
+        """Hand the offer to the worker, which publishes it on OFFER_TOPIC."""
+        from ...workers.redis_worker import RedisWorker
+
+        await RedisWorker(self.redis).enqueue_task(
+            "notify_waitlist_offer",
+            {
+                **entry["user"],
+                **entry["item"],
+                "hold_id": result["hold_id"],
+                "expires_at": result["expires_at"],
+            },
+        )
+        logger.info(
+            f"Waitlist offer: hold={result['hold_id']}, user={entry['user']['user_id']}, "
+            f"event={entry['item']['event_id']}, ticket={entry['item']['ticket_type_id']}"
+        )
@@ -41,6 +41,21 @@ async def get_event_by_id(
     return event
 
 
+@router.get("/{event_id}/availability/stream")
+async def stream_event_availability(
+    event_id: str,
+    request: Request,
+    service: EventService = Depends(EventService),
+):
+    """
+    Live remaining tickets per ticket type, as server-sent events.
+
+    Use instead of polling the event: the first message lists every ticket
+    type, later ones the ticket types that changed since the previous one.
+    """
+    return await service.stream_availability(event_id, request)
+
+
 @router.get("")
 async def get_events(
     params: Params = Depends(),
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from pydantic import BaseModel, Field
 from typing import Optional
 
 from api_app import models, schemas
 from api_app.services.ticket_booking_service import TicketBookingService
+from api_app.services.inventory_reconciliation_service import (
+    InventoryReconciliationService,
+)
 from api_app.api.core import dependencies
+from api_app.api.core.config import settings
 from api_app.api.core.redis import get_redis
+from api_app.api.core.idempotency import IdempotencyStore
+from api_app.api.core.inventory_engine import get_inventory_redis
 from redis.asyncio import Redis
-from api_app.api.utils.google import pubsub_client
 from datetime import datetime
 from bson import ObjectId
 
@@ -20,39 +25,195 @@ router = APIRouter(prefix="/tickets", tags=["tickets"])
 @router.post("/book")
 async def book_tickets(
     booking: schemas.TicketBooking,
+    response: Response,
     current_user: models.User = Depends(dependencies.get_current_user),
-    redis: Redis = Depends(get_redis),
+    redis: Optional[Redis] = Depends(get_inventory_redis),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    admission_token: Optional[str] = Header(None, alias="Waiting-Room-Token"),
 ):
+    """
+    Book tickets of one type.
+
+    Send an `Idempotency-Key` header to make retries safe: a repeated key
+    returns the first response instead of booking again.
+
+    Events with a waiting room also need the admission token from
+    /waiting-room/{event_id} in the `Waiting-Room-Token` header.
+    """
     service = TicketBookingService(redis)
-    result = await service.book_tickets(
-        booking=booking,
-        user=current_user,
+    result, replayed = await IdempotencyStore(redis).run(
+        scope=str(current_user.id),
+        key=idempotency_key,
+        fingerprint=IdempotencyStore.fingerprint(["book", booking]),
+        handler=lambda: service.book_tickets(
+            booking=booking, user=current_user, admission_token=admission_token
+        ),
     )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
 
-    booking_details = result.get("booking_details", {})
-
-    payload = {
-        "event_name": booking_details.get("event_name", ""),
-        "event_id": booking.event_id,
-        "ticket_id": booking_details.get("ticket_id", ""),
-        "ticket_type_name": booking.ticket_type_name,
-        "quantity": booking.quantity,
-        "total_price": booking.total_price,
-        "price_per_ticket": booking.price_per_ticket,
-        "first_name": current_user.first_name,
-        "last_name": current_user.last_name,
-        "email": current_user.email,
-    }
-    try:
-        msg_id = pubsub_client.publish_message(
-            topic_name="ticket-bookings",
-            data=payload,
-        )
-    except Exception as e:
-        print(f"Failed to publish message to Pub/Sub: {str(e)}")
+
+@router.post("/cart/book")
+async def book_cart(
+    cart: schemas.CartBooking,
+    response: Response,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    redis: Optional[Redis] = Depends(get_inventory_redis),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    admission_token: Optional[str] = Header(None, alias="Waiting-Room-Token"),
+):
+    """
+    Book several ticket types in one all-or-nothing request.
+
+    Accepts `Idempotency-Key` and `Waiting-Room-Token` headers like
+    /tickets/book. A cart spanning several waiting rooms sends one
+    "EVENT_ID:TOKEN" pair per event in the header, separated by commas.
+    """
+    service = TicketBookingService(redis)
+    result, replayed = await IdempotencyStore(redis).run(
+        scope=str(current_user.id),
+        key=idempotency_key,
+        fingerprint=IdempotencyStore.fingerprint(["cart", cart]),
+        handler=lambda: service.book_cart(
+            cart=cart, user=current_user, admission_token=admission_token
+        ),
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+@router.post("/holds")
+async def hold_tickets(
+    cart: schemas.CartBooking,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    redis: Optional[Redis] = Depends(get_inventory_redis),
+    admission_token: Optional[str] = Header(None, alias="Waiting-Room-Token"),
+):
+    """
+    Hold tickets for checkout. The hold expires unless it is confirmed.
+    """
+    service = TicketBookingService(redis)
+    return await service.hold_cart(
+        cart=cart, user=current_user, admission_token=admission_token
+    )
+
+
+@router.post("/holds/{hold_id}/confirm")
+async def confirm_hold(
+    hold_id: str,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    redis: Optional[Redis] = Depends(get_inventory_redis),
+):
+    """
+    Turn a live hold into booked tickets.
+    """
+    service = TicketBookingService(redis)
+    result = await service.confirm_hold(hold_id=hold_id, user=current_user)
     return result
 
 
+@router.delete("/holds/{hold_id}")
+async def release_hold(
+    hold_id: str,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    redis: Optional[Redis] = Depends(get_inventory_redis),
+):
+    """
+    Give held tickets back before the hold expires.
+    """
+    service = TicketBookingService(redis)
+    return await service.release_hold(hold_id=hold_id, user=current_user)
+
+
+@router.post("/cancel/{ticket_id}")
+async def cancel_ticket(
+    ticket_id: str,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    redis: Optional[Redis] = Depends(get_inventory_redis),
+):
+    """
+    Cancel a booked ticket before its event starts and refund its price.
+    """
+    service = TicketBookingService(redis)
+    return await service.cancel_ticket(ticket_id, current_user)
+
+
+@router.post("/cancel-event/{event_id}")
+async def cancel_event_tickets(
+    event_id: str,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    redis: Optional[Redis] = Depends(get_inventory_redis),
+):
+    """
+    Cancel an event: close its sales for good, release its holds, and cancel
+    and refund every booked ticket.
+
+    Only the event's organizer or an admin may do this.
+    """
+    service = TicketBookingService(redis)
+    return await service.cancel_event_tickets(event_id, current_user)
+
+
+@router.get("/seats/{event_id}/{ticket_type_id}")
+async def get_seat_availability(
+    event_id: str,
+    ticket_type_id: str,
+    detail: bool = False,
+    redis: Optional[Redis] = Depends(get_inventory_redis),
+):
+    """
+    Free seats per section of a reserved-seating ticket type.
+
+    With `detail=true` every row is listed as a string of "0" (free) and
+    "1" (taken), seat 1 first.
+    """
+    service = TicketBookingService(redis)
+    return await service.get_seat_availability(event_id, ticket_type_id, detail)
+
+
+@router.post("/waitlist")
+async def join_waitlist(
+    item: schemas.CartItem,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    redis: Optional[Redis] = Depends(get_inventory_redis),
+):
+    """
+    Wait for a sold-out ticket type instead of retrying the booking.
+
+    When tickets come back the first user in line gets them as a hold,
+    is notified, and confirms it through /tickets/holds/{hold_id}/confirm.
+    """
+    service = TicketBookingService(redis)
+    return await service.join_waitlist(item=item, user=current_user)
+
+
+@router.get("/waitlist/{event_id}/{ticket_type_id}")
+async def get_waitlist_status(
+    event_id: str,
+    ticket_type_id: str,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    redis: Optional[Redis] = Depends(get_inventory_redis),
+):
+    """
+    Position in the waitlist, or the hold offered once it is the user's turn.
+    """
+    service = TicketBookingService(redis)
+    return await service.get_waitlist_status(event_id, ticket_type_id, current_user)
+
+
+@router.delete("/waitlist/{event_id}/{ticket_type_id}")
+async def leave_waitlist(
+    event_id: str,
+    ticket_type_id: str,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    redis: Optional[Redis] = Depends(get_inventory_redis),
+):
+    service = TicketBookingService(redis)
+    return await service.leave_waitlist(event_id, ticket_type_id, current_user)
+
+
 @router.post("/sync/{event_id}")
 async def sync_inventory(
     event_id: str,
@@ -82,6 +243,32 @@ async def check_sync_status(
     return await service.check_inventory_sync(event_id)
 
 
+@router.post("/reconcile")
+async def reconcile_inventory(
+    max_events: int = Query(..., ge=1, le=settings.RECONCILE_MAX_EVENTS),
+    repair: bool = False,
+    start_after: Optional[str] = None,
+    current_user: models.User = Depends(dependencies.get_current_active_superuser),
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Check up to `max_events` events' stock against their bookings in bulk.
+
+    Admins only. With `repair=true` the drift found is corrected; while
+    another repairing run is in progress the call returns `skipped: true`.
+    A run also stops after RECONCILE_TIME_BUDGET_SECONDS; pass the returned
+    `next_cursor` as `start_after` to continue.
+    """
+    service = InventoryReconciliationService(redis)
+    return await service.reconcile(
+        repair=repair,
+        batch_size=settings.RECONCILE_BATCH_SIZE,
+        time_budget=settings.RECONCILE_TIME_BUDGET_SECONDS,
+        max_events=max_events,
+        start_after=start_after,
+    )
+
+
 @router.post("/check-in/{ticket_id}")
 async def check_in_ticket(
     ticket_id: str,
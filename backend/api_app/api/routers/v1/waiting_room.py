@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends
+from redis.asyncio import Redis
+
+from api_app import models
+from api_app.services import EventService
+from ...core import dependencies
+from ...core.redis import get_redis
+from ...core.waiting_room import WaitingRoom
+
+
+router = APIRouter(prefix="/waiting-room", tags=["waiting-room"])
+
+
+@router.post("/{event_id}/join")
+async def join_waiting_room(
+    event_id: str,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    service: EventService = Depends(EventService),
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Queue for an event's sale. Joining again keeps the current place.
+
+    Returns the position, ETA and, once admitted, the admission token.
+    Events without a waiting room report `admitted: true` right away.
+    """
+    event = await service.get_event_by_id(event_id)
+    return await WaitingRoom(redis).join(
+        str(event.id), str(current_user.id), event.waiting_room_rate
+    )
+
+
+@router.get("/{event_id}")
+async def get_waiting_room_status(
+    event_id: str,
+    current_user: models.User = Depends(dependencies.get_current_user),
+    service: EventService = Depends(EventService),
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Poll the position and ETA in an event's queue.
+
+    `admission_token` is set once the user is admitted; send it as the
+    `Waiting-Room-Token` header when booking, or as "EVENT_ID:TOKEN" pairs
+    separated by commas when a cart spans several waiting rooms. Each token
+    admits one booking or hold.
+    """
+    return await WaitingRoom(redis, loader=service.get_waiting_room_rates).get_status(
+        event_id, str(current_user.id)
+    )
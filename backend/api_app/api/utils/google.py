@@ -1,3 +1,4 @@
+import asyncio
 import json
 from google.cloud import pubsub_v1
 from api_app.api.core.config import settings
@@ -31,4 +32,49 @@ class GooglePubSubClient:
             raise e
 
 
+class PubSubBackend:
+    """
+    AsyncPublisher backend on the Pub/Sub client's own batching.
+
+    Publish futures are completed from the client's threads and handed back
+    to the event loop, so nothing here blocks.
+    """
+
+    def __init__(self, client: GooglePubSubClient):
+        self.client = client
+
+    async def publish_batch(self, topic_name: str, messages: list[dict]) -> list:
+        if not self.client.publisher:
+            error = RuntimeError("Publisher not initialized")
+            return [error] * len(messages)
+
+        loop = asyncio.get_running_loop()
+        topic_path = self.client.publisher.topic_path(self.client.project_id, topic_name)
+        futures = [
+            self._bridge(
+                loop,
+                self.client.publisher.publish(
+                    topic_path, data=json.dumps(message).encode("utf-8")
+                ),
+            )
+            for message in messages
+        ]
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    def _bridge(self, loop: asyncio.AbstractEventLoop, future) -> asyncio.Future:
+        result = loop.create_future()
+
+        def resolve(done):
+            if result.done():
+                return
+            error = done.exception()
+            if error:
+                result.set_exception(error)
+            else:
+                result.set_result(done.result())
+
+        future.add_done_callback(lambda done: loop.call_soon_threadsafe(resolve, done))
+        return result
+
+
 pubsub_client = GooglePubSubClient()
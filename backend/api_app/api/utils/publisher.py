@@ -0,0 +1,231 @@
+"""
+Async batched message publisher.
+
+Messages go into a bounded in-process queue and a background task flushes
+them to the backend in batches, so callers never wait on the network.
+When the queue is full, `publish` waits for space and `publish_nowait`
+raises `PublisherOverloaded`; both are counted in `metrics()`.
+
+Backends:
+    PubSubBackend    Google Pub/Sub (see api/utils/google.py)
+    InMemoryBackend  keeps messages in a list, for tests and local runs
+    FileBackend      appends JSON lines to a file
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Protocol
+
+from loguru import logger
+
+
+class PublisherOverloaded(Exception):
+    """The publish queue is full."""
+
+
+class PublisherBackend(Protocol):
+    async def publish_batch(self, topic: str, messages: list[dict]) -> list[Any]:
+        """
+        Publish messages to one topic.
+
+        Returns one entry per message: the message ID, or the exception
+        that message failed with.
+        """
+        ...
+
+
+class InMemoryBackend:
+    def __init__(self):
+        self.messages: list[tuple[str, dict]] = []
+
+    async def publish_batch(self, topic: str, messages: list[dict]) -> list[Any]:
+        self.messages.extend((topic, message) for message in messages)
+        return [uuid.uuid4().hex for _ in messages]
+
+
+class FileBackend:
+    def __init__(self, path: str):
+        self.path = Path(path)
+
+    async def publish_batch(self, topic: str, messages: list[dict]) -> list[Any]:
+        message_ids = [uuid.uuid4().hex for _ in messages]
+        lines = "".join(
+            json.dumps({"id": message_id, "topic": topic, "data": message}) + "\n"
+            for message_id, message in zip(message_ids, messages)
+        )
+        await asyncio.to_thread(self._append, lines)
+        return message_ids
+
+    def _append(self, lines: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class AsyncPublisher:
+    def __init__(
+        self,
+        backend: PublisherBackend,
+        max_queue: int = 1000,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+    ):
+        self.backend = backend
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._stats = {
+            "enqueued": 0,
+            "published": 0,
+            "failed": 0,
+            "rejected": 0,
+            "waited": 0,
+            "batches": 0,
+            "high_water": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    async def start(self) -> None:
+        if self._task and not self._task.done():
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush what is queued, then stop the background task."""
+        if not self._task:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def publish(self, topic: str, data: dict) -> asyncio.Future:
+        """
+        Queue a message, waiting for space if the queue is full.
+
+        Returns a future that resolves to the message ID once the batch
+        holding the message has been flushed.
+        """
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        if self._queue.full():
+            self._stats["waited"] += 1
+        await self._queue.put((topic, data, future))
+        self._enqueued()
+        return future
+
+    def publish_nowait(self, topic: str, data: dict) -> asyncio.Future:
+        """Queue a message, raising PublisherOverloaded if the queue is full."""
+        if not self._task or self._task.done():
+            raise RuntimeError("Publisher not started")
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((topic, data, future))
+        except asyncio.QueueFull:
+            self._stats["rejected"] += 1
+            raise PublisherOverloaded(f"Publish queue full ({self.max_queue})")
+        self._enqueued()
+        return future
+
+    def metrics(self) -> dict:
+        queued = self._queue.qsize() if self._queue else 0
+        return {
+            **self._stats,
+            "queued": queued,
+            "max_queue": self.max_queue,
+            "utilization": round(queued / self.max_queue, 3),
+        }
+
+    def _enqueued(self) -> None:
+        self._stats["enqueued"] += 1
+        self._stats["high_water"] = max(
+            self._stats["high_water"], self._queue.qsize()
+        )
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: list[tuple[str, dict, asyncio.Future]]) -> None:
+        started = time.perf_counter()
+        by_topic: dict[str, list[tuple[dict, asyncio.Future]]] = {}
+        for topic, data, future in batch:
+            by_topic.setdefault(topic, []).append((data, future))
+
+        for topic, entries in by_topic.items():
+            try:
+                results = await self.backend.publish_batch(
+                    topic, [data for data, _ in entries]
+                )
+            except Exception as e:
+                logger.error(f"Publish to {topic} failed: {str(e)}")
+                results = [e] * len(entries)
+
+            for (_, future), result in zip(entries, results):
+                if isinstance(result, Exception):
+                    self._stats["failed"] += 1
+                    if not future.done():
+                        future.set_exception(result)
+                else:
+                    self._stats["published"] += 1
+                    if not future.done():
+                        future.set_result(result)
+
+        self._stats["batches"] += 1
+        self._stats["last_batch_size"] = len(batch)
+        self._stats["last_flush_ms"] = round(
+            (time.perf_counter() - started) * 1000, 2
+        )
+
+
+def create_backend(settings) -> PublisherBackend:
+    if settings.PUBLISHER_BACKEND == "memory":
+        return InMemoryBackend()
+    if settings.PUBLISHER_BACKEND == "file":
+        return FileBackend(settings.PUBLISHER_FILE_PATH)
+
+    from .google import PubSubBackend, pubsub_client
+
+    return PubSubBackend(pubsub_client)
+
+
+_publisher: AsyncPublisher | None = None
+
+
+def get_publisher() -> AsyncPublisher:
+    global _publisher
+    if _publisher is None:
+        from ..core.config import settings
+
+        _publisher = AsyncPublisher(
+            create_backend(settings),
+            max_queue=settings.PUBLISHER_QUEUE_SIZE,
+            batch_size=settings.PUBLISHER_BATCH_SIZE,
+            flush_interval=settings.PUBLISHER_FLUSH_INTERVAL_MS / 1000,
+        )
+    return _publisher
@@ -8,6 +8,8 @@ Usage:
 """
 import asyncio
 from api_app.api.core.redis import redis_client
+from api_app.api.core.app_settings import get_app_settings
+from api_app.models import init_beanie
 from api_app.workers.redis_worker import RedisWorker
 from loguru import logger
 from dotenv import load_dotenv
@@ -23,14 +25,15 @@ async def main():
     logger.info("Starting Redis Worker...")
 
     try:
-        # Connect to Redis
+        # Connect to Redis and MongoDB
         redis = await redis_client.connect()
+        await init_beanie(get_app_settings())
 
         # Create worker instance
         worker = RedisWorker(redis)
 
-        # Start processing tasks
-        await worker.process_tasks()
+        # Process tasks and relay booking outbox messages
+        await asyncio.gather(worker.process_tasks(), worker.relay_outbox())
 
     except KeyboardInterrupt:
         logger.info("Worker stopped by user")
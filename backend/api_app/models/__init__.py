@@ -2,6 +2,9 @@ from .user_model import User
 from .event_model import Event
 from .user_ticket_model import UserTicket
 from .image_model import Image
+from .credit_ledger_model import CreditLedgerEntry, CreditSnapshot
+from .outbox_model import OutboxMessage
+from .inventory_log_model import InventoryLogEntry
 
 import sys
 from typing import Sequence, Type, TypeVar
@@ -50,9 +53,36 @@ class BeanieClient:
             # recreate_views=True,
         )
 
+    async def run_in_transaction(self, callback):
+        """
+        Run `callback(session)` inside one MongoDB transaction.
+
+        Transient errors such as write conflicts retry the whole callback,
+        so it must not have side effects outside the session.
+        """
+        async with await self.client.start_session() as session:
+            return await session.with_transaction(callback)
+
+    async def run_in_snapshot(self, callback):
+        """
+        Run `callback(session)` with every read made through the session
+        seeing the same point in time, so reads of several collections
+        agree with each other.
+        """
+        async with await self.client.start_session(snapshot=True) as session:
+            return await callback(session)
+
 
 async def init_beanie(settings):
     await beanie_client.init_beanie(settings)
 
 
+async def run_in_transaction(callback):
+    return await beanie_client.run_in_transaction(callback)
+
+
+async def run_in_snapshot(callback):
+    return await beanie_client.run_in_snapshot(callback)
+
+
 beanie_client = BeanieClient()
@@ -0,0 +1,38 @@
+import datetime
+from typing import Optional
+
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+import pymongo
+
+
+class CreditLedgerEntry(Document):
+    user_id: PydanticObjectId
+    amount: int
+    balance_after: int
+    reason: str
+    reference: Optional[str] = None
+    created_date: datetime.datetime = Field(default_factory=datetime.datetime.now)
+
+    class Settings:
+        name = "credit_ledger"
+        indexes = [
+            [("user_id", pymongo.ASCENDING), ("created_date", pymongo.DESCENDING)],
+            [("created_date", pymongo.ASCENDING)],
+        ]
+
+
+class CreditSnapshot(Document):
+    user_id: PydanticObjectId
+    balance: int
+    last_entry_id: PydanticObjectId
+    entries: int
+    as_of: datetime.datetime
+    created_date: datetime.datetime = Field(default_factory=datetime.datetime.now)
+
+    class Settings:
+        name = "credit_snapshots"
+        indexes = [
+            [("user_id", pymongo.ASCENDING), ("as_of", pymongo.DESCENDING)],
+            [("as_of", pymongo.DESCENDING)],
+        ]
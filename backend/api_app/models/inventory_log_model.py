@@ -0,0 +1,33 @@
+import datetime
+from typing import Optional
+
+from beanie import Document
+from pydantic import Field
+import pymongo
+
+
+class InventoryLogEntry(Document):
+    event_id: str
+    entry_id: str
+    entry_ms: int
+    entry_seq: int
+    ticket_type_id: str
+    op: str
+    delta: Optional[int] = None
+    total: int
+    by: str = ""
+    created_date: datetime.datetime = Field(default_factory=datetime.datetime.now)
+
+    class Settings:
+        name = "inventory_log"
+        indexes = [
+            # Copying the same stream entry twice is a no-op
+            pymongo.IndexModel(
+                [
+                    ("event_id", pymongo.ASCENDING),
+                    ("entry_ms", pymongo.ASCENDING),
+                    ("entry_seq", pymongo.ASCENDING),
+                ],
+                unique=True,
+            ),
+        ]
@@ -0,0 +1,25 @@
+import datetime
+from typing import Optional
+
+from beanie import Document
+from pydantic import Field
+import pymongo
+
+
+class OutboxMessage(Document):
+    topic: str
+    payload: dict
+    status: str = Field(default="pending")  # pending, delivered, failed
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = None
+    claim_id: Optional[str] = None
+    available_at: datetime.datetime = Field(default_factory=datetime.datetime.now)
+    delivered_date: Optional[datetime.datetime] = None
+    created_date: datetime.datetime = Field(default_factory=datetime.datetime.now)
+
+    class Settings:
+        name = "outbox"
+        indexes = [
+            [("status", pymongo.ASCENDING), ("available_at", pymongo.ASCENDING)],
+            [("claim_id", pymongo.ASCENDING)],
+        ]
@@ -12,6 +12,7 @@ class UserTicket(Document):
     ticket_type_id: str
     ticket_name: str
     quantity: int
+    seats: list[str] = Field(default_factory=list)
     price_per_ticket: int
     total_price: int
     event_start_date: datetime.datetime
@@ -19,6 +20,7 @@ class UserTicket(Document):
     purchase_date: datetime.datetime = Field(default_factory=datetime.datetime.now)
     is_checked_in: bool = Field(default=False)
     checked_in_date: Optional[datetime.datetime] = Field(default=None)
+    cancelled_date: Optional[datetime.datetime] = Field(default=None)
     status: str = Field(default="active")
 
     class Settings:
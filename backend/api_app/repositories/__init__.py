@@ -4,6 +4,9 @@ from .event_repo import EventRepository
 from .ticket_repo import TicketRepository
 from .user_ticket_repo import UserTicketRepository
 from .image_repo import ImageRepository
+from .credit_ledger_repo import CreditLedgerRepository
+from .outbox_repo import OutboxRepository
+from .inventory_log_repo import InventoryLogRepository
 
 
 __all__ = [
@@ -13,4 +16,7 @@ __all__ = [
     "TicketRepository",
     "UserTicketRepository",
     "ImageRepository",
+    "CreditLedgerRepository",
+    "OutboxRepository",
+    "InventoryLogRepository",
 ]
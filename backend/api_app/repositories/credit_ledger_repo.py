@@ -0,0 +1,232 @@
+import datetime
+
+from bson import ObjectId
+from beanie import Document
+
+from .. import models
+from .base_repo import BaseRepository
+from api_app.api.core.exceptions import ValidationError
+
+from loguru import logger
+from ..utils.schema import PydanticObjectId
+
+
+class CreditLedgerRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(models.CreditLedgerEntry)
+
+    async def append(
+        self,
+        user_id: str | ObjectId,
+        amount: int,
+        balance_after: int,
+        reason: str,
+        reference: str | None = None,
+        session=None,
+    ) -> Document:
+        entry = self.model(
+            user_id=PydanticObjectId(user_id),
+            amount=amount,
+            balance_after=balance_after,
+            reason=reason,
+            reference=reference,
+        )
+        await entry.insert(session=session)
+        return entry
+
+    async def append_many(
+        self,
+        entries: list[tuple[str | ObjectId, int, int, str, str | None]],
+        session=None,
+    ) -> list[Document]:
+        """
+        Record several (user_id, amount, balance_after, reason, reference)
+        entries in one insert.
+        """
+        documents = [
+            self.model(
+                user_id=PydanticObjectId(user_id),
+                amount=amount,
+                balance_after=balance_after,
+                reason=reason,
+                reference=reference,
+            )
+            for user_id, amount, balance_after, reason, reference in entries
+        ]
+        if documents:
+            await self.model.insert_many(documents, session=session)
+        return documents
+
+    async def get_user_entries(
+        self, user_id: str, limit: int = 50
+    ) -> list[Document]:
+        if not ObjectId.is_valid(user_id):
+            raise ValidationError("Invalid ObjectId")
+
+        return (
+            await self.model.find(self.model.user_id == PydanticObjectId(user_id))
+            .sort(-self.model.created_date)
+            .limit(limit)
+            .to_list()
+        )
+
+    async def take_snapshots(
+        self, overlap: datetime.timedelta = datetime.timedelta(minutes=5)
+    ) -> list[PydanticObjectId]:
+        """
+        Record the latest balance of every user whose ledger moved since the
+        previous snapshot run, using one aggregation per collection and one
+        insert.
+
+        `created_date` is set before the entry's transaction commits, so an
+        entry can appear with a date before the previous run. Each run looks
+        `overlap` further back, which must exceed the longest transaction,
+        and skips users whose latest entry is already snapshotted.
+
+        Returns:
+            IDs of the users snapshotted
+        """
+        last = (
+            await models.CreditSnapshot.find()
+            .sort(-models.CreditSnapshot.as_of)
+            .limit(1)
+            .to_list()
+        )
+        since = last[0].as_of - overlap if last else datetime.datetime.min
+
+        pipeline = [
+            {"$match": {"created_date": {"$gt": since}}},
+            {"$sort": {"created_date": 1, "_id": 1}},
+            {
+                "$group": {
+                    "_id": "$user_id",
+                    "balance": {"$last": "$balance_after"},
+                    "last_entry_id": {"$last": "$_id"},
+                    "as_of": {"$last": "$created_date"},
+                    "entries": {"$sum": 1},
+                }
+            },
+        ]
+        rows = await self.model.aggregate(pipeline).to_list()
+        if not rows:
+            return []
+
+        latest = await self._get_latest_snapshots([row["_id"] for row in rows])
+        rows = [
+            row
+            for row in rows
+            if row["_id"] not in latest
+            or latest[row["_id"]]["last_entry_id"] != row["last_entry_id"]
+        ]
+        if not rows:
+            return []
+
+        await models.CreditSnapshot.insert_many(
+            [
+                models.CreditSnapshot(
+                    user_id=row["_id"],
+                    balance=row["balance"],
+                    last_entry_id=row["last_entry_id"],
+                    entries=row["entries"],
+                    as_of=row["as_of"],
+                )
+                for row in rows
+            ]
+        )
+        logger.info(f"Credit snapshots taken: {len(rows)}")
+        return [row["_id"] for row in rows]
+
+    async def verify_balances(self, user_ids: list[PydanticObjectId]) -> list[dict]:
+        """
+        Check users' credit against their latest snapshot plus the ledger
+        entries after it, all read from one MongoDB snapshot.
+
+        Users without a snapshot are skipped: their opening balance is not
+        in the ledger.
+
+        Returns:
+            One record per user whose credit differs from the ledger
+        """
+        if not user_ids:
+            return []
+
+        async def read(session):
+            latest = await self._get_latest_snapshots(user_ids, session)
+            if not latest:
+                return {}, {}, {}
+
+            pipeline = [
+                {
+                    "$match": {
+                        "$or": [
+                            {
+                                "user_id": user_id,
+                                "created_date": {"$gt": snapshot["as_of"]},
+                            }
+                            for user_id, snapshot in latest.items()
+                        ]
+                    }
+                },
+                {"$group": {"_id": "$user_id", "amount": {"$sum": "$amount"}}},
+            ]
+            since = {
+                row["_id"]: row["amount"]
+                for row in await self.model.get_motor_collection()
+                .aggregate(pipeline, session=session)
+                .to_list(None)
+            }
+            credits = {
+                user["_id"]: user.get("credit", 0)
+                async for user in models.User.get_motor_collection().find(
+                    {"_id": {"$in": list(latest)}},
+                    projection={"credit": 1},
+                    session=session,
+                )
+            }
+            return latest, since, credits
+
+        latest, since, credits = await models.run_in_snapshot(read)
+
+        mismatches = []
+        for user_id, snapshot in latest.items():
+            expected = snapshot["balance"] + since.get(user_id, 0)
+            credit = credits.get(user_id)
+            if credit is not None and credit != expected:
+                mismatches.append(
+                    {
+                        "user_id": str(user_id),
+                        "credit": credit,
+                        "expected": expected,
+                        "snapshot_balance": snapshot["balance"],
+                        "snapshot_as_of": snapshot["as_of"],
+                    }
+                )
+        for mismatch in mismatches:
+            logger.warning(
+                f"Credit differs from ledger: user={mismatch['user_id']}, "
+                f"credit={mismatch['credit']}, expected={mismatch['expected']}"
+            )
+        return mismatches
+
+    async def _get_latest_snapshots(
+        self, user_ids: list[PydanticObjectId], session=None
+    ) -> dict[PydanticObjectId, dict]:
+        """user_id -> latest snapshot (balance, last_entry_id, as_of)."""
+        pipeline = [
+            {"$match": {"user_id": {"$in": user_ids}}},
+            {"$sort": {"as_of": -1}},
+            {
+                "$group": {
+                    "_id": "$user_id",
+                    "balance": {"$first": "$balance"},
+                    "last_entry_id": {"$first": "$last_entry_id"},
+                    "as_of": {"$first": "$as_of"},
+                }
+            },
+        ]
+        rows = (
+            await models.CreditSnapshot.get_motor_collection()
+            .aggregate(pipeline, session=session)
+            .to_list(None)
+        )
+        return {row["_id"]: row for row in rows}
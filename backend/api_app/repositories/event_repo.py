@@ -1,9 +1,14 @@
+import datetime
+
 from bson import ObjectId
 from beanie import Document
+from beanie.operators import In
+from pymongo import ReturnDocument, UpdateOne
 
 from .. import models, schemas
 from .base_repo import BaseRepository
 from api_app.api.core.exceptions import ValidationError
+from api_app.api.core.redis_lock import LockError
 
 from loguru import logger
 from ..utils.schema import PydanticObjectId
@@ -11,10 +16,103 @@ from fastapi_pagination.ext.beanie import paginate as beanie_paginate
 from fastapi_pagination import Page, Params
 
 
+# Fencing token of the last event-lock holder that wrote the event.
+WRITE_FENCE_FIELD = "write_fence"
+
+
 class EventRepository(BaseRepository):
     def __init__(self):
         super().__init__(models.Event)
 
+    async def update_fenced(
+        self, event_id: str, schema: schemas.EventUpdate, token: int
+    ) -> Document:
+        """
+        Update an event like `update`, under the event lock's fencing token.
+
+        The write only lands if no holder with a newer token wrote the event
+        first, so a holder whose lock expired cannot overwrite its successor.
+
+        Raises:
+            LockError: A newer lock holder already wrote the event
+        """
+        item = await self.get_by_id(event_id)
+        result = await self.model.find_one(
+            {"_id": item.id, **self._fence_filter(token)}
+        ).update({"$set": {**self.dump_schema(schema), WRITE_FENCE_FIELD: token}})
+        if not result.matched_count:
+            raise LockError(f"Stale fencing token {token} for event {event_id}")
+        return await self.get_by_id(event_id)
+
+    async def delete_fenced(self, event_id: str, token: int) -> Document:
+        """
+        Delete an event like `delete_by_id`, under the event lock's fencing token.
+
+        Raises:
+            LockError: A newer lock holder already wrote the event
+        """
+        item = await self.get_by_id(event_id)
+        result = await self.model.get_motor_collection().delete_one(
+            {"_id": item.id, **self._fence_filter(token)}
+        )
+        if not result.deleted_count:
+            raise LockError(f"Stale fencing token {token} for event {event_id}")
+        return item
+
+    async def mark_cancelled(
+        self,
+        event_id: str,
+        booking_end_date: datetime.datetime,
+        token: int | None = None,
+    ) -> Document:
+        """
+        Flag an event cancelled and end its booking window.
+
+        Booking transactions decrement `remaining` only on events that are
+        not cancelled, so one still running when this lands conflicts with
+        it and retries into the refusal (bookings on the MongoDB-only engine
+        just read the flag). With the event lock's `token` the write is
+        fenced like `update_fenced`.
+
+        Raises:
+            LockError: A newer lock holder already wrote the event
+        """
+        item = await self.get_by_id(event_id)
+        query = {"_id": item.id}
+        update = {"cancelled": True, "booking_end_date": booking_end_date}
+        if token is not None:
+            query.update(self._fence_filter(token))
+            update[WRITE_FENCE_FIELD] = token
+        result = await self.model.get_motor_collection().update_one(
+            query, {"$set": update}
+        )
+        if not result.matched_count:
+            raise LockError(f"Stale fencing token {token} for event {event_id}")
+        return await self.get_by_id(event_id)
+
+    async def get_cancelled_event_ids(
+        self, event_ids: list[str], session=None
+    ) -> set[str]:
+        """Return which of `event_ids` were cancelled."""
+        cursor = self.model.get_motor_collection().find(
+            {
+                "_id": {"$in": [PydanticObjectId(e) for e in event_ids]},
+                "cancelled": True,
+            },
+            projection={"_id": 1},
+            session=session,
+        )
+        return {str(event["_id"]) async for event in cursor}
+
+    @staticmethod
+    def _fence_filter(token: int) -> dict:
+        return {
+            "$or": [
+                {WRITE_FENCE_FIELD: {"$exists": False}},
+                {WRITE_FENCE_FIELD: {"$lte": token}},
+            ]
+        }
+
     async def get_event_by_id(self, event_id: str) -> Document:
         if not ObjectId.is_valid(event_id):
             raise ValidationError("Invalid ObjectId")
@@ -23,3 +121,218 @@ class EventRepository(BaseRepository):
         if not item:
             raise ValidationError(f"ObjectId('{event_id}') not found")
         return item
+
+    async def get_events_by_ids(self, event_ids: list[str]) -> list[Document]:
+        for event_id in event_ids:
+            if not ObjectId.is_valid(event_id):
+                raise ValidationError("Invalid ObjectId")
+
+        return await self.model.find(
+            In(self.model.id, [PydanticObjectId(e) for e in event_ids])
+        ).to_list()
+
+    async def decrement_ticket_remaining(
+        self, event_id: str, ticket_type_id: str, quantity: int, session=None
+    ) -> dict | None:
+        """
+        Atomically take `quantity` from one ticket type's `remaining`, only
+        if that many are left.
+
+        Returns the event's name and dates from the same write, or None if
+        the event or ticket type does not exist, is short of stock, or the
+        event was cancelled.
+        """
+        if not ObjectId.is_valid(event_id):
+            raise ValidationError("Invalid ObjectId")
+
+        return await self.model.get_motor_collection().find_one_and_update(
+            *self._remaining_update(
+                event_id, ticket_type_id, -quantity, require_stock=True
+            ),
+            projection={"name": 1, "start_date": 1, "end_date": 1},
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+
+    async def get_event_summary(self, event_id: str, session=None) -> dict | None:
+        """Read an event's name and dates for a ticket; None once it was cancelled."""
+        if not ObjectId.is_valid(event_id):
+            raise ValidationError("Invalid ObjectId")
+
+        return await self.model.get_motor_collection().find_one(
+            {"_id": PydanticObjectId(event_id), "cancelled": {"$ne": True}},
+            projection={"name": 1, "start_date": 1, "end_date": 1},
+            session=session,
+        )
+
+    async def get_waiting_room_rates(self) -> dict[str, int]:
+        """Read event_id -> waiting_room_rate of every event with a waiting room."""
+        cursor = self.model.get_motor_collection().find(
+            {"waiting_room_rate": {"$gt": 0}}, projection={"waiting_room_rate": 1}
+        )
+        return {str(event["_id"]): event["waiting_room_rate"] async for event in cursor}
+
+    async def get_ticket_catalog(
+        self, event_ids: list[str]
+    ) -> dict[str, dict[str, dict]]:
+        """
+        Read the ticket types (name, price, seat map) of several events in
+        one query, used to fill the ticket catalog cache.
+
+        Returns:
+            event_id -> (ticket_type_id -> {"name", "price", "seat_map"}); unknown
+            events are absent
+        """
+        ids = [PydanticObjectId(e) for e in event_ids if ObjectId.is_valid(e)]
+        if not ids:
+            return {}
+
+        cursor = self.model.get_motor_collection().find(
+            {"_id": {"$in": ids}},
+            projection={
+                "ticket_types.ticket_id": 1,
+                "ticket_types.name": 1,
+                "ticket_types.price": 1,
+                "ticket_types.seat_map": 1,
+            },
+        )
+        return {
+            str(event["_id"]): {
+                ticket_type["ticket_id"]: {
+                    "name": ticket_type["name"],
+                    "price": ticket_type["price"],
+                    "seat_map": ticket_type.get("seat_map"),
+                }
+                for ticket_type in event.get("ticket_types", [])
+            }
+            async for event in cursor
+        }
+
+    async def bulk_decrement_remaining(
+        self, sales: list[tuple[str, str, int]], session=None
+    ) -> int:
+        """
+        Decrement `remaining` for (event_id, ticket_type_id, quantity) in one
+        write. Items without enough stock left, or of a cancelled event, are
+        not changed, so a result below len(sales) means the sale must not go
+        ahead.
+        """
+        operations = [
+            UpdateOne(
+                *self._remaining_update(
+                    event_id, ticket_id, -quantity, require_stock=True
+                )
+            )
+            for event_id, ticket_id, quantity in sales
+        ]
+        result = await self.model.get_motor_collection().bulk_write(
+            operations, ordered=False, session=session
+        )
+        return result.modified_count
+
+    async def bulk_adjust_remaining(
+        self, adjustments: list[tuple[str, str, int]], session=None
+    ) -> int:
+        """Add signed (event_id, ticket_type_id, delta) to `remaining` in one write."""
+        if not adjustments:
+            return 0
+
+        operations = [
+            UpdateOne(*self._remaining_update(event_id, ticket_id, delta))
+            for event_id, ticket_id, delta in adjustments
+        ]
+        result = await self.model.get_motor_collection().bulk_write(
+            operations, ordered=False, session=session
+        )
+        return result.modified_count
+
+    async def get_inventory_remaining(
+        self, event_id: str
+    ) -> tuple[
+        dict[str, int],
+        tuple[datetime.datetime, datetime.datetime],
+        tuple[int, dict[str, int]],
+    ] | None:
+        """
+        Read an event's remaining stock per ticket type, booking window and
+        purchase caps, used to hydrate Redis inventory.
+        """
+        if not ObjectId.is_valid(event_id):
+            raise ValidationError("Invalid ObjectId")
+
+        event = await self.model.get_motor_collection().find_one(
+            {"_id": PydanticObjectId(event_id)},
+            projection={
+                "booking_start_date": 1,
+                "booking_end_date": 1,
+                "max_tickets_per_user": 1,
+                "ticket_types.ticket_id": 1,
+                "ticket_types.remaining": 1,
+                "ticket_types.max_per_user": 1,
+            },
+        )
+        if not event:
+            return None
+
+        ticket_types = event.get("ticket_types", [])
+        return (
+            {
+                ticket_type["ticket_id"]: ticket_type["remaining"]
+                for ticket_type in ticket_types
+            },
+            (event["booking_start_date"], event["booking_end_date"]),
+            (
+                event.get("max_tickets_per_user", 0),
+                {
+                    ticket_type["ticket_id"]: ticket_type.get("max_per_user") or 0
+                    for ticket_type in ticket_types
+                },
+            ),
+        )
+
+    async def get_inventory_page(
+        self, after_id: str | None = None, limit: int = 200, session=None
+    ) -> list[dict]:
+        """
+        Read the ticket types of events in `_id` order, for catalog-wide scans.
+
+        Returns raw documents holding only `name` and `ticket_types`.
+        """
+        query = {}
+        if after_id:
+            query["_id"] = {"$gt": PydanticObjectId(after_id)}
+
+        cursor = (
+            self.model.get_motor_collection()
+            .find(query, projection={"name": 1, "ticket_types": 1}, session=session)
+            .sort("_id", 1)
+            .limit(limit)
+        )
+        return await cursor.to_list(None)
+
+    def _remaining_update(
+        self,
+        event_id: str,
+        ticket_type_id: str,
+        amount: int,
+        require_stock: bool = False,
+    ) -> tuple[dict, dict]:
+        """
+        Filter and positional $inc for one ticket type's `remaining`.
+
+        With `require_stock`, the filter only matches while at least -amount
+        tickets are left and the event is not cancelled.
+        """
+        if require_stock:
+            element = {"ticket_id": ticket_type_id, "remaining": {"$gte": -amount}}
+            query = {
+                "_id": PydanticObjectId(event_id),
+                "ticket_types": {"$elemMatch": element},
+                "cancelled": {"$ne": True},
+            }
+        else:
+            query = {
+                "_id": PydanticObjectId(event_id),
+                "ticket_types.ticket_id": ticket_type_id,
+            }
+        return query, {"$inc": {"ticket_types.$.remaining": amount}}
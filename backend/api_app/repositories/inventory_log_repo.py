@@ -0,0 +1,52 @@
+import datetime
+
+from pymongo.errors import BulkWriteError
+
+from .. import models
+from .base_repo import BaseRepository
+
+from loguru import logger
+
+# MongoDB duplicate key error
+DUPLICATE_KEY = 11000
+
+
+class InventoryLogRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(models.InventoryLogEntry)
+
+    async def insert_many(self, records: list[dict]) -> int:
+        """
+        Store log records copied from Redis in one unordered insert.
+
+        Records that were already copied (a flush that stopped before
+        trimming the stream) are skipped by the unique index.
+
+        Returns:
+            Number of records inserted
+        """
+        if not records:
+            return 0
+
+        now = datetime.datetime.now()
+        documents = [{**record, "created_date": now} for record in records]
+        try:
+            result = await self.model.get_motor_collection().insert_many(
+                documents, ordered=False
+            )
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error["code"] != DUPLICATE_KEY for error in errors):
+                raise
+            logger.debug(f"Inventory log records already copied: {len(errors)}")
+            return e.details.get("nInserted", 0)
+
+    async def get_entries(self, event_id: str) -> list[dict]:
+        """Every copied record of an event, oldest first."""
+        cursor = (
+            self.model.get_motor_collection()
+            .find({"event_id": event_id}, projection={"_id": 0, "created_date": 0})
+            .sort([("entry_ms", 1), ("entry_seq", 1)])
+        )
+        return await cursor.to_list(length=None)
@@ -0,0 +1,107 @@
+import datetime
+import uuid
+
+from beanie import Document
+
+from .. import models
+from .base_repo import BaseRepository
+
+from loguru import logger
+
+
+class OutboxRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(models.OutboxMessage)
+
+    async def enqueue(
+        self, topic: str, payloads: list[dict], session=None
+    ) -> list[Document]:
+        """
+        Record messages to publish once the surrounding transaction commits.
+        """
+        messages = [self.model(topic=topic, payload=payload) for payload in payloads]
+        if messages:
+            await self.model.insert_many(messages, session=session)
+        return messages
+
+    async def claim_batch(self, limit: int, lease_seconds: int) -> list[Document]:
+        """
+        Claim up to `limit` due messages for one relay.
+
+        A claim pushes `available_at` forward by `lease_seconds`, so a relay
+        that dies mid-batch only delays its messages; they are picked up
+        again when the lease runs out.
+        """
+        now = datetime.datetime.now()
+        due = (
+            await self.model.find(
+                self.model.status == "pending",
+                self.model.available_at <= now,
+            )
+            .sort(+self.model.available_at)
+            .limit(limit)
+            .to_list()
+        )
+        if not due:
+            return []
+
+        claim_id = uuid.uuid4().hex
+        await self.model.get_motor_collection().update_many(
+            {
+                "_id": {"$in": [message.id for message in due]},
+                "status": "pending",
+                "available_at": {"$lte": now},
+            },
+            {
+                "$set": {
+                    "claim_id": claim_id,
+                    "available_at": now + datetime.timedelta(seconds=lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+        )
+        return await self.model.find(self.model.claim_id == claim_id).to_list()
+
+    async def mark_delivered(self, message_ids: list) -> int:
+        if not message_ids:
+            return 0
+
+        result = await self.model.get_motor_collection().update_many(
+            {"_id": {"$in": message_ids}},
+            {
+                "$set": {
+                    "status": "delivered",
+                    "delivered_date": datetime.datetime.now(),
+                    "last_error": None,
+                }
+            },
+        )
+        return result.modified_count
+
+    async def mark_failed(self, message_ids: list, error: str, max_attempts: int) -> int:
+        """
+        Record a failed delivery. Messages stay pending and are retried when
+        their lease runs out, until `max_attempts` is reached.
+        """
+        if not message_ids:
+            return 0
+
+        result = await self.model.get_motor_collection().update_many(
+            {"_id": {"$in": message_ids}},
+            [
+                {
+                    "$set": {
+                        "last_error": error,
+                        "status": {
+                            "$cond": [
+                                {"$gte": ["$attempts", max_attempts]},
+                                "failed",
+                                "pending",
+                            ]
+                        },
+                    }
+                }
+            ],
+        )
+        logger.warning(f"Outbox delivery failed for {len(message_ids)} messages: {error}")
+        return result.modified_count
@@ -1,16 +1,22 @@
+from collections import defaultdict
+
 from bson import ObjectId
 from beanie import Document
+from pymongo import ReturnDocument, UpdateOne
 
 from .. import models, schemas
 from .base_repo import BaseRepository
+from .credit_ledger_repo import CreditLedgerRepository
 from api_app.api.core.exceptions import ValidationError
 
 from loguru import logger
+from ..utils.schema import PydanticObjectId
 
 
 class UserRepository(BaseRepository):
     def __init__(self):
         super().__init__(models.User)
+        self.ledger = CreditLedgerRepository()
 
     async def get_unique_username(self, username: str) -> Document | None:
         try:
@@ -19,3 +25,118 @@ class UserRepository(BaseRepository):
             raise ValidationError(detail="Invalid username")
 
         return item
+
+    async def debit_credit(
+        self,
+        user_id: str | ObjectId,
+        amount: int,
+        reason: str,
+        reference: str | None = None,
+        session=None,
+    ) -> int | None:
+        """
+        Take `amount` credit only if the balance covers it, in one write.
+
+        Returns:
+            The new balance, or None if the balance was too low
+        """
+        result = await self.model.get_motor_collection().find_one_and_update(
+            {"_id": PydanticObjectId(user_id), "credit": {"$gte": amount}},
+            {"$inc": {"credit": -amount}},
+            projection={"credit": 1},
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+        if result is None:
+            return None
+
+        await self.ledger.append(
+            user_id, -amount, result["credit"], reason, reference, session=session
+        )
+        return result["credit"]
+
+    async def refund_credit(
+        self,
+        user_id: str | ObjectId,
+        amount: int,
+        reason: str,
+        reference: str | None = None,
+        session=None,
+    ) -> int:
+        """
+        Give `amount` credit back in one write.
+
+        Returns:
+            The new balance
+        """
+        result = await self.model.get_motor_collection().find_one_and_update(
+            {"_id": PydanticObjectId(user_id)},
+            {"$inc": {"credit": amount}},
+            projection={"credit": 1},
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+        if result is None:
+            raise ValidationError(f"ObjectId('{user_id}') not found")
+
+        await self.ledger.append(
+            user_id, amount, result["credit"], reason, reference, session=session
+        )
+        return result["credit"]
+
+    async def bulk_refund_credit(
+        self,
+        refunds: list[tuple[str | ObjectId, int, str | None]],
+        reason: str,
+        session=None,
+    ) -> dict[str, int]:
+        """
+        Give credit back for (user_id, amount, reference) refunds with one
+        write for the balances and one for the ledger. A user with several
+        refunds gets one ledger entry per refund.
+
+        Returns:
+            user_id -> new balance
+        """
+        totals = defaultdict(int)
+        for user_id, amount, _ in refunds:
+            totals[str(user_id)] += amount
+        if not totals:
+            return {}
+
+        collection = self.model.get_motor_collection()
+        await collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": PydanticObjectId(user_id)}, {"$inc": {"credit": amount}}
+                )
+                for user_id, amount in totals.items()
+            ],
+            ordered=False,
+            session=session,
+        )
+        balances = {
+            str(user["_id"]): user["credit"]
+            async for user in collection.find(
+                {"_id": {"$in": [PydanticObjectId(u) for u in totals]}},
+                projection={"credit": 1},
+                session=session,
+            )
+        }
+
+        # Walk each user's refunds up from the balance before them
+        running = {
+            user_id: balances[user_id] - total
+            for user_id, total in totals.items()
+            if user_id in balances
+        }
+        entries = []
+        for user_id, amount, reference in refunds:
+            user_id = str(user_id)
+            if user_id not in running:
+                logger.error(f"Refund skipped, user not found: {user_id}")
+                continue
+            running[user_id] += amount
+            entries.append((user_id, amount, running[user_id], reason, reference))
+        await self.ledger.append_many(entries, session=session)
+        return balances
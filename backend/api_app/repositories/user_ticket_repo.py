@@ -1,3 +1,5 @@
+import datetime
+
 from bson import ObjectId
 from beanie import Document
 
@@ -11,6 +13,10 @@ from fastapi_pagination.ext.beanie import paginate as beanie_paginate
 from fastapi_pagination import Page, Params
 
 
+# Tickets in these statuses no longer hold stock.
+RELEASED_TICKET_STATUSES = ["cancelled", "refunded"]
+
+
 class UserTicketRepository(BaseRepository):
     def __init__(self):
         super().__init__(models.UserTicket)
@@ -61,8 +67,123 @@ class UserTicketRepository(BaseRepository):
     async def update_expired_tickets_status(self, now) -> list[Document]:
         result = await self.model.find(
             {
+                "status": {"$nin": RELEASED_TICKET_STATUSES},
                 "is_checked_in": False,
                 "event_end_date": {"$lt": now},
             }
         ).update_many({"$set": {"status": "expired"}})
         return result
+
+    async def aggregate_booked_quantities(
+        self, event_ids: list[str], session=None
+    ) -> dict[tuple[str, str], int]:
+        """
+        Sum booked quantities per ticket type for many events in one
+        server-side aggregation.
+
+        Returns:
+            (event_id, ticket_type_id) -> booked tickets
+        """
+        for event_id in event_ids:
+            if not ObjectId.is_valid(event_id):
+                raise ValidationError("Invalid ObjectId")
+
+        pipeline = [
+            {
+                "$match": {
+                    "event.$id": {"$in": [PydanticObjectId(e) for e in event_ids]},
+                    "status": {"$nin": RELEASED_TICKET_STATUSES},
+                }
+            },
+            {
+                "$group": {
+                    "_id": {
+                        "event_id": {
+                            "$getField": {
+                                "field": {"$literal": "$id"},
+                                "input": "$event",
+                            }
+                        },
+                        "ticket_type_id": "$ticket_type_id",
+                    },
+                    "booked": {"$sum": "$quantity"},
+                }
+            },
+        ]
+        rows = (
+            await self.model.get_motor_collection()
+            .aggregate(pipeline, session=session)
+            .to_list(None)
+        )
+        return {
+            (str(row["_id"]["event_id"]), row["_id"]["ticket_type_id"]): row["booked"]
+            for row in rows
+        }
+
+    async def get_taken_seats(self, event_id: str, ticket_type_id: str) -> list[str]:
+        """Labels of the seats held by live tickets of a ticket type."""
+        if not ObjectId.is_valid(event_id):
+            raise ValidationError("Invalid ObjectId")
+
+        cursor = self.model.get_motor_collection().find(
+            {
+                "event.$id": PydanticObjectId(event_id),
+                "ticket_type_id": ticket_type_id,
+                "status": {"$nin": RELEASED_TICKET_STATUSES},
+                "seats.0": {"$exists": True},
+            },
+            projection={"seats": 1},
+        )
+        return [seat async for ticket in cursor for seat in ticket["seats"]]
+
+    async def get_cancellable_tickets(
+        self,
+        event_id: str | None = None,
+        ticket_ids: list[str] | None = None,
+        after_id: ObjectId | None = None,
+        limit: int = 500,
+        session=None,
+    ) -> list[dict]:
+        """
+        Read booked tickets of an event, or by ID, in `_id` order.
+
+        Returns raw documents without the links resolved.
+        """
+        query = {"status": "booked"}
+        if event_id is not None:
+            if not ObjectId.is_valid(event_id):
+                raise ValidationError("Invalid ObjectId")
+            query["event.$id"] = PydanticObjectId(event_id)
+        if ticket_ids is not None:
+            if not all(ObjectId.is_valid(t) for t in ticket_ids):
+                raise ValidationError("Invalid ObjectId")
+            query["_id"] = {"$in": [PydanticObjectId(t) for t in ticket_ids]}
+        if after_id is not None:
+            query["_id"] = {**query.get("_id", {}), "$gt": after_id}
+
+        cursor = (
+            self.model.get_motor_collection()
+            .find(query, session=session)
+            .sort("_id", 1)
+            .limit(limit)
+        )
+        return await cursor.to_list(None)
+
+    async def mark_cancelled(self, ticket_ids: list[ObjectId], session=None) -> int:
+        """
+        Cancel booked tickets in one write.
+
+        Returns:
+            Number of tickets cancelled; tickets no longer booked are skipped
+        """
+        result = await self.model.get_motor_collection().update_many(
+            {"_id": {"$in": ticket_ids}, "status": "booked"},
+            {
+                "$set": {
+                    "status": "cancelled",
+                    "cancelled_date": datetime.datetime.now(),
+                }
+            },
+            session=session,
+        )
+        return result.modified_count
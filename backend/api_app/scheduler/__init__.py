@@ -1,4 +1,20 @@
 from .config import scheduler, setup_scheduler
-from .jobs import daily_schedule
+from .jobs import (
+    daily_schedule,
+    release_expired_holds,
+    allocate_waitlists,
+    take_credit_snapshots,
+    reconcile_inventory,
+    flush_inventory_log,
+)
 
-__all__ = ["scheduler", "setup_scheduler", "daily_schedule"]
+__all__ = [
+    "scheduler",
+    "setup_scheduler",
+    "daily_schedule",
+    "release_expired_holds",
+    "allocate_waitlists",
+    "take_credit_snapshots",
+    "reconcile_inventory",
+    "flush_inventory_log",
+]
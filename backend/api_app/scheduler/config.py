@@ -1,6 +1,8 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from loguru import logger
+from api_app.api.core.config import settings
 from . import jobs
 
 scheduler = AsyncIOScheduler()
@@ -15,6 +17,51 @@ def setup_scheduler():
         replace_existing=True,
     )
 
+    scheduler.add_job(
+        jobs.release_expired_holds,
+        IntervalTrigger(seconds=settings.HOLD_SWEEP_INTERVAL_SECONDS),
+        id="release_expired_holds",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+    scheduler.add_job(
+        jobs.allocate_waitlists,
+        IntervalTrigger(seconds=settings.WAITLIST_ALLOCATE_INTERVAL_SECONDS),
+        id="allocate_waitlists",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+    scheduler.add_job(
+        jobs.take_credit_snapshots,
+        IntervalTrigger(minutes=settings.CREDIT_SNAPSHOT_INTERVAL_MINUTES),
+        id="take_credit_snapshots",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+    scheduler.add_job(
+        jobs.reconcile_inventory,
+        IntervalTrigger(minutes=settings.RECONCILE_INTERVAL_MINUTES),
+        id="reconcile_inventory",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
+    scheduler.add_job(
+        jobs.flush_inventory_log,
+        IntervalTrigger(seconds=settings.INVENTORY_LOG_FLUSH_INTERVAL_SECONDS),
+        id="flush_inventory_log",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
     logger.info("Scheduler jobs configured")
 
     return scheduler
@@ -5,6 +5,15 @@ from beanie import PydanticObjectId
 from api_app import schemas
 from dateutil import tz
 from api_app.repositories.user_ticket_repo import UserTicketRepository
+from api_app.repositories.credit_ledger_repo import CreditLedgerRepository
+from api_app.api.core.config import settings
+from api_app.api.core.redis import redis_client
+from api_app.api.core.redis_lock import TicketInventory
+from api_app.api.core.waitlist import Waitlist
+from api_app.services.inventory_reconciliation_service import (
+    InventoryReconciliationService,
+)
+from api_app.services.inventory_log_service import InventoryLogService
 
 LOCAL_TIMEZONE = tz.gettz("Asia/Bangkok")
 
@@ -24,3 +33,66 @@ async def daily_update_expired_tickets_status(now: datetime):
         logger.info(f"Expired tickets updated: {result.modified_count}")
     except Exception as e:
         logger.error(f"Error updating expired tickets: {str(e)}")
+
+
+async def release_expired_holds():
+    try:
+        redis = await redis_client.get_client()
+        inventory = TicketInventory(redis)
+        released = await inventory.release_expired_holds(
+            batch_size=settings.HOLD_SWEEP_BATCH_SIZE
+        )
+        if released:
+            logger.info(f"Expired holds returned to stock: {released}")
+    except Exception as e:
+        logger.error(f"Error releasing expired holds: {str(e)}")
+
+
+async def allocate_waitlists():
+    try:
+        redis = await redis_client.get_client()
+        offered = await Waitlist(redis).allocate_all()
+        if offered:
+            logger.info(f"Waitlist offers made: {offered}")
+    except Exception as e:
+        logger.error(f"Error allocating waitlists: {str(e)}")
+
+
+async def take_credit_snapshots():
+    try:
+        ledger_repo = CreditLedgerRepository()
+        user_ids = await ledger_repo.take_snapshots(
+            overlap=timedelta(seconds=settings.CREDIT_SNAPSHOT_OVERLAP_SECONDS)
+        )
+        logger.info(f"Credit snapshots taken: {len(user_ids)}")
+        mismatches = await ledger_repo.verify_balances(user_ids)
+        if mismatches:
+            logger.warning(f"Credit balances differing from ledger: {len(mismatches)}")
+    except Exception as e:
+        logger.error(f"Error taking credit snapshots: {str(e)}")
+
+
+async def reconcile_inventory():
+    try:
+        redis = await redis_client.get_client()
+        service = InventoryReconciliationService(redis)
+        report = await service.run_scheduled(
+            repair=settings.RECONCILE_REPAIR,
+            batch_size=settings.RECONCILE_BATCH_SIZE,
+            time_budget=settings.RECONCILE_TIME_BUDGET_SECONDS,
+        )
+        if report["drift"]:
+            logger.warning(
+                f"Inventory drift found in {len(report['drift'])} ticket types"
+            )
+    except Exception as e:
+        logger.error(f"Error reconciling inventory: {str(e)}")
+
+
+async def flush_inventory_log():
+    try:
+        redis = await redis_client.get_client()
+        service = InventoryLogService(redis)
+        await service.flush(batch_size=settings.INVENTORY_LOG_BATCH_SIZE)
+    except Exception as e:
+        logger.error(f"Error copying inventory log: {str(e)}")
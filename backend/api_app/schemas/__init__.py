@@ -15,9 +15,12 @@ from .event_schema import (
     EventResponse,
     TicketTypeInput,
     TicketTypeDB,
+    SeatSection,
     EventBase,
     EventSearch,
     TicketBooking,
+    CartItem,
+    CartBooking,
     TicketPayloadSchema,
     EventStatsResponse,
 )
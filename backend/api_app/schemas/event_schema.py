@@ -1,16 +1,41 @@
 import datetime
 import typing as t
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from beanie import PydanticObjectId
 from typing import Optional
 import uuid
 
 
+class SeatSection(BaseModel):
+    name: str = Field(..., min_length=1, pattern=r"^[^-]+$", example="A")
+    rows: int = Field(..., ge=1, le=1000)
+    seats_per_row: int = Field(..., ge=1, le=1000)
+
+
 class TicketTypeBase(BaseModel):
     name: str
     total: int
     price: int
     remaining: int
+    seat_map: Optional[t.List[SeatSection]] = Field(
+        None,
+        description="Sections of a reserved-seating ticket type; seats are "
+        "booked by label SECTION-ROW-SEAT. Fixed once sales start.",
+    )
+    max_per_user: Optional[int] = Field(
+        None, ge=1, description="Tickets of this type one user may buy, unset for no cap"
+    )
+
+    @model_validator(mode="after")
+    def check_seat_map(self):
+        if self.seat_map:
+            names = [section.name for section in self.seat_map]
+            if len(set(names)) != len(names):
+                raise ValueError("Seat map section names must be unique")
+            seats = sum(s.rows * s.seats_per_row for s in self.seat_map)
+            if self.total != seats:
+                raise ValueError(f"total must equal the {seats} seats of the seat map")
+        return self
 
 
 class TicketTypeInput(TicketTypeBase):
@@ -32,6 +57,15 @@ class EventBase(BaseModel):
     booking_start_date: datetime.datetime
     booking_end_date: datetime.datetime
     created_by: Optional[PydanticObjectId] = None
+    waiting_room_rate: int = Field(
+        0, ge=0, description="Buyers admitted per second, 0 for no waiting room"
+    )
+    max_tickets_per_user: int = Field(
+        0, ge=0, description="Tickets one user may buy across the event, 0 for no cap"
+    )
+    cancelled: bool = Field(
+        False, description="Set when the event is cancelled; it can no longer be sold"
+    )
 
 
 class EventCreate(BaseModel):
@@ -44,6 +78,12 @@ class EventCreate(BaseModel):
     end_date: datetime.datetime
     booking_start_date: datetime.datetime
     booking_end_date: datetime.datetime
+    waiting_room_rate: int = Field(
+        0, ge=0, description="Buyers admitted per second, 0 for no waiting room"
+    )
+    max_tickets_per_user: int = Field(
+        0, ge=0, description="Tickets one user may buy across the event, 0 for no cap"
+    )
 
 
 class EventUpdate(BaseModel):
@@ -57,6 +97,8 @@ class EventUpdate(BaseModel):
     booking_start_date: Optional[datetime.datetime] = None
     booking_end_date: Optional[datetime.datetime] = None
     ticket_types: Optional[t.List[t.Union[TicketTypeInput, TicketTypeDB]]] = None
+    waiting_room_rate: Optional[int] = Field(None, ge=0)
+    max_tickets_per_user: Optional[int] = Field(None, ge=0)
 
 
 class EventResponse(EventBase):
@@ -73,13 +115,45 @@ class EventSearch(BaseModel):
 
 class TicketBooking(BaseModel):
     event_id: str = Field(..., description="Event ID")
-    ticket_type_name: str = Field(..., description="Ticket name")
+    ticket_type_name: Optional[str] = Field(
+        None, description="Ticket name (taken from the event)"
+    )
     ticket_type_id: str = Field(..., description="Ticket type ID")
     quantity: int = Field(
         ..., gt=0, le=10, description="Number of tickets (max 10 per booking)"
     )
-    price_per_ticket: int = Field(..., description="Price per ticket")
-    total_price: int = Field(..., description="Total price for the booking")
+    price_per_ticket: Optional[int] = Field(
+        None, description="Expected price per ticket, rejected if it changed"
+    )
+    total_price: Optional[int] = Field(
+        None, description="Expected total price, rejected if it changed"
+    )
+    seats: Optional[t.List[str]] = Field(
+        None,
+        max_length=10,
+        description="Seats (SECTION-ROW-SEAT) for reserved seating; the best "
+        "adjacent seats are picked when omitted",
+    )
+
+
+class CartItem(BaseModel):
+    event_id: str = Field(..., description="Event ID")
+    ticket_type_name: Optional[str] = Field(
+        None, description="Ticket name (taken from the event)"
+    )
+    ticket_type_id: str = Field(..., description="Ticket type ID")
+    quantity: int = Field(
+        ..., gt=0, le=10, description="Number of tickets (max 10 per item)"
+    )
+    price_per_ticket: Optional[int] = Field(
+        None, description="Expected price per ticket, rejected if it changed"
+    )
+
+
+class CartBooking(BaseModel):
+    items: t.List[CartItem] = Field(
+        ..., min_length=1, max_length=20, description="Ticket types to book"
+    )
 
 
 class TicketPayloadSchema(BaseModel):
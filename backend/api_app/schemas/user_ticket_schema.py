@@ -14,6 +14,7 @@ class BaseUserTicket(BaseModel):
     ticket_type_id: str
     ticket_name: str
     quantity: int
+    seats: list[str] = Field(default_factory=list)
     price_per_ticket: int
     total_price: int
     event_start_date: datetime.datetime
@@ -21,6 +22,7 @@ class BaseUserTicket(BaseModel):
     purchase_date: datetime.datetime = Field(default_factory=datetime.datetime.now)
     is_checked_in: bool = Field(default=False)
     checked_in_date: Optional[datetime.datetime] = Field(default=None)
+    cancelled_date: Optional[datetime.datetime] = Field(default=None)
     status: str = Field(default="active")
 
 
@@ -39,6 +41,7 @@ class UserTicketDetailResponse(BaseModel):
     ticket_type_id: str
     ticket_name: str
     quantity: int
+    seats: list[str] = []
     price_per_ticket: int
     total_price: int
     event_start_date: datetime.datetime
@@ -46,6 +49,7 @@ class UserTicketDetailResponse(BaseModel):
     purchase_date: datetime.datetime
     is_checked_in: bool
     checked_in_date: Optional[datetime.datetime]
+    cancelled_date: Optional[datetime.datetime] = None
     status: str
     user: Optional[schemas.User] = None
     event: Optional[schemas.EventResponse] = None
@@ -1,12 +1,19 @@
+import json
+from contextlib import asynccontextmanager
 from fastapi import (
+    HTTPException,
     Request,
 )
+from fastapi.responses import StreamingResponse
 from redis.asyncio import Redis
 from typing import Optional
 from loguru import logger
 
 from ..repositories import EventRepository
 from api_app.api.core.exceptions import ValidationError
+from api_app.api.core.catalog_cache import catalog_cache
+from api_app.api.core.availability_feed import availability_feed
+from api_app.api.core.config import settings
 
 from .. import models, schemas
 from ..services import BaseService
@@ -15,6 +22,38 @@ from fastapi_pagination.ext.beanie import paginate as beanie_paginate
 import datetime
 
 
+# Seconds an event update/delete may hold the event lock, and wait for it
+EVENT_LOCK_TIMEOUT = 10
+EVENT_LOCK_WAIT = 5.0
+
+
+@asynccontextmanager
+async def event_lock(redis: Optional[Redis], event_id: str):
+    """
+    Serialize writes to one event across processes.
+
+    Yields the held `RedisLock`, or None without Redis. Raises 409 when
+    another update of the event does not finish in time, or when the
+    lock expired before the write.
+    """
+    if not redis:
+        yield None
+        return
+
+    from ..api.core.redis_lock import LockError, RedisLock
+
+    lock = RedisLock(redis, f"event:{event_id}", timeout=EVENT_LOCK_TIMEOUT)
+    if not await lock.acquire(wait_timeout=EVENT_LOCK_WAIT):
+        raise HTTPException(409, "Event is being updated, please retry")
+    try:
+        yield lock
+    except LockError as e:
+        logger.warning(f"Event write aborted: {e}")
+        raise HTTPException(409, "Event is being updated, please retry")
+    finally:
+        await lock.release()
+
+
 class EventService(BaseService):
     def __init__(self):
         event_repository = EventRepository()
@@ -27,6 +66,42 @@ class EventService(BaseService):
         event = await self._repository.get_event_by_id(event_id)
         return event
 
+    async def get_waiting_room_rates(self) -> dict[str, int]:
+        """Rates of every event with a waiting room, to reload them into Redis."""
+        return await self._repository.get_waiting_room_rates()
+
+    async def stream_availability(
+        self, event_id: str, request: Request
+    ) -> StreamingResponse:
+        """
+        Push an event's remaining tickets per ticket type as server-sent events.
+
+        The first `availability` message is a snapshot of every ticket type;
+        later ones only list the ticket types that changed, at most once per
+        AVAILABILITY_FEED_INTERVAL_SECONDS. A comment line is sent after
+        AVAILABILITY_FEED_HEARTBEAT_SECONDS without a change, so proxies keep
+        the connection open.
+        """
+        await self._repository.get_event_by_id(event_id)
+
+        async def stream():
+            async with availability_feed.watch(event_id) as watcher:
+                while not await request.is_disconnected():
+                    update = await watcher.next(
+                        timeout=settings.AVAILABILITY_FEED_HEARTBEAT_SECONDS
+                    )
+                    if update is None:
+                        yield ": keep-alive\n\n"
+                        continue
+                    data = json.dumps({"event_id": event_id, **update})
+                    yield f"event: availability\ndata: {data}\n\n"
+
+        return StreamingResponse(
+            stream(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     async def create_event(
         self,
         event_create: schemas.EventCreate,
@@ -36,22 +111,36 @@ class EventService(BaseService):
 
         if redis:
             from ..api.core.redis_lock import TicketInventory
+            from ..api.core.waiting_room import WaitingRoom
 
             inventory = TicketInventory(redis)
+            await WaitingRoom(redis).set_rate(str(event.id), event.waiting_room_rate)
 
-            for ticket_type in event.ticket_types:
-                try:
-                    await inventory.initialize_inventory(
-                        event_id=str(event.id),
-                        ticket_type_id=ticket_type.ticket_id,
-                        total_tickets=ticket_type.remaining,
-                    )
-                    logger.info(
-                        f"Initialized inventory: event={event.id}, "
-                        f"ticket={ticket_type.ticket_id}, total={ticket_type.remaining}"
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to initialize inventory: {str(e)}")
+            try:
+                await inventory.set_event_meta(
+                    str(event.id),
+                    event.booking_start_date,
+                    event.booking_end_date,
+                    [ticket_type.ticket_id for ticket_type in event.ticket_types],
+                    user_cap=event.max_tickets_per_user,
+                    type_caps={
+                        ticket_type.ticket_id: ticket_type.max_per_user
+                        for ticket_type in event.ticket_types
+                    },
+                )
+                await inventory.initialize_event_inventory(
+                    str(event.id),
+                    {
+                        ticket_type.ticket_id: ticket_type.remaining
+                        for ticket_type in event.ticket_types
+                    },
+                )
+                logger.info(
+                    f"Initialized inventory: event={event.id}, "
+                    f"ticket_types={len(event.ticket_types)}"
+                )
+            except Exception as e:
+                logger.error(f"Failed to initialize inventory: {str(e)}")
 
         return event
 
@@ -111,67 +200,162 @@ class EventService(BaseService):
                         total=ticket.total,
                         price=ticket.price,
                         remaining=ticket.remaining,
+                        seat_map=ticket.seat_map,
+                        max_per_user=ticket.max_per_user,
                         ticket_id=str(uuid.uuid4()),
                     )
                     processed_ticket_types.append(ticket_db)
 
             event_update.ticket_types = processed_ticket_types
 
-        event = await self._repository.update(event_id, event_update)
+        async with event_lock(redis, event_id) as lock:
+            current = await self._repository.get_event_by_id(event_id)
+            if current.cancelled:
+                # Its sales must stay closed
+                raise HTTPException(409, "Event was cancelled")
+            if lock:
+                event = await self._repository.update_fenced(
+                    event_id, event_update, lock.token
+                )
+            else:
+                event = await self._repository.update(event_id, event_update)
+            await catalog_cache.invalidate(str(event.id), redis)
 
-        if redis and event_update.ticket_types is not None:
-            from ..api.core.redis_lock import TicketInventory
+            if redis and event_update.waiting_room_rate is not None:
+                from ..api.core.waiting_room import WaitingRoom
 
-            inventory = TicketInventory(redis)
+                await WaitingRoom(redis).set_rate(
+                    str(event.id), event.waiting_room_rate
+                )
+
+            if redis:
+                from ..api.core.redis_lock import TicketInventory
 
-            for ticket_type in event.ticket_types:
                 try:
-                    # Sync from database to ensure Redis matches the updated values
-                    await inventory.sync_from_database(
+                    # Booking window, ticket types and caps checked by reservations
+                    await TicketInventory(redis).set_event_meta(
+                        str(event.id),
+                        event.booking_start_date,
+                        event.booking_end_date,
+                        [ticket_type.ticket_id for ticket_type in event.ticket_types],
+                        user_cap=event.max_tickets_per_user,
+                        type_caps={
+                            ticket_type.ticket_id: ticket_type.max_per_user
+                            for ticket_type in event.ticket_types
+                        },
+                        fence=lock.fence,
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to update booking record: {str(e)}")
+
+            if redis and event_update.ticket_types is not None:
+                from ..api.core.redis_lock import TicketInventory
+
+                inventory = TicketInventory(redis)
+
+                try:
+                    # Sync from database to ensure Redis matches the updated
+                    # values, less the tickets live holds still take
+                    await inventory.sync_event_from_database(
                         event_id=str(event.id),
-                        ticket_type_id=ticket_type.ticket_id,
-                        remaining_tickets=ticket_type.remaining,
+                        remaining={
+                            ticket_type.ticket_id: ticket_type.remaining
+                            for ticket_type in event.ticket_types
+                        },
+                        fence=lock.fence,
+                        subtract_holds=True,
                     )
                     logger.info(
                         f"Synced inventory after update: event={event.id}, "
-                        f"ticket={ticket_type.ticket_id}, remaining={ticket_type.remaining}"
+                        f"ticket_types={len(event.ticket_types)}"
                     )
                 except Exception as e:
                     logger.error(f"Failed to sync inventory after update: {str(e)}")
 
         return event
 
+    async def cancel_event(
+        self,
+        event_id: str,
+        redis: Optional[Redis] = None,
+    ) -> schemas.EventResponse:
+        """
+        Mark an event cancelled and close its sales now.
+
+        The flag is what bookings and hold confirmations check when they
+        persist; the booking window also ends now, so Redis refuses new
+        reservations and holds. Unlike after an update, a failed Redis write
+        is raised, as sales would stay open there.
+        """
+        # Naive UTC, like the dates MongoDB hands back and epoch_ms expects
+        now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+        async with event_lock(redis, event_id) as lock:
+            event = await self._repository.get_event_by_id(event_id)
+            event = await self._repository.mark_cancelled(
+                event_id,
+                min(event.booking_end_date, now),
+                lock.token if lock else None,
+            )
+            await catalog_cache.invalidate(str(event.id), redis)
+
+            if redis:
+                from ..api.core.redis_lock import TicketInventory
+
+                await TicketInventory(redis).set_event_meta(
+                    str(event.id),
+                    event.booking_start_date,
+                    event.booking_end_date,
+                    [ticket_type.ticket_id for ticket_type in event.ticket_types],
+                    user_cap=event.max_tickets_per_user,
+                    type_caps={
+                        ticket_type.ticket_id: ticket_type.max_per_user
+                        for ticket_type in event.ticket_types
+                    },
+                    fence=lock.fence,
+                )
+
+        logger.info(f"Event cancelled: event={event_id}")
+        return event
+
     async def delete_event(
         self,
         event_id: str,
         redis: Optional[Redis] = None,
     ) -> dict:
-        try:
-            deleted = await self._repository.delete_by_id(event_id)
-        except ValidationError as e:
-            logger.warning(f"Failed to delete event {event_id}: {e}")
-            return {"success": False, "message": "Event not found"}
-
-        if redis:
+        async with event_lock(redis, event_id) as lock:
             try:
-                from ..api.core.redis_lock import TicketInventory
+                if lock:
+                    deleted = await self._repository.delete_fenced(
+                        event_id, lock.token
+                    )
+                else:
+                    deleted = await self._repository.delete_by_id(event_id)
+                await catalog_cache.invalidate(str(deleted.id), redis)
+            except ValidationError as e:
+                logger.warning(f"Failed to delete event {event_id}: {e}")
+                return {"success": False, "message": "Event not found"}
 
-                inventory = TicketInventory(redis)
+            if redis:
+                try:
+                    from ..api.core.redis_lock import TicketInventory
 
-                for ticket_type in getattr(deleted, "ticket_types", []) or []:
-                    ticket_type_id = getattr(ticket_type, "ticket_id", None)
-                    if not ticket_type_id:
-                        continue
+                    inventory = TicketInventory(redis)
 
-                    inventory_key = inventory._get_ticket_key(
-                        str(deleted.id), ticket_type_id
+                    ticket_type_ids = [
+                        ticket_type.ticket_id
+                        for ticket_type in getattr(deleted, "ticket_types", []) or []
+                        if getattr(ticket_type, "ticket_id", None)
+                    ]
+                    await inventory.delete_inventory(
+                        str(deleted.id), ticket_type_ids, fence=lock.fence
+                    )
+
+                    from ..api.core.waiting_room import WaitingRoom
+
+                    await WaitingRoom(redis).set_rate(str(deleted.id), 0)
+                except Exception as e:
+                    logger.error(
+                        f"Failed to cleanup Redis inventory for deleted event {event_id}: {e}"
                     )
-                    lock_key = f"lock:{inventory._get_lock_key(str(deleted.id), ticket_type_id)}"
-                    await redis.delete(inventory_key)
-                    await redis.delete(lock_key)
-            except Exception as e:
-                logger.error(
-                    f"Failed to cleanup Redis inventory for deleted event {event_id}: {e}"
-                )
 
         return {"success": True, "message": "Event deleted"}
@@ -0,0 +1,159 @@
+"""Copy of the Redis inventory change log in MongoDB, and rebuilds from it."""
+
+from redis.asyncio import Redis
+from loguru import logger
+
+from ..repositories import InventoryLogRepository
+from ..services import BaseService
+from ..api.core.inventory_log import InventoryLog, replay
+from ..api.core.redis_lock import RedisLock, TicketInventory
+from .event_service import event_lock
+
+# Streams read per XREAD call.
+READ_CHUNK = 500
+# Seconds one flush may run before another process may start one.
+FLUSH_LOCK_TIMEOUT = 60
+
+# Whether this process has looked for streams missing from the index.
+_discovered = False
+
+
+class InventoryLogService(BaseService):
+    """
+    Move inventory change log entries from Redis to MongoDB.
+
+    Entries are inserted before they are trimmed from their stream, so a
+    crash in between only copies them again, which the unique index turns
+    into a no-op. Only one process flushes at a time.
+    """
+
+    def __init__(self, redis: Redis):
+        super().__init__(InventoryLogRepository())
+        self.redis = redis
+        self.inventory = TicketInventory(redis)
+        self.log = InventoryLog(redis, self.inventory)
+
+    async def flush(self, batch_size: int = 1000) -> int:
+        """
+        Copy every event's pending log entries to MongoDB.
+
+        Args:
+            batch_size: Entries read per event and call
+
+        Returns:
+            Number of entries copied
+        """
+        global _discovered
+
+        lock = RedisLock(self.redis, "inventory-log:flush", timeout=FLUSH_LOCK_TIMEOUT)
+        if not await lock.acquire(blocking=False):
+            return 0
+
+        copied = 0
+        try:
+            if not _discovered:
+                found = await self.log.discover()
+                if found:
+                    logger.info(f"Inventory logs indexed: {found}")
+                _discovered = True
+
+            event_ids = await self.log.event_ids()
+            for i in range(0, len(event_ids), READ_CHUNK):
+                pending = event_ids[i : i + READ_CHUNK]
+                while pending:
+                    batch = await self.log.read(pending, batch_size)
+                    copied += await self._copy(batch, batch_size)
+                    # Streams that filled a batch may have more
+                    pending = [e for e, records in batch.items() if len(records) == batch_size]
+        finally:
+            await lock.release()
+
+        if copied:
+            logger.info(f"Inventory log entries copied: {copied}")
+        return copied
+
+    async def _copy(self, batch: dict[str, list[dict]], batch_size: int) -> int:
+        records = [record for records in batch.values() for record in records]
+        if not records:
+            return 0
+
+        await self._repository.insert_many(records)
+        await self.log.trim(
+            {event_id: records[-1]["entry_id"] for event_id, records in batch.items()}
+        )
+        # A deleted event's stream goes once its delete entry is copied
+        await self.log.forget(
+            [
+                event_id
+                for event_id, records in batch.items()
+                if records[-1]["op"] == "delete" and len(records) < batch_size
+            ]
+        )
+        return len(records)
+
+    async def get_entries(self, event_id: str) -> list[dict]:
+        """An event's whole log: copied records, then those still in Redis."""
+        records = await self._repository.get_entries(event_id)
+        seen = {record["entry_id"] for record in records}
+        records.extend(
+            record
+            for record in await self.log.entries(event_id)
+            if record["entry_id"] not in seen
+        )
+        records.sort(key=lambda record: (record["entry_ms"], record["entry_seq"]))
+        return records
+
+    async def rebuild(self, event_id: str, apply: bool = False) -> dict:
+        """
+        Rebuild an event's counters from its log and compare them with Redis.
+
+        Args:
+            apply: Write the rebuilt counters to Redis when they differ.
+                Ticket types the log does not know keep their Redis value.
+
+        Returns:
+            Report with the rebuilt and live counters, the ticket types that
+            differ, the log entries that do not add up and whether the
+            rebuilt counters were written
+        """
+        records = await self.get_entries(event_id)
+        remaining, mismatches = replay(records)
+        live = await self.inventory.get_event_availability(event_id)
+        report = {
+            "event_id": event_id,
+            "entries": len(records),
+            "remaining": remaining,
+            "live": live,
+            "drift": [
+                {
+                    "ticket_type_id": ticket_type_id,
+                    "log": remaining.get(ticket_type_id),
+                    "redis": live.get(ticket_type_id),
+                }
+                for ticket_type_id in sorted(set(remaining) | set(live))
+                if remaining.get(ticket_type_id) != live.get(ticket_type_id)
+            ],
+            "mismatches": mismatches,
+            "applied": False,
+        }
+
+        for mismatch in mismatches:
+            logger.warning(
+                f"Inventory log gap: event={event_id}, "
+                f"ticket={mismatch['ticket_type_id']}, entry={mismatch['entry_id']}, "
+                f"op={mismatch['op']}, expected={mismatch['expected']}, "
+                f"logged={mismatch['total']}"
+            )
+
+        if apply and report["drift"]:
+            async with event_lock(self.redis, event_id) as lock:
+                # Changes logged while waiting for the lock count too
+                remaining, _ = replay(await self.get_entries(event_id))
+                live = await self.inventory.get_event_availability(event_id)
+                await self.inventory.sync_event_from_database(
+                    event_id, {**live, **remaining}, fence=lock.fence
+                )
+            report["applied"] = True
+            logger.info(f"Inventory rebuilt from log: event={event_id}, {remaining}")
+
+        return report
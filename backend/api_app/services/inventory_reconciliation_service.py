@@ -0,0 +1,302 @@
+"""Catalog-wide reconciliation of ticket stock between MongoDB and Redis."""
+
+import time
+from typing import Optional
+
+from redis.asyncio import Redis
+from loguru import logger
+
+from .. import models
+from ..repositories import EventRepository, UserTicketRepository
+from ..services import BaseService
+from ..api.core.redis_lock import RedisLock, TicketInventory
+
+# Last run's Redis drift per "event_id:ticket_type_id", and where the
+# scheduled job stopped scanning.
+DRIFT_KEY = "reconcile:drift"
+CURSOR_KEY = "reconcile:cursor"
+
+# Lock taken by repairing runs. It lives for the run's time budget (or
+# DEFAULT_RUN_SECONDS without one) plus a margin for the batch in progress
+# and the Redis repairs at the end.
+LOCK_KEY = "reconcile"
+DEFAULT_RUN_SECONDS = 300
+LOCK_MARGIN_SECONDS = 60
+
+
+class InventoryReconciliationService(BaseService):
+    """
+    Compare every ticket type's stock against its bookings.
+
+    For each ticket type:
+        expected remaining = total - booked tickets (one aggregation per batch)
+        expected in Redis  = expected remaining - tickets held in Redis
+
+    A batch's events and bookings are read from one MongoDB snapshot, so a
+    booking or cancellation committing in between is not mistaken for
+    drift. MongoDB drift is corrected with a $inc by the difference, so
+    bookings that commit after the snapshot are not overwritten.
+
+    Holds are read once when the run starts and once when it ends, keeping
+    the smaller count, so Redis drift is judged after the last batch. A hold
+    seen both times was live while every batch was read; one created,
+    confirmed or released in between looks like missing stock.
+
+    Redis drift is only lowered right away. A reservation can be in flight
+    between Redis and its MongoDB commit, which looks like missing stock for
+    a moment. So Redis is raised only when the same drift was also seen on
+    the previous run.
+
+    Repairing runs hold a lock, so runs from several API processes (and
+    the admin endpoint) do not apply the same correction twice; a run
+    finding it taken is skipped.
+    """
+
+    def __init__(self, redis: Redis):
+        super().__init__(EventRepository())
+        self.user_ticket_repository = UserTicketRepository()
+        self.redis = redis
+        self.inventory = TicketInventory(redis)
+
+    async def reconcile(
+        self,
+        repair: bool = False,
+        batch_size: int = 200,
+        time_budget: Optional[float] = None,
+        max_events: Optional[int] = None,
+        start_after: Optional[str] = None,
+    ) -> dict:
+        """
+        Check (and optionally repair) events in `_id` order, a batch at a time.
+
+        Args:
+            repair: Correct the drift found, not just report it
+            batch_size: Events read per batch
+            time_budget: Stop starting new batches after this many seconds
+            max_events: Stop after this many events
+            start_after: Resume after this event ID
+
+        Returns:
+            Report with the drift found, what was repaired and `next_cursor`,
+            which is None once the end of the catalog was reached. `skipped`
+            is True when another repairing run held the lock
+        """
+        report = {
+            "skipped": False,
+            "events_checked": 0,
+            "ticket_types_checked": 0,
+            "drift": [],
+            "mongo_repaired": 0,
+            "redis_repaired": 0,
+            "redis_initialized": 0,
+            "next_cursor": start_after,
+        }
+        if not repair:
+            return await self._reconcile(None, batch_size, time_budget, max_events, report)
+
+        timeout = int(time_budget or DEFAULT_RUN_SECONDS) + LOCK_MARGIN_SECONDS
+        lock = RedisLock(self.redis, LOCK_KEY, timeout=timeout)
+        if not await lock.acquire(blocking=False):
+            logger.info("Inventory reconciliation skipped: another run holds the lock")
+            report["skipped"] = True
+            return report
+        try:
+            return await self._reconcile(lock, batch_size, time_budget, max_events, report)
+        finally:
+            await lock.release()
+
+    async def _reconcile(
+        self,
+        lock: Optional[RedisLock],
+        batch_size: int,
+        time_budget: Optional[float],
+        max_events: Optional[int],
+        report: dict,
+    ) -> dict:
+        """Run `reconcile`, repairing under `lock` when it is given."""
+        started = time.monotonic()
+        held_before = await self.inventory.get_held_quantities()
+        checks = []
+
+        while True:
+            limit = batch_size
+            if max_events is not None:
+                limit = min(limit, max_events - report["events_checked"])
+            if limit <= 0:
+                break
+            if time_budget is not None and time.monotonic() - started >= time_budget:
+                break
+
+            events, booked = await models.run_in_snapshot(
+                lambda session: self._read_batch(report["next_cursor"], limit, session)
+            )
+            if not events:
+                report["next_cursor"] = None
+                break
+
+            checks.extend(await self._check_batch(events, booked, lock, report))
+            report["events_checked"] += len(events)
+            report["next_cursor"] = str(events[-1]["_id"])
+
+            if len(events) < limit:
+                report["next_cursor"] = None
+                break
+
+        held_after = await self.inventory.get_held_quantities()
+        held = {
+            key: min(quantity, held_after.get(key, 0))
+            for key, quantity in held_before.items()
+        }
+        await self._reconcile_redis(checks, held, lock, report)
+
+        report["elapsed_seconds"] = round(time.monotonic() - started, 3)
+        logger.info(
+            f"Inventory reconciliation: events={report['events_checked']}, "
+            f"drift={len(report['drift'])}, mongo_repaired={report['mongo_repaired']}, "
+            f"redis_repaired={report['redis_repaired']}, "
+            f"elapsed={report['elapsed_seconds']}s"
+        )
+        return report
+
+    async def run_scheduled(
+        self, repair: bool, batch_size: int, time_budget: float
+    ) -> dict:
+        """Continue the catalog scan from where the previous run stopped."""
+        cursor = await self.redis.get(CURSOR_KEY)
+        report = await self.reconcile(
+            repair=repair,
+            batch_size=batch_size,
+            time_budget=time_budget,
+            start_after=cursor,
+        )
+        if report["skipped"]:
+            return report
+        if report["next_cursor"]:
+            await self.redis.set(CURSOR_KEY, report["next_cursor"])
+        else:
+            await self.redis.delete(CURSOR_KEY)
+        return report
+
+    async def _read_batch(
+        self, after_id: Optional[str], limit: int, session
+    ) -> tuple[list[dict], dict]:
+        events = await self._repository.get_inventory_page(after_id, limit, session)
+        if not events:
+            return [], {}
+        booked = await self.user_ticket_repository.aggregate_booked_quantities(
+            [str(event["_id"]) for event in events], session
+        )
+        return events, booked
+
+    async def _check_batch(
+        self,
+        events: list[dict],
+        booked: dict,
+        lock: Optional[RedisLock],
+        report: dict,
+    ) -> list[dict]:
+        """
+        Correct a batch's MongoDB drift and read its Redis counters.
+
+        Returns:
+            One entry per ticket type for `_reconcile_redis`
+        """
+        event_ids = [str(event["_id"]) for event in events]
+        availability = await self.inventory.get_bulk_availability(event_ids)
+
+        checks = []
+        mongo_fixes = []
+        for event_id, event in zip(event_ids, events):
+            for ticket_type in event.get("ticket_types", []):
+                ticket_type_id = ticket_type["ticket_id"]
+                key = (event_id, ticket_type_id)
+                report["ticket_types_checked"] += 1
+
+                expected = ticket_type["total"] - booked.get(key, 0)
+                mongo_drift = ticket_type["remaining"] - expected
+                if mongo_drift:
+                    mongo_fixes.append((event_id, ticket_type_id, -mongo_drift))
+
+                checks.append(
+                    {
+                        "event_id": event_id,
+                        "event_name": event.get("name"),
+                        "ticket_type_id": ticket_type_id,
+                        "total": ticket_type["total"],
+                        "booked": booked.get(key, 0),
+                        "db_remaining": ticket_type["remaining"],
+                        "redis_remaining": availability.get(event_id, {}).get(
+                            ticket_type_id
+                        ),
+                        "expected_remaining": expected,
+                        "mongo_drift": mongo_drift,
+                    }
+                )
+
+        if lock and mongo_fixes:
+            await lock.ensure_held()
+            report["mongo_repaired"] += await self._repository.bulk_adjust_remaining(
+                mongo_fixes
+            )
+        return checks
+
+    async def _reconcile_redis(
+        self,
+        checks: list[dict],
+        held: dict[tuple[str, str], int],
+        lock: Optional[RedisLock],
+        report: dict,
+    ) -> None:
+        """Report every drift found and correct the Redis counters."""
+        fields = [f"{check['event_id']}:{check['ticket_type_id']}" for check in checks]
+        previous = await self.redis.hmget(DRIFT_KEY, fields) if fields else []
+        previous_drift = dict(zip(fields, previous))
+
+        redis_fixes = []
+        missing: dict[str, dict[str, int]] = {}
+        current_drift = {}
+
+        for field, check in zip(fields, checks):
+            event_id = check["event_id"]
+            ticket_type_id = check["ticket_type_id"]
+            check["held"] = held.get((event_id, ticket_type_id), 0)
+            expected_redis = check["expected_remaining"] - check["held"]
+            redis_remaining = check["redis_remaining"]
+            redis_drift = (
+                None if redis_remaining is None else redis_remaining - expected_redis
+            )
+            if check["mongo_drift"] == 0 and redis_drift == 0:
+                continue
+
+            check["redis_drift"] = redis_drift
+            report["drift"].append(check)
+
+            if redis_drift is None:
+                missing.setdefault(event_id, {})[ticket_type_id] = max(
+                    expected_redis, 0
+                )
+            elif redis_drift > 0:
+                redis_fixes.append((event_id, ticket_type_id, -redis_drift))
+            elif redis_drift < 0:
+                current_drift[field] = redis_drift
+                if previous_drift.get(field) == str(redis_drift):
+                    redis_fixes.append((event_id, ticket_type_id, -redis_drift))
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if fields:
+                pipe.hdel(DRIFT_KEY, *fields)
+            if current_drift:
+                pipe.hset(DRIFT_KEY, mapping=current_drift)
+            await pipe.execute()
+
+        if not lock:
+            return
+
+        if redis_fixes:
+            await lock.ensure_held()
+            await self.inventory.adjust_inventory(redis_fixes, reason="reconcile")
+            report["redis_repaired"] += len(redis_fixes)
+        for event_id, totals in missing.items():
+            await lock.ensure_held()
+            created = await self.inventory.initialize_event_inventory(event_id, totals)
+            report["redis_initialized"] += sum(created.values())
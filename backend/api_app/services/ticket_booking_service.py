@@ -1,124 +1,931 @@
 """Ticket booking service with race condition prevention."""
 
+from collections import defaultdict
 from typing import Optional
+from beanie import PydanticObjectId
 from fastapi import HTTPException
 from redis.asyncio import Redis
 from loguru import logger
 
 from .. import models, schemas
-from ..repositories import EventRepository
+from ..repositories import (
+    EventRepository,
+    UserRepository,
+    UserTicketRepository,
+    OutboxRepository,
+)
 from ..services import BaseService
-from ..api.core.redis_lock import TicketInventory, RedisLock
-from datetime import datetime
+from .event_service import EventService, event_lock
+from ..api.core.config import settings
+from ..api.core.redis_lock import TicketInventory
+from ..api.core.mongo_inventory import MongoInventory
+from ..api.core.waiting_room import WaitingRoom
+from ..api.core.waitlist import Waitlist
+from ..api.core.catalog_cache import catalog_cache
+from ..api.core.seat_map import SeatLayout
+from datetime import UTC, datetime
+
+BOOKING_TOPIC = "ticket-bookings"
+CANCELLATION_TOPIC = "ticket-cancellations"
+
+# Tickets cancelled per transaction when cancelling a whole event
+CANCEL_BATCH_SIZE = 500
 
 
 class TicketBookingService(BaseService):
-    def __init__(self, redis: Redis):
+    def __init__(self, redis: Optional[Redis]):
         event_repository = EventRepository()
         super().__init__(event_repository)
+        self.user_repository = UserRepository()
+        self.user_ticket_repository = UserTicketRepository()
+        self.outbox_repository = OutboxRepository()
         self.redis = redis
-        self.inventory = TicketInventory(redis)
+        if redis is None:
+            # Redis is down: take stock from MongoDB directly
+            self.inventory = MongoInventory()
+        else:
+            # Stock missing from Redis is loaded from MongoDB on first use
+            self.inventory = TicketInventory(
+                redis,
+                loader=event_repository.get_inventory_remaining,
+                seat_loader=UserTicketRepository().get_taken_seats,
+            )
+
+    async def check_admission(
+        self, event_ids: list[str], user: models.User, token: Optional[str]
+    ) -> list[str]:
+        """
+        Reject buyers not admitted through the events' waiting rooms.
+
+        Without Redis (MongoDB fallback) the inventory engine refuses events
+        with a waiting room instead.
+
+        Returns:
+            The events whose admission to use up once the booking succeeds
+        """
+        if self.redis is None:
+            return []
+        return await WaitingRoom(
+            self.redis, loader=self._repository.get_waiting_room_rates
+        ).require_admission(event_ids, str(user.id), token)
+
+    async def consume_admission(self, event_ids: list[str], user: models.User) -> None:
+        """Use up the waiting room admissions of a booking that went through."""
+        if not event_ids:
+            return
+        try:
+            await WaitingRoom(self.redis).consume_admission(event_ids, str(user.id))
+        except Exception as e:
+            logger.error(f"Failed to use up waiting room admission: {e}")
 
     async def book_tickets(
         self,
         booking: schemas.TicketBooking,
         user: models.User,
+        admission_token: Optional[str] = None,
     ) -> dict:
+        booking = await self._price_booking(booking)
 
         if user.credit < booking.total_price:
             raise HTTPException(400, "Insufficient credit for booking")
-        user.credit -= booking.total_price
-        await user.save()
 
-        reservation_result = await self.inventory.reserve_tickets(
-            event_id=booking.event_id,
-            ticket_type_id=booking.ticket_type_id,
-            quantity=booking.quantity,
-            user_id=user.id,
+        admitted = await self.check_admission(
+            [booking.event_id], user, admission_token
         )
 
+        layout = await self._get_seat_layout(booking.event_id, booking.ticket_type_id)
+        if layout:
+            reservation_result = await self._claim_seats(booking, user, layout)
+        elif booking.seats:
+            raise HTTPException(400, "Ticket type has no reserved seating")
+        else:
+            reservation_result = await self.inventory.reserve_tickets(
+                event_id=booking.event_id,
+                ticket_type_id=booking.ticket_type_id,
+                quantity=booking.quantity,
+                user_id=str(user.id),
+            )
+
         if not reservation_result["success"]:
             raise HTTPException(
                 400, detail=reservation_result.get("error", "Booking failed")
             )
+        seats = reservation_result.get("seats", [])
 
-        try:
-            event = await self._repository.get_event_by_id(booking.event_id)
-
-            if not event:
-                await self.inventory.release_tickets(
-                    booking.event_id,
-                    booking.ticket_type_id,
-                    booking.quantity,
-                    "event_not_found",
-                )
-                raise HTTPException(404, "Event not found")
+        ticket_id = PydanticObjectId()
 
-            ticket_type_updated = False
-            for ticket_type in event.ticket_types:
-                if ticket_type.ticket_id == booking.ticket_type_id:
-                    ticket_type.remaining -= booking.quantity
-                    ticket_type_updated = True
-                    break
+        async def persist(session):
+            credit = await self.user_repository.debit_credit(
+                user.id,
+                booking.total_price,
+                "ticket_booking",
+                reference=str(ticket_id),
+                session=session,
+            )
+            if credit is None:
+                raise HTTPException(400, "Insufficient credit for booking")
 
-            if not ticket_type_updated:
-                await self.inventory.release_tickets(
-                    booking.event_id,
-                    booking.ticket_type_id,
-                    booking.quantity,
-                    "ticket_type_not_found",
+            if self.inventory.updates_database:
+                event = await self._repository.get_event_summary(
+                    booking.event_id, session
+                )
+            else:
+                # One positional $inc on the matching ticket type, no read first
+                event = await self._repository.decrement_ticket_remaining(
+                    booking.event_id, booking.ticket_type_id, booking.quantity, session
+                )
+            if not event:
+                raise HTTPException(
+                    404,
+                    "Event or ticket type not found, not enough tickets left, "
+                    "or the event was cancelled",
                 )
-                raise HTTPException(404, "Ticket type not found")
-
-            await event.save()
-
-            logger.info(
-                f"Booking successful: event={booking.event_id}, ticket={booking.ticket_type_id}, "
-                f"quantity={booking.quantity}, user={user.id}, remaining={reservation_result['remaining']}"
-            )
 
             user_ticket = models.UserTicket(
+                id=ticket_id,
                 user=user,
-                event=event,
+                event=models.Event.link_from_id(event["_id"]),
                 ticket_name=booking.ticket_type_name,
                 ticket_type_id=booking.ticket_type_id,
                 price_per_ticket=booking.price_per_ticket,
                 total_price=booking.total_price,
                 quantity=booking.quantity,
+                seats=seats,
                 status="booked",
-                event_start_date=event.start_date,
-                event_end_date=event.end_date,
+                event_start_date=event["start_date"],
+                event_end_date=event["end_date"],
                 is_checked_in=False,
                 checked_in_date=None,
             )
-            await user_ticket.insert()
-
-            ticket_id = str(user_ticket.id) if user_ticket.id else None
-
-            return {
-                "success": True,
-                "message": "Booking successful",
-                "booking_details": {
-                    "credit_remaining": user.credit,
-                    "ticket_id": ticket_id,
-                    "event_name": event.name,
-                    "event_id": booking.event_id,
-                    "ticket_type_id": booking.ticket_type_id,
-                    "quantity": booking.quantity,
-                    "remaining_tickets": reservation_result["remaining"],
+            await user_ticket.insert(session=session)
+
+            await self.outbox_repository.enqueue(
+                BOOKING_TOPIC,
+                self._booking_messages(
+                    [
+                        {
+                            "event_name": event["name"],
+                            "event_id": booking.event_id,
+                            "ticket_id": str(ticket_id),
+                            "ticket_type_name": booking.ticket_type_name,
+                            "quantity": booking.quantity,
+                            "seats": seats,
+                            "total_price": booking.total_price,
+                            "price_per_ticket": booking.price_per_ticket,
+                        }
+                    ],
+                    user,
+                ),
+                session=session,
+            )
+            return credit, event
+
+        try:
+            credit, event = await models.run_in_transaction(persist)
+        except Exception as e:
+            logger.error(f"Booking failed, rolling back: {str(e)}")
+            if layout:
+                await self.inventory.release_seats(
+                    booking.event_id,
+                    booking.ticket_type_id,
+                    layout,
+                    seats,
+                    "booking_failed",
+                    user_id=str(user.id),
+                )
+            else:
+                await self.inventory.release_tickets(
+                    booking.event_id,
+                    booking.ticket_type_id,
+                    booking.quantity,
+                    "booking_failed",
+                    user_id=str(user.id),
+                )
+            raise
+
+        user.credit = credit
+        await self.consume_admission(admitted, user)
+
+        logger.info(
+            f"Booking successful: event={booking.event_id}, ticket={booking.ticket_type_id}, "
+            f"quantity={booking.quantity}, user={user.id}, remaining={reservation_result['remaining']}"
+        )
+
+        return {
+            "success": True,
+            "message": "Booking successful",
+            "booking_details": {
+                "credit_remaining": user.credit,
+                "ticket_id": str(ticket_id),
+                "event_name": event["name"],
+                "event_id": booking.event_id,
+                "ticket_type_id": booking.ticket_type_id,
+                "quantity": booking.quantity,
+                "seats": seats,
+                "remaining_tickets": reservation_result["remaining"],
+            },
+        }
+
+    async def book_cart(
+        self,
+        cart: schemas.CartBooking,
+        user: models.User,
+        admission_token: Optional[str] = None,
+    ) -> dict:
+        """
+        Book several ticket types, possibly across events, all or nothing.
+
+        Stock for every item is reserved in one atomic Redis call, then the
+        result is persisted with a single write per collection.
+        """
+        items = await self._price_items(self._merge_cart_items(cart.items))
+        total_price = sum(item.quantity * item.price_per_ticket for item in items)
+
+        if user.credit < total_price:
+            raise HTTPException(400, "Insufficient credit for booking")
+
+        admitted = await self.check_admission(
+            [item.event_id for item in items], user, admission_token
+        )
+        events_by_id = await self._get_cart_events(items)
+
+        sales = [(item.event_id, item.ticket_type_id, item.quantity) for item in items]
+        reservation_result = await self.inventory.reserve_many(sales, str(user.id))
+
+        if not reservation_result["success"]:
+            raise HTTPException(
+                400,
+                detail={
+                    "message": reservation_result.get("error", "Booking failed"),
+                    **reservation_result.get("failed_item", {}),
+                },
+            )
+
+        result = await self._persist_cart(
+            items,
+            events_by_id,
+            user,
+            total_price,
+            [reserved["remaining"] for reserved in reservation_result["items"]],
+        )
+        await self.consume_admission(admitted, user)
+        return result
+
+    async def hold_cart(
+        self,
+        cart: schemas.CartBooking,
+        user: models.User,
+        admission_token: Optional[str] = None,
+    ) -> dict:
+        """
+        Hold tickets for a checkout that spans several requests.
+
+        The stock is taken now and returned automatically when the hold
+        expires without being confirmed.
+        """
+        items = await self._price_items(self._merge_cart_items(cart.items))
+        total_price = sum(item.quantity * item.price_per_ticket for item in items)
+
+        if user.credit < total_price:
+            raise HTTPException(400, "Insufficient credit for booking")
+
+        admitted = await self.check_admission(
+            [item.event_id for item in items], user, admission_token
+        )
+        await self._get_cart_events(items)
+
+        sales = [(item.event_id, item.ticket_type_id, item.quantity) for item in items]
+        hold_result = await self.inventory.create_hold(
+            sales,
+            str(user.id),
+            ttl=settings.HOLD_TTL_SECONDS,
+            details={"items": [item.model_dump() for item in items]},
+        )
+
+        if hold_result["status"] == "unavailable":
+            raise HTTPException(503, hold_result["error"])
+        if not hold_result["success"]:
+            raise HTTPException(
+                400,
+                detail={
+                    "message": hold_result.get("error", "Hold failed"),
+                    **hold_result.get("failed_item", {}),
+                },
+            )
+
+        await self.consume_admission(admitted, user)
+        return {
+            "success": True,
+            "message": "Tickets held",
+            "hold_id": hold_result["hold_id"],
+            "expires_at": datetime.fromtimestamp(hold_result["expires_at"] / 1000),
+            "total_price": total_price,
+            "items": [
+                {**item.model_dump(), "remaining_tickets": reserved["remaining"]}
+                for item, reserved in zip(items, hold_result["items"])
+            ],
+        }
+
+    async def confirm_hold(self, hold_id: str, user: models.User) -> dict:
+        """
+        Turn a live hold into booked tickets.
+        """
+        confirm_result = await self.inventory.confirm_hold(hold_id, str(user.id))
+
+        if not confirm_result["success"]:
+            status = confirm_result["status"]
+            if status == "unavailable":
+                raise HTTPException(503, confirm_result["error"])
+            if status == "expired":
+                raise HTTPException(410, "Hold expired")
+            if status == "forbidden":
+                raise HTTPException(403, "Hold belongs to another user")
+            raise HTTPException(404, "Hold not found")
+
+        hold = confirm_result["hold"]
+        items = [schemas.CartItem(**item) for item in hold["details"]["items"]]
+        sales = [tuple(item) for item in hold["items"]]
+        total_price = sum(item.quantity * item.price_per_ticket for item in items)
+
+        try:
+            events_by_id = await self._get_cart_events(items)
+        except Exception:
+            await self.inventory.release_many(
+                sales, "hold_confirm_failed", user_id=hold["user_id"]
+            )
+            raise
+
+        return await self._persist_cart(
+            items, events_by_id, user, total_price, [None] * len(items)
+        )
+
+    async def release_hold(self, hold_id: str, user: models.User) -> dict:
+        """
+        Give held tickets back before the hold expires.
+        """
+        result = await self.inventory.release_hold(hold_id, str(user.id))
+
+        if not result["success"]:
+            if result["status"] == "unavailable":
+                raise HTTPException(503, result["error"])
+            if result["status"] == "forbidden":
+                raise HTTPException(403, "Hold belongs to another user")
+            raise HTTPException(404, "Hold not found")
+
+        return {"success": True, "message": "Hold released", "hold_id": hold_id}
+
+    async def cancel_ticket(self, ticket_id: str, user: models.User) -> dict:
+        """
+        Cancel a booked ticket before its event starts: the price goes back
+        to the owner's credit and the tickets (or seats) back on sale.
+        """
+        ticket = await self.user_ticket_repository.get_user_ticket_by_id(ticket_id)
+        owner_id = str(ticket.user.ref.id)
+
+        if owner_id != str(user.id) and "admin" not in user.roles:
+            raise HTTPException(403, "Ticket belongs to another user")
+        if ticket.status != "booked":
+            raise HTTPException(400, f"Ticket status = {ticket.status}")
+        if ticket.is_checked_in:
+            raise HTTPException(400, "Ticket already checked in")
+        # MongoDB hands dates back as naive UTC
+        if ticket.event_start_date <= datetime.now(UTC).replace(tzinfo=None):
+            raise HTTPException(400, "Event has already started")
+
+        tickets = await self.user_ticket_repository.get_cancellable_tickets(
+            ticket_ids=[ticket_id], limit=1
+        )
+        result = await self._cancel_tickets(tickets, "ticket_cancelled", owner_id)
+        if not result["cancelled"]:
+            raise HTTPException(409, "Ticket is no longer booked")
+
+        logger.info(
+            f"Ticket cancelled: ticket={ticket_id}, user={owner_id}, "
+            f"refunded={result['refunded']}"
+        )
+        return {
+            "success": True,
+            "message": "Ticket cancelled",
+            "ticket_id": ticket_id,
+            "refunded": result["refunded"],
+            "credit_remaining": result["balances"].get(owner_id),
+        }
+
+    async def cancel_event_tickets(self, event_id: str, user: models.User) -> dict:
+        """
+        Cancel an event and refund every booked ticket of it.
+
+        The event is marked cancelled first, which closes its sales and
+        makes bookings and hold confirmations still in flight fail, then
+        its live holds are released. Tickets are cancelled CANCEL_BATCH_SIZE
+        at a time, each batch in one transaction, in passes over the event
+        until one finds nothing left, so tickets committed while the first
+        pass ran are cancelled too. A failed run can simply be repeated.
+        """
+        events = await self._repository.get_events_by_ids([event_id])
+        if not events:
+            raise HTTPException(404, "Event not found")
+        event = events[0]
+        if event.created_by != user.id and "admin" not in user.roles:
+            raise HTTPException(403, "Only the event's organizer can cancel it")
+
+        await EventService().cancel_event(event_id, redis=self.redis)
+        holds_released = await self.inventory.release_event_holds(
+            event_id, "event_cancelled"
+        )
+
+        report = {"cancelled": 0, "refunded": 0, "batches": 0, "passes": 0}
+        while True:
+            found = await self._cancel_event_pass(event_id, report)
+            report["passes"] += 1
+            if not found:
+                break
+
+        logger.info(
+            f"Event tickets cancelled: event={event_id}, "
+            f"tickets={report['cancelled']}, refunded={report['refunded']}, "
+            f"holds={holds_released}, passes={report['passes']}"
+        )
+        return {
+            "success": True,
+            "message": "Event tickets cancelled",
+            "event_id": event_id,
+            "tickets_cancelled": report["cancelled"],
+            "refunded": report["refunded"],
+            "holds_released": holds_released,
+            "batches": report["batches"],
+            "passes": report["passes"],
+        }
+
+    async def _cancel_event_pass(self, event_id: str, report: dict) -> int:
+        """Cancel the booked tickets of an event in one scan; returns how many were found."""
+        found = 0
+        after_id = None
+        while True:
+            tickets = await self.user_ticket_repository.get_cancellable_tickets(
+                event_id=event_id, after_id=after_id, limit=CANCEL_BATCH_SIZE
+            )
+            if not tickets:
+                break
+            found += len(tickets)
+            after_id = tickets[-1]["_id"]
+
+            result = await self._cancel_tickets(tickets, "event_cancelled")
+            report["cancelled"] += result["cancelled"]
+            report["refunded"] += result["refunded"]
+            report["batches"] += 1
+
+            if len(tickets) < CANCEL_BATCH_SIZE:
+                break
+        return found
+
+    async def _cancel_tickets(
+        self, tickets: list[dict], reason: str, user_id: Optional[str] = None
+    ) -> dict:
+        """
+        Cancel a batch of booked tickets.
+
+        One transaction marks the tickets, refunds them, restores their
+        MongoDB stock and queues their notifications. Their Redis stock then
+        goes back with one release call for the counted ticket types and
+        one per seated ticket type.
+
+        Args:
+            tickets: Raw ticket documents, as read by `get_cancellable_tickets`
+            reason: Ledger and release reason
+            user_id: Owner of every ticket, whose purchase counters go down
+
+        Returns:
+            dict with the tickets cancelled, the credit refunded and the new
+            balance per user
+        """
+        if self.redis is None and any(ticket.get("seats") for ticket in tickets):
+            raise HTTPException(503, "Reserved seating unavailable")
+
+        async def persist(session):
+            # Skip tickets cancelled since they were read
+            live = await self.user_ticket_repository.get_cancellable_tickets(
+                ticket_ids=[str(ticket["_id"]) for ticket in tickets],
+                limit=len(tickets),
+                session=session,
+            )
+            if not live:
+                return live, {}
+
+            await self.user_ticket_repository.mark_cancelled(
+                [ticket["_id"] for ticket in live], session=session
+            )
+            balances = await self.user_repository.bulk_refund_credit(
+                [
+                    (ticket["user"].id, ticket["total_price"], str(ticket["_id"]))
+                    for ticket in live
+                ],
+                reason,
+                session=session,
+            )
+
+            returned = defaultdict(int)
+            for ticket in live:
+                key = (str(ticket["event"].id), ticket["ticket_type_id"])
+                returned[key] += ticket["quantity"]
+            if not self.inventory.updates_database:
+                await self._repository.bulk_adjust_remaining(
+                    [(e, t, quantity) for (e, t), quantity in returned.items()],
+                    session=session,
+                )
+
+            await self.outbox_repository.enqueue(
+                CANCELLATION_TOPIC,
+                [
+                    {
+                        "ticket_id": str(ticket["_id"]),
+                        "user_id": str(ticket["user"].id),
+                        "event_id": str(ticket["event"].id),
+                        "ticket_type_id": ticket["ticket_type_id"],
+                        "ticket_type_name": ticket["ticket_name"],
+                        "quantity": ticket["quantity"],
+                        "seats": ticket.get("seats", []),
+                        "refunded": ticket["total_price"],
+                        "reason": reason,
+                    }
+                    for ticket in live
+                ],
+                session=session,
+            )
+            return live, balances
+
+        live, balances = await models.run_in_transaction(persist)
+
+        sales = defaultdict(int)
+        seats = defaultdict(list)
+        for ticket in live:
+            key = (str(ticket["event"].id), ticket["ticket_type_id"])
+            if ticket.get("seats"):
+                seats[key].extend(ticket["seats"])
+            else:
+                sales[key] += ticket["quantity"]
+
+        # The cancellation is committed; stock that fails to go back to Redis
+        # is restored by the next reconciliation
+        try:
+            if sales:
+                await self.inventory.release_many(
+                    [(e, t, quantity) for (e, t), quantity in sales.items()],
+                    reason,
+                    user_id=user_id,
+                )
+            for (event_id, ticket_type_id), labels in seats.items():
+                layout = await self._get_seat_layout(event_id, ticket_type_id)
+                if layout:
+                    await self.inventory.release_seats(
+                        event_id, ticket_type_id, layout, labels, reason, user_id=user_id
+                    )
+        except Exception as e:
+            logger.error(f"Failed to return cancelled tickets to inventory: {e}")
+
+        return {
+            "cancelled": len(live),
+            "refunded": sum(ticket["total_price"] for ticket in live),
+            "balances": balances,
+        }
+
+    async def join_waitlist(self, item: schemas.CartItem, user: models.User) -> dict:
+        """
+        Wait for a sold-out ticket type instead of retrying.
+
+        Returned stock is offered in join order as a hold; the user is
+        notified and confirms it through /tickets/holds/{hold_id}/confirm.
+        """
+        if self.redis is None:
+            raise HTTPException(503, "Waitlist unavailable")
+
+        [item] = await self._price_items([item])
+        await self._get_cart_events([item])
+
+        available = await self.inventory.get_available_tickets(
+            item.event_id, item.ticket_type_id
+        )
+        if available is not None and available >= item.quantity:
+            raise HTTPException(409, "Tickets are available, book them instead")
+
+        return await Waitlist(self.redis, self.inventory).join(
+            item.model_dump(),
+            {
+                "user_id": str(user.id),
+                "email": user.email,
+                "first_name": user.first_name,
+            },
+        )
+
+    async def get_waitlist_status(
+        self, event_id: str, ticket_type_id: str, user: models.User
+    ) -> dict:
+        if self.redis is None:
+            raise HTTPException(503, "Waitlist unavailable")
+        return await Waitlist(self.redis, self.inventory).get_status(
+            event_id, ticket_type_id, str(user.id)
+        )
+
+    async def leave_waitlist(
+        self, event_id: str, ticket_type_id: str, user: models.User
+    ) -> dict:
+        if self.redis is None:
+            raise HTTPException(503, "Waitlist unavailable")
+        if not await Waitlist(self.redis, self.inventory).leave(
+            event_id, ticket_type_id, str(user.id)
+        ):
+            raise HTTPException(404, "Not on the waitlist")
+        return {"success": True, "message": "Left the waitlist"}
+
+    async def _price_booking(self, booking: schemas.TicketBooking) -> schemas.TicketBooking:
+        """Fill in the name and prices of a single booking from the catalog."""
+        [item] = await self._price_items(
+            [schemas.CartItem(**booking.model_dump(exclude={"total_price", "seats"}))],
+            allow_seats=True,
+        )
+        total_price = item.quantity * item.price_per_ticket
+        if booking.total_price is not None and booking.total_price != total_price:
+            raise HTTPException(
+                409,
+                detail={
+                    "message": "Ticket price changed",
+                    "event_id": item.event_id,
+                    "ticket_type_id": item.ticket_type_id,
+                    "price_per_ticket": item.price_per_ticket,
+                    "total_price": total_price,
                 },
+            )
+        return booking.model_copy(
+            update={
+                "ticket_type_name": item.ticket_type_name,
+                "price_per_ticket": item.price_per_ticket,
+                "total_price": total_price,
+            }
+        )
+
+    async def _price_items(
+        self, items: list[schemas.CartItem], allow_seats: bool = False
+    ) -> list[schemas.CartItem]:
+        """
+        Fill in the name and price of each item from the ticket catalog cache.
+
+        Prices sent by the client are only checked: a booking made against
+        an old price is refused with 409 and the current price. Reserved
+        seating is only sold through single bookings (`allow_seats`).
+        """
+        catalog = await catalog_cache.get_many(
+            [item.event_id for item in items], self._repository.get_ticket_catalog
+        )
+
+        priced = []
+        for item in items:
+            ticket_type = catalog.get(item.event_id, {}).get(item.ticket_type_id)
+            if not ticket_type:
+                raise HTTPException(
+                    404, f"Ticket type not found: {item.ticket_type_id}"
+                )
+            if ticket_type.get("seat_map") and not allow_seats:
+                raise HTTPException(
+                    400,
+                    f"Reserved seats are booked through /tickets/book: {item.ticket_type_id}",
+                )
+            if (
+                item.price_per_ticket is not None
+                and item.price_per_ticket != ticket_type["price"]
+            ):
+                raise HTTPException(
+                    409,
+                    detail={
+                        "message": "Ticket price changed",
+                        "event_id": item.event_id,
+                        "ticket_type_id": item.ticket_type_id,
+                        "price_per_ticket": ticket_type["price"],
+                    },
+                )
+            priced.append(
+                item.model_copy(
+                    update={
+                        "ticket_type_name": ticket_type["name"],
+                        "price_per_ticket": ticket_type["price"],
+                    }
+                )
+            )
+        return priced
+
+    async def _get_seat_layout(
+        self, event_id: str, ticket_type_id: str
+    ) -> Optional[SeatLayout]:
+        """Seat layout of a reserved-seating ticket type, None for counters."""
+        catalog = await catalog_cache.get_many(
+            [event_id], self._repository.get_ticket_catalog
+        )
+        ticket_type = catalog.get(event_id, {}).get(ticket_type_id)
+        if not ticket_type:
+            raise HTTPException(404, f"Ticket type not found: {ticket_type_id}")
+        if not ticket_type.get("seat_map"):
+            return None
+        return SeatLayout(ticket_type["seat_map"])
+
+    async def _claim_seats(
+        self, booking: schemas.TicketBooking, user: models.User, layout: SeatLayout
+    ) -> dict:
+        """Take the booked seats, or the best adjacent ones when none are given."""
+        if self.redis is None:
+            raise HTTPException(503, "Reserved seating unavailable")
+        if booking.seats is not None and len(booking.seats) != booking.quantity:
+            raise HTTPException(400, "Number of seats must match quantity")
+
+        result = await self.inventory.claim_seats(
+            booking.event_id,
+            booking.ticket_type_id,
+            layout,
+            str(user.id),
+            seats=booking.seats,
+            quantity=booking.quantity,
+        )
+        if result["status"] == "seat_taken":
+            raise HTTPException(
+                409, detail={"message": result["error"], "seats": result["seats"]}
+            )
+        return result
+
+    async def get_seat_availability(
+        self, event_id: str, ticket_type_id: str, detail: bool = False
+    ) -> dict:
+        """Free seats per section, and per row with `detail`."""
+        layout = await self._get_seat_layout(event_id, ticket_type_id)
+        if not layout:
+            raise HTTPException(400, "Ticket type has no reserved seating")
+        if self.redis is None:
+            raise HTTPException(503, "Reserved seating unavailable")
+        return await self.inventory.get_seat_availability(
+            event_id, ticket_type_id, layout, detail=detail
+        )
+
+    async def _get_cart_events(self, items: list[schemas.CartItem]) -> dict:
+        """Load the events of a cart and check they are on sale with every ticket type."""
+        events = await self._repository.get_events_by_ids(
+            list({item.event_id for item in items})
+        )
+        events_by_id = {str(event.id): event for event in events}
+
+        for item in items:
+            event = events_by_id.get(item.event_id)
+            if not event:
+                raise HTTPException(404, f"Event not found: {item.event_id}")
+            if event.cancelled:
+                raise HTTPException(409, f"Event was cancelled: {item.event_id}")
+            if not any(
+                ticket_type.ticket_id == item.ticket_type_id
+                for ticket_type in event.ticket_types
+            ):
+                raise HTTPException(
+                    404, f"Ticket type not found: {item.ticket_type_id}"
+                )
+
+        return events_by_id
+
+    async def _persist_cart(
+        self,
+        items: list[schemas.CartItem],
+        events_by_id: dict,
+        user: models.User,
+        total_price: int,
+        remaining: list[Optional[int]],
+    ) -> dict:
+        """
+        Write reserved cart items to MongoDB in one transaction.
+
+        The credit debit, the stock counters, the tickets and their outbox
+        messages commit together. The stock for `items` must already be
+        taken in Redis; it is released again if the transaction fails.
+        """
+        sales = [(item.event_id, item.ticket_type_id, item.quantity) for item in items]
+
+        user_tickets = []
+        for item in items:
+            event = events_by_id[item.event_id]
+            user_tickets.append(
+                models.UserTicket(
+                    id=PydanticObjectId(),
+                    user=user,
+                    event=event,
+                    ticket_name=item.ticket_type_name,
+                    ticket_type_id=item.ticket_type_id,
+                    price_per_ticket=item.price_per_ticket,
+                    total_price=item.quantity * item.price_per_ticket,
+                    quantity=item.quantity,
+                    status="booked",
+                    event_start_date=event.start_date,
+                    event_end_date=event.end_date,
+                    is_checked_in=False,
+                    checked_in_date=None,
+                )
+            )
+
+        tickets = [
+            {
+                "ticket_id": str(user_ticket.id),
+                "event_name": events_by_id[item.event_id].name,
+                "event_id": item.event_id,
+                "ticket_type_id": item.ticket_type_id,
+                "ticket_type_name": item.ticket_type_name,
+                "quantity": item.quantity,
+                "price_per_ticket": item.price_per_ticket,
+                "total_price": user_ticket.total_price,
+                "remaining_tickets": item_remaining,
             }
+            for item, user_ticket, item_remaining in zip(items, user_tickets, remaining)
+        ]
+
+        async def persist(session):
+            credit = await self.user_repository.debit_credit(
+                user.id,
+                total_price,
+                "ticket_booking",
+                reference=",".join(ticket["ticket_id"] for ticket in tickets),
+                session=session,
+            )
+            if credit is None:
+                raise HTTPException(400, "Insufficient credit for booking")
 
+            # Checked again here, for events cancelled since they were read
+            cancelled = await self._repository.get_cancelled_event_ids(
+                list(events_by_id), session
+            )
+            if cancelled:
+                raise HTTPException(409, f"Event was cancelled: {min(cancelled)}")
+
+            if not self.inventory.updates_database:
+                updated = await self._repository.bulk_decrement_remaining(
+                    sales, session
+                )
+                if updated != len(sales):
+                    raise HTTPException(400, "Insufficient tickets")
+            await models.UserTicket.insert_many(user_tickets, session=session)
+            await self.outbox_repository.enqueue(
+                BOOKING_TOPIC, self._booking_messages(tickets, user), session=session
+            )
+            return credit
+
+        try:
+            user.credit = await models.run_in_transaction(persist)
         except Exception as e:
-            logger.error(f"Booking failed, rolling back: {str(e)}")
-            await self.inventory.release_tickets(
-                booking.event_id,
-                booking.ticket_type_id,
-                booking.quantity,
-                "booking_failed",
+            logger.error(f"Cart booking failed, rolling back: {str(e)}")
+            await self.inventory.release_many(
+                sales, "booking_failed", user_id=str(user.id)
             )
             raise
 
+        logger.info(
+            f"Cart booking successful: user={user.id}, items={len(items)}, "
+            f"total_price={total_price}"
+        )
+
+        return {
+            "success": True,
+            "message": "Booking successful",
+            "booking_details": {
+                "credit_remaining": user.credit,
+                "total_price": total_price,
+                "tickets": tickets,
+            },
+        }
+
+    def _booking_messages(self, tickets: list[dict], user: models.User) -> list[dict]:
+        """Outbox payloads for the booking confirmation of each ticket."""
+        return [
+            {
+                "event_name": ticket["event_name"],
+                "event_id": ticket["event_id"],
+                "ticket_id": ticket["ticket_id"],
+                "ticket_type_name": ticket["ticket_type_name"],
+                "quantity": ticket["quantity"],
+                "total_price": ticket["total_price"],
+                "price_per_ticket": ticket["price_per_ticket"],
+                "seats": ticket.get("seats", []),
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "email": user.email,
+            }
+            for ticket in tickets
+        ]
+
+    def _merge_cart_items(
+        self, items: list[schemas.CartItem]
+    ) -> list[schemas.CartItem]:
+        """Combine cart lines that point at the same ticket type."""
+        merged: dict[tuple[str, str], schemas.CartItem] = {}
+        for item in items:
+            key = (item.event_id, item.ticket_type_id)
+            if key in merged:
+                merged[key] = merged[key].model_copy(
+                    update={"quantity": merged[key].quantity + item.quantity}
+                )
+            else:
+                merged[key] = item
+        return list(merged.values())
+
     async def sync_inventory_from_db(self, event_id: str) -> dict:
         """
         Sync Redis inventory from database.
@@ -136,31 +943,48 @@ class TicketBookingService(BaseService):
             raise HTTPException(404, "Event not found")
 
         synced_tickets = []
+        async with event_lock(self.inventory.redis, event_id) as lock:
+            # Get old values
+            old_values = await self.inventory.get_event_availability(event_id)
 
-        for ticket_type in event.ticket_types:
-            redis_key = f"inventory:event:{event_id}:ticket:{ticket_type.ticket_id}"
-
-            # Get old value
-            old_value = await self.redis.get(redis_key)
-
-            # Sync from database
-            await self.inventory.sync_from_database(
+            # Sync from database, leaving live holds taken
+            written = await self.inventory.sync_event_from_database(
                 event_id=str(event.id),
-                ticket_type_id=ticket_type.ticket_id,
-                remaining_tickets=ticket_type.remaining,
+                remaining={
+                    ticket_type.ticket_id: ticket_type.remaining
+                    for ticket_type in event.ticket_types
+                },
+                fence=lock.fence,
+                subtract_holds=True,
+            )
+            await self.inventory.set_event_meta(
+                str(event.id),
+                event.booking_start_date,
+                event.booking_end_date,
+                [ticket_type.ticket_id for ticket_type in event.ticket_types],
+                user_cap=event.max_tickets_per_user,
+                type_caps={
+                    ticket_type.ticket_id: ticket_type.max_per_user
+                    for ticket_type in event.ticket_types
+                },
+                fence=lock.fence,
             )
 
-            # Get new value
-            new_value = await self.redis.get(redis_key)
+        # Get new values
+        new_values = await self.inventory.get_event_availability(event_id)
 
+        for ticket_type in event.ticket_types:
+            new_value = new_values.get(ticket_type.ticket_id)
+            expected = written[ticket_type.ticket_id]
             synced_tickets.append(
                 {
                     "ticket_type_id": ticket_type.ticket_id,
                     "ticket_name": ticket_type.name,
-                    "old_redis_value": old_value,
+                    "old_redis_value": old_values.get(ticket_type.ticket_id),
                     "new_redis_value": new_value,
                     "db_remaining": ticket_type.remaining,
-                    "synced": new_value == str(ticket_type.remaining),
+                    "held": ticket_type.remaining - expected,
+                    "synced": new_value == expected,
                 }
             )
 
@@ -190,14 +1014,17 @@ class TicketBookingService(BaseService):
 
         comparison = []
         has_mismatch = False
+        availability = await self.inventory.get_event_availability(event_id)
+        held = await self.inventory.get_held_quantities(event_ids={event_id})
 
         for ticket_type in event.ticket_types:
-            redis_key = f"inventory:event:{event_id}:ticket:{ticket_type.ticket_id}"
-            redis_value = await self.redis.get(redis_key)
-            redis_remaining = int(redis_value) if redis_value else None
+            redis_remaining = availability.get(ticket_type.ticket_id)
             db_remaining = ticket_type.remaining
+            # MongoDB only counts confirmed bookings; holds are taken in Redis
+            held_tickets = held.get((event_id, ticket_type.ticket_id), 0)
+            expected = max(db_remaining - held_tickets, 0)
 
-            is_synced = redis_remaining == db_remaining
+            is_synced = redis_remaining == expected
             if not is_synced:
                 has_mismatch = True
 
@@ -207,7 +1034,8 @@ class TicketBookingService(BaseService):
                     "ticket_name": ticket_type.name,
                     "redis_remaining": redis_remaining,
                     "db_remaining": db_remaining,
-                    "difference": (redis_remaining or 0) - db_remaining,
+                    "held": held_tickets,
+                    "difference": (redis_remaining or 0) - expected,
                     "is_synced": is_synced,
                 }
             )
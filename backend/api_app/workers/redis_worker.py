@@ -1,6 +1,7 @@
 """Background worker tasks using Redis as a message broker."""
 
 from typing import Any, Dict
+import asyncio
 import json
 from loguru import logger
 from datetime import datetime
@@ -118,6 +119,60 @@ class RedisWorker:
                 logger.error(f"Worker error: {str(e)}")
                 continue
 
+    async def relay_outbox(self):
+        """
+        Deliver outbox messages written by committed bookings.
+
+        Runs next to `process_tasks`. Several workers can relay at once;
+        each claims its own batch. Messages go through the batched
+        publisher, whose metrics are kept in the `outbox:publisher` hash.
+        """
+        from ..api.core.config import settings
+        from ..api.utils.publisher import get_publisher
+        from ..repositories.outbox_repo import OutboxRepository
+
+        outbox = OutboxRepository()
+        publisher = get_publisher()
+        await publisher.start()
+        logger.info("Outbox relay started")
+
+        try:
+            while True:
+                try:
+                    messages = await outbox.claim_batch(
+                        settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_LEASE_SECONDS
+                    )
+                    if not messages:
+                        await asyncio.sleep(settings.OUTBOX_POLL_INTERVAL_SECONDS)
+                        continue
+
+                    futures = [
+                        await publisher.publish(message.topic, message.payload)
+                        for message in messages
+                    ]
+                    results = await asyncio.gather(*futures, return_exceptions=True)
+
+                    delivered = []
+                    for message, result in zip(messages, results):
+                        if isinstance(result, Exception):
+                            await outbox.mark_failed(
+                                [message.id], str(result), settings.OUTBOX_MAX_ATTEMPTS
+                            )
+                        else:
+                            delivered.append(message.id)
+
+                    await outbox.mark_delivered(delivered)
+                    await self.redis.hset(
+                        "outbox:publisher", mapping=publisher.metrics()
+                    )
+                    logger.info(f"Outbox relayed: {len(delivered)}/{len(messages)}")
+
+                except Exception as e:
+                    logger.error(f"Outbox relay error: {str(e)}")
+                    await asyncio.sleep(settings.OUTBOX_POLL_INTERVAL_SECONDS)
+        finally:
+            await publisher.stop()
+
     async def _execute_task(self, task_name: str, task_data: Dict[str, Any]) -> Any:
         """
         Execute task based on task name.
@@ -130,6 +185,8 @@ class RedisWorker:
             return await self._process_ticket_task(task_data)
         elif task_name == "generate_report":
             return await self._generate_report_task(task_data)
+        elif task_name == "notify_waitlist_offer":
+            return await self._notify_waitlist_offer_task(task_data)
         else:
             raise ValueError(f"Unknown task: {task_name}")
 
@@ -151,6 +208,16 @@ class RedisWorker:
         logger.info(f"Generating report: {data.get('report_type')}")
         return {"status": "report_generated", "report_type": data.get("report_type")}
 
+    async def _notify_waitlist_offer_task(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Tell a waitlisted user that tickets are held for them."""
+        from ..api.core.waitlist import OFFER_TOPIC
+        from ..api.utils.publisher import get_publisher
+
+        sent = await get_publisher().publish(OFFER_TOPIC, data)
+        message_id = await sent
+        logger.info(f"Waitlist offer sent to {data.get('email')}: {data.get('hold_id')}")
+        return {"status": "offer_sent", "hold_id": data.get("hold_id"), "message_id": message_id}
+
 
 # Task helper functions for easy task enqueueing
 async def enqueue_email_task(redis_client, to: str, subject: str, body: str) -> str:
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Compare reservation throughput of the Redis and MongoDB inventory engines.
+
+Creates a throwaway event, fires concurrent single-ticket reservations at
+each engine until the stock is gone, then removes the event again.
+
+Usage:
+    python scripts/benchmark_inventory_engines.py [stock] [concurrency]
+"""
+
+import asyncio
+import statistics
+import time
+import uuid
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from beanie import init_beanie
+
+from api_app.api.core.config import settings
+from api_app.api.core.redis import RedisClient
+from api_app.api.core.redis_lock import TicketInventory
+from api_app.api.core.mongo_inventory import MongoInventory
+from api_app import models
+
+
+async def run_engine(name: str, inventory, event_id: str, stock: int, concurrency: int):
+    """Reserve one ticket at a time from `concurrency` workers until sold out."""
+
+    latencies = []
+    sold = 0
+
+    async def worker():
+        nonlocal sold
+        while True:
+            started = time.perf_counter()
+            result = await inventory.reserve_tickets(event_id, "bench", 1, "benchmark")
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not result["success"]:
+                return
+            sold += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"\n📊 {name}")
+    print(f"   Sold:       {sold}/{stock} {'✅' if sold == stock else '❌'}")
+    print(f"   Elapsed:    {elapsed:.2f}s")
+    print(f"   Throughput: {len(latencies) / elapsed:.0f} reservations/s")
+    print(
+        f"   Latency:    p50 {statistics.median(latencies):.2f}ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f}ms"
+    )
+
+
+async def benchmark(stock: int, concurrency: int):
+    mongo_url = f"mongodb://{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+    client = AsyncIOMotorClient(mongo_url)
+    await init_beanie(
+        database=client[settings.DB_NAME], document_models=[models.Event]
+    )
+    print(f"✅ Connected to MongoDB")
+
+    redis_client = RedisClient()
+    redis = await redis_client.connect()
+    print(f"✅ Connected to Redis")
+    print(f"   Stock: {stock}, concurrency: {concurrency}")
+
+    collection = models.Event.get_motor_collection()
+    inserted = await collection.insert_one(
+        {
+            "name": f"benchmark-{uuid.uuid4().hex[:8]}",
+            "ticket_types": [
+                {"ticket_id": "bench", "name": "Benchmark", "total": stock, "remaining": stock}
+            ],
+        }
+    )
+    event_id = str(inserted.inserted_id)
+
+    inventory = TicketInventory(redis)
+    try:
+        await inventory.initialize_event_inventory(event_id, {"bench": stock})
+        await run_engine("Redis", inventory, event_id, stock, concurrency)
+        await run_engine("MongoDB", MongoInventory(), event_id, stock, concurrency)
+    finally:
+        await inventory.delete_inventory(event_id, ["bench"])
+        await collection.delete_one({"_id": inserted.inserted_id})
+        await redis_client.disconnect()
+
+
+if __name__ == "__main__":
+    import sys
+
+    stock = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(benchmark(stock, concurrency))
@@ -1,5 +1,10 @@
 #!/usr/bin/env python3
-"""Check if Redis inventory is in sync with database."""
+"""Check if Redis inventory is in sync with database.
+
+Usage:
+    python scripts/check_inventory_sync.py <event_id>
+    python scripts/check_inventory_sync.py --all [--repair]
+"""
 
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
@@ -7,6 +12,11 @@ from beanie import init_beanie
 
 from api_app.api.core.config import settings
 from api_app.api.core.redis import RedisClient
+from api_app.api.core.redis_lock import TicketInventory
+from api_app.repositories import UserTicketRepository
+from api_app.services.inventory_reconciliation_service import (
+    InventoryReconciliationService,
+)
 from api_app import models
 
 
@@ -37,31 +47,30 @@ async def check_inventory_sync(event_id: str):
     print("=" * 80)
 
     has_mismatch = False
+    inventory = TicketInventory(redis)
+    availability = await inventory.get_event_availability(event_id)
+    held = await inventory.get_held_quantities(event_ids={event_id})
+    booked = await UserTicketRepository().aggregate_booked_quantities([event_id])
 
     for ticket_type in event.ticket_types:
-        redis_key = f"inventory:event:{event_id}:ticket:{ticket_type.ticket_id}"
-        redis_value = await redis.get(redis_key)
-
         db_remaining = ticket_type.remaining
-        redis_remaining = int(redis_value) if redis_value else None
+        redis_remaining = availability.get(ticket_type.ticket_id)
+        held_tickets = held.get((event_id, ticket_type.ticket_id), 0)
+        expected_redis = max(db_remaining - held_tickets, 0)
 
-        status = "✅" if redis_remaining == db_remaining else "❌"
+        status = "✅" if redis_remaining == expected_redis else "❌"
 
-        if redis_remaining != db_remaining:
+        if redis_remaining != expected_redis:
             has_mismatch = True
 
         print(f"\n{status} {ticket_type.name} ({ticket_type.ticket_id})")
         print(f"   DB:    {db_remaining} tickets")
+        print(f"   Held:  {held_tickets} tickets")
         print(f"   Redis: {redis_remaining} tickets")
-        print(f"   Diff:  {(redis_remaining or 0) - db_remaining}")
+        print(f"   Diff:  {(redis_remaining or 0) - expected_redis}")
 
         # Check bookings
-        bookings = await models.UserTicket.find(
-            models.UserTicket.event.id == event.id,
-            models.UserTicket.ticket_type_id == ticket_type.ticket_id,
-        ).to_list()
-
-        total_booked = sum(b.quantity for b in bookings)
+        total_booked = booked.get((event_id, ticket_type.ticket_id), 0)
         expected_remaining = ticket_type.total - total_booked
 
         print(f"   Total: {ticket_type.total}")
@@ -83,12 +92,65 @@ async def check_inventory_sync(event_id: str):
     await redis_client.disconnect()
 
 
+async def check_all_inventory(repair: bool):
+    """Check every event at once with the bulk reconciliation."""
+
+    # The reconciliation reads through the app's client (snapshot sessions)
+    if not settings.DATABASE_URI:
+        settings.DATABASE_URI = (
+            f"mongodb://{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+        )
+    await models.init_beanie(settings)
+    print(f"✅ Connected to MongoDB")
+
+    redis_client = RedisClient()
+    redis = await redis_client.connect()
+    print(f"✅ Connected to Redis\n")
+
+    report = await InventoryReconciliationService(redis).reconcile(repair=repair)
+    if report["skipped"]:
+        print("⏳ Another repairing run is in progress, try again later")
+        await redis_client.disconnect()
+        return
+
+    print("=" * 80)
+    for drift in report["drift"]:
+        print(f"\n❌ {drift['event_name']} ({drift['event_id']}) {drift['ticket_type_id']}")
+        print(f"   Total: {drift['total']}  Booked: {drift['booked']}  Held: {drift['held']}")
+        print(f"   DB:    {drift['db_remaining']} (drift {drift['mongo_drift']})")
+        print(f"   Redis: {drift['redis_remaining']} (drift {drift['redis_drift']})")
+
+    print("\n" + "=" * 80)
+    print(
+        f"📊 Events: {report['events_checked']}, "
+        f"ticket types: {report['ticket_types_checked']}, "
+        f"drift: {len(report['drift'])}, {report['elapsed_seconds']}s"
+    )
+    if repair:
+        print(
+            f"🔧 Repaired: {report['mongo_repaired']} in DB, "
+            f"{report['redis_repaired']} in Redis, "
+            f"{report['redis_initialized']} initialized"
+        )
+    elif report["drift"]:
+        print("\nTo fix, run:")
+        print("   python scripts/check_inventory_sync.py --all --repair")
+    else:
+        print("✅ Redis and DB are in sync!")
+
+    await redis_client.disconnect()
+
+
 if __name__ == "__main__":
     import sys
 
     if len(sys.argv) < 2:
         print("Usage: python scripts/check_inventory_sync.py <event_id>")
+        print("       python scripts/check_inventory_sync.py --all [--repair]")
         sys.exit(1)
 
-    event_id = sys.argv[1]
-    asyncio.run(check_inventory_sync(event_id))
+    if sys.argv[1] == "--all":
+        asyncio.run(check_all_inventory(repair="--repair" in sys.argv[2:]))
+    else:
+        event_id = sys.argv[1]
+        asyncio.run(check_inventory_sync(event_id))
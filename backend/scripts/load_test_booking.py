@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""Load-test /tickets/book and check that no ticket was oversold.
+
+Creates a throwaway event and `--users` users, then has every user book
+`--quantity` tickets at once (at most `--concurrency` requests in flight)
+through the real API routes, served in-process. Reports throughput and
+latency percentiles, then checks for the event's ticket type that
+
+    tickets sold + remaining == total
+
+in MongoDB (user tickets and the event document) and in Redis (the
+inventory counters), that every 200 response has its ticket, and that
+no request failed with a server error. The exit code is 1 if a check
+fails. The event, users and everything they
+wrote are removed afterwards unless `--keep` is given.
+
+Needs a MongoDB replica set (bookings run in transactions). Redis is the
+configured one, or an in-process fakeredis with `--fake-redis` (a dev
+dependency).
+
+Usage:
+    python scripts/load_test_booking.py [--users 2000] [--stock 1000]
+        [--quantity 1] [--concurrency 200] [--fake-redis] [--keep]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from beanie import init_beanie
+
+from api_app import models, schemas
+from api_app.api import create_app, routers
+from api_app.api.core.app_settings import get_app_settings
+from api_app.api.core.config import settings
+from api_app.api.core.redis import redis_client
+from api_app.api.core.redis_lock import LOG_INDEX_KEY, TicketInventory
+from api_app.api.core.redis_scripts import scripts
+from api_app.api.core.security import jwt_handler
+from api_app.repositories import UserTicketRepository
+from api_app.services import EventService
+
+TICKET_PRICE = 100
+
+
+async def call(app, method: str, path: str, headers: dict, body: bytes):
+    """Send one request straight to the ASGI app; returns (status, body)."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 0),
+        "server": ("loadtest", 80),
+    }
+    request = [{"type": "http.request", "body": body, "more_body": False}]
+    status = 0
+    chunks = []
+
+    async def receive():
+        if request:
+            return request.pop()
+        # The client never disconnects
+        await asyncio.get_running_loop().create_future()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # Unhandled errors are re-raised after the 500 went out; count them
+        # like any other response instead of aborting the run
+        if not status:
+            raise
+    return status, b"".join(chunks)
+
+
+def percentile(values: list[float], p: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def create_users(count: int, credit: int) -> list[models.User]:
+    run = uuid.uuid4().hex[:8]
+    users = [
+        models.User(
+            email=f"loadtest-{run}-{i}@example.com",
+            username=f"loadtest-{run}-{i}",
+            first_name="Load",
+            last_name=f"Test {i}",
+            status="active",
+            credit=credit,
+            roles=["user"],
+            password="!",
+        )
+        for i in range(count)
+    ]
+    await models.User.insert_many(users)
+    return await models.User.find(
+        {"username": {"$regex": f"^loadtest-{run}-"}}
+    ).to_list()
+
+
+async def run_load(app, path: str, event_id: str, ticket_type_id: str, users, args):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies = []
+    statuses = Counter()
+    booked_ids = []
+    body = json.dumps(
+        {
+            "event_id": event_id,
+            "ticket_type_id": ticket_type_id,
+            "quantity": args.quantity,
+        }
+    ).encode()
+
+    async def book(user):
+        token = jwt_handler.create_access_token({"sub": str(user.id)})
+        headers = {
+            "authorization": f"Bearer {token}",
+            "content-type": "application/json",
+            "user-agent": "eventsquare-loadtest",
+        }
+        async with semaphore:
+            started = time.perf_counter()
+            status, response = await call(app, "POST", path, headers, body)
+            latencies.append((time.perf_counter() - started) * 1000)
+        statuses[status] += 1
+        if status == 200:
+            booked_ids.append(json.loads(response)["booking_details"]["ticket_id"])
+
+    started = time.perf_counter()
+    await asyncio.gather(*[book(user) for user in users])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"\n📊 {len(users)} bookings of {args.quantity} ticket(s)")
+    print(f"   Elapsed:    {elapsed:.2f}s")
+    print(f"   Throughput: {len(latencies) / elapsed:.0f} requests/s")
+    print(
+        f"   Latency:    p50 {statistics.median(latencies):.1f}ms, "
+        f"p95 {percentile(latencies, 0.95):.1f}ms, "
+        f"p99 {percentile(latencies, 0.99):.1f}ms, "
+        f"max {latencies[-1]:.1f}ms"
+    )
+    print(f"   Responses:  {dict(sorted(statuses.items()))}")
+    return booked_ids, statuses
+
+
+async def check_invariants(
+    redis,
+    event_id: str,
+    ticket_type_id: str,
+    total: int,
+    booked_ids: list[str],
+    statuses: Counter,
+) -> list[str]:
+    """Print each check; returns the names of the failed ones."""
+    failures = []
+    event = await models.Event.get(event_id)
+    [ticket_type] = [t for t in event.ticket_types if t.ticket_id == ticket_type_id]
+    sold = (await UserTicketRepository().aggregate_booked_quantities([event_id])).get(
+        (event_id, ticket_type_id), 0
+    )
+    tickets = await models.UserTicket.find(
+        {"event.$id": event.id, "ticket_type_id": ticket_type_id}
+    ).to_list()
+    availability = await TicketInventory(redis).get_event_availability(event_id)
+    redis_remaining = availability.get(ticket_type_id)
+
+    checks = [
+        (
+            "MongoDB sold + remaining == total",
+            sold + ticket_type.remaining == total,
+            f"{sold} + {ticket_type.remaining} vs {total}",
+        ),
+        (
+            "Redis sold + remaining == total",
+            redis_remaining is not None and sold + redis_remaining == total,
+            f"{sold} + {redis_remaining} vs {total}",
+        ),
+        (
+            "Every 200 response has its ticket",
+            {str(ticket.id) for ticket in tickets} == set(booked_ids),
+            f"{len(booked_ids)} responses, {len(tickets)} tickets",
+        ),
+        (
+            "No server errors",
+            not any(status >= 500 for status in statuses),
+            f"{sum(n for status, n in statuses.items() if status >= 500)} responses",
+        ),
+    ]
+
+    print("\n🔍 Invariants")
+    for name, ok, detail in checks:
+        print(f"   {'✅' if ok else '❌'} {name} ({detail})")
+        if not ok:
+            failures.append(name)
+    return failures
+
+
+async def main(args) -> bool:
+    mongo_url = settings.DATABASE_URI or (
+        f"mongodb://{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+    )
+    client = AsyncIOMotorClient(mongo_url)
+    await init_beanie(
+        database=client[settings.DB_NAME],
+        document_models=await models.gather_documents(),
+    )
+    # Bookings run their transactions on the app's client
+    models.beanie_client.client = client
+    print("✅ Connected to MongoDB")
+
+    if args.fake_redis:
+        import fakeredis
+
+        redis_client._redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await scripts.load_all(redis_client._redis)
+        print("✅ Using in-process fakeredis")
+    else:
+        await redis_client.connect()
+        print("✅ Connected to Redis")
+    redis = await redis_client.get_client()
+
+    app = create_app()
+    app_settings = get_app_settings()
+    await routers.init_router(app, settings=app_settings)
+    path = f"{app_settings.API_PREFIX}/v1/tickets/book"
+
+    now = datetime.utcnow()
+    event_service = EventService()
+    event = await event_service.create_event(
+        schemas.EventCreate(
+            name=f"loadtest-{uuid.uuid4().hex[:8]}",
+            description="Load test",
+            event_type="loadtest",
+            ticket_types=[
+                schemas.TicketTypeInput(
+                    name="Load test",
+                    total=args.stock,
+                    price=TICKET_PRICE,
+                    remaining=args.stock,
+                )
+            ],
+            start_date=now + timedelta(days=1),
+            end_date=now + timedelta(days=2),
+            booking_start_date=now - timedelta(hours=1),
+            booking_end_date=now + timedelta(hours=1),
+        ),
+        redis=redis,
+    )
+    event_id = str(event.id)
+    ticket_type_id = event.ticket_types[0].ticket_id
+
+    users = await create_users(args.users, credit=TICKET_PRICE * args.quantity)
+    print(
+        f"   Event {event_id}: stock {args.stock}; "
+        f"{len(users)} users, concurrency {args.concurrency}"
+    )
+
+    try:
+        booked_ids, statuses = await run_load(
+            app, path, event_id, ticket_type_id, users, args
+        )
+        failures = await check_invariants(
+            redis, event_id, ticket_type_id, args.stock, booked_ids, statuses
+        )
+    finally:
+        if not args.keep:
+            user_ids = [user.id for user in users]
+            await models.UserTicket.find({"event.$id": event.id}).delete()
+            await models.CreditLedgerEntry.find({"user_id": {"$in": user_ids}}).delete()
+            await models.CreditSnapshot.find({"user_id": {"$in": user_ids}}).delete()
+            await models.OutboxMessage.find({"payload.event_id": event_id}).delete()
+            await models.User.find({"_id": {"$in": user_ids}}).delete()
+            await event_service.delete_event(event_id, redis=redis)
+            # The change log outlives the event until it is copied to MongoDB
+            inventory = TicketInventory(redis)
+            await redis.delete(inventory._get_log_key(event_id))
+            await redis.srem(LOG_INDEX_KEY, event_id)
+            await models.InventoryLogEntry.find({"event_id": event_id}).delete()
+        await redis_client.disconnect()
+
+    print(f"\n{'✅ No oversell' if not failures else '❌ Invariants failed'}")
+    return not failures
+
+
+if __name__ == "__main__":
+    import sys
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--stock", type=int, default=1000)
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--fake-redis", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="Keep the test data")
+    sys.exit(0 if asyncio.run(main(parser.parse_args())) else 1)
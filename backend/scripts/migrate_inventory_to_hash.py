@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""Move per-ticket-type inventory string keys into per-event Redis hashes."""
+
+import asyncio
+
+from api_app.api.core.redis import RedisClient
+from api_app.api.core.redis_lock import TicketInventory
+
+
+async def migrate_inventory(batch_size: int):
+    """Fold every legacy inventory key into its event hash."""
+
+    redis_client = RedisClient()
+    redis = await redis_client.connect()
+    print(f"✅ Connected to Redis\n")
+
+    migrated = await TicketInventory(redis).migrate_legacy_inventory(batch_size)
+
+    if migrated:
+        print(f"✅ Migrated {migrated} legacy inventory keys")
+    else:
+        print("✅ No legacy inventory keys found")
+
+    await redis_client.disconnect()
+
+
+if __name__ == "__main__":
+    import sys
+
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    asyncio.run(migrate_inventory(batch_size))
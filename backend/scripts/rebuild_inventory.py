@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Rebuild an event's Redis stock from its inventory change log.
+
+Replays every logged counter change of the event (copied to MongoDB, plus
+what is still in the Redis stream), compares the result with the live
+counters and lists log entries that do not follow from the previous one,
+i.e. counter writes that bypassed the log. With `--apply` the rebuilt
+counters are written to Redis when they differ.
+
+Usage:
+    python scripts/rebuild_inventory.py <event_id> [--apply]
+"""
+
+import asyncio
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from beanie import init_beanie
+
+from api_app.api.core.config import settings
+from api_app.api.core.redis import RedisClient
+from api_app.services.inventory_log_service import InventoryLogService
+from api_app import models
+
+
+async def rebuild_inventory(event_id: str, apply: bool) -> bool:
+    mongo_url = settings.DATABASE_URI or (
+        f"mongodb://{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+    )
+    client = AsyncIOMotorClient(mongo_url)
+    await init_beanie(
+        database=client[settings.DB_NAME],
+        document_models=[models.Event, models.InventoryLogEntry],
+    )
+    print("✅ Connected to MongoDB")
+
+    redis_client = RedisClient()
+    redis = await redis_client.connect()
+    print("✅ Connected to Redis\n")
+
+    try:
+        report = await InventoryLogService(redis).rebuild(event_id, apply=apply)
+    finally:
+        await redis_client.disconnect()
+
+    print(f"📊 Event {event_id}: {report['entries']} log entries")
+    print("=" * 80)
+    for ticket_type_id in sorted(set(report["remaining"]) | set(report["live"])):
+        logged = report["remaining"].get(ticket_type_id)
+        live = report["live"].get(ticket_type_id)
+        print(f"{'✅' if logged == live else '❌'} {ticket_type_id}: log {logged}, Redis {live}")
+
+    if report["mismatches"]:
+        print(f"\n⚠️  {len(report['mismatches'])} entries do not add up:")
+        for mismatch in report["mismatches"]:
+            at = datetime.fromtimestamp(mismatch["entry_ms"] / 1000)
+            print(
+                f"   {at:%Y-%m-%d %H:%M:%S} {mismatch['entry_id']} "
+                f"{mismatch['op']} {mismatch['ticket_type_id']} "
+                f"{mismatch['delta']:+d} by {mismatch['by'] or '-'}: "
+                f"expected {mismatch['expected']}, logged {mismatch['total']}"
+            )
+
+    print("\n" + "=" * 80)
+    if report["applied"]:
+        print("🔧 Redis counters rebuilt from the log")
+    elif report["drift"]:
+        print("❌ Redis differs from the log. To rebuild it, run:")
+        print(f"   python scripts/rebuild_inventory.py {event_id} --apply")
+    else:
+        print("✅ Redis matches the log")
+    return not report["drift"] or report["applied"]
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1].startswith("-"):
+        print("Usage: python scripts/rebuild_inventory.py <event_id> [--apply]")
+        sys.exit(1)
+
+    ok = asyncio.run(rebuild_inventory(sys.argv[1], apply="--apply" in sys.argv[2:]))
+    sys.exit(0 if ok else 1)
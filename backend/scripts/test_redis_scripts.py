@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""Run every registered Redis Lua script against a local Redis.
+
+Each script gets a small scenario on throwaway keys (prefixed with
+`script-test:<random>:`, removed afterwards). The run fails if a script
+errors, returns something unexpected, or has no scenario here yet, so add
+one whenever a script is registered.
+
+It also flushes the server's script cache once to check that calls reload
+their script after NOSCRIPT, and checks that a sync from the database
+leaves live holds taken. Use a local or staging Redis.
+
+Usage:
+    python scripts/test_redis_scripts.py [redis_url]
+"""
+
+import asyncio
+import json
+import time
+import uuid
+
+import redis.asyncio as aioredis
+
+from api_app.api.core.config import settings
+from api_app.api.core.redis_scripts import scripts
+from api_app.api.core import idempotency, redis_lock as rl, waiting_room
+
+
+async def check_lock_acquire(redis, p):
+    keys = [f"{p}lock", f"{p}lock:fence"]
+    assert await rl.ACQUIRE_SCRIPT(redis, keys, ["a", 5000]) == 1
+    held = await rl.ACQUIRE_SCRIPT(redis, keys, ["b", 5000])
+    assert -5000 <= held < 0, held
+    await redis.delete(keys[0])
+    assert await rl.ACQUIRE_SCRIPT(redis, keys, ["b", 5000]) == 2
+
+
+async def check_lock_release(redis, p):
+    keys = [f"{p}lock", f"{p}lock:wake"]
+    await redis.set(keys[0], "a")
+    assert await rl.RELEASE_LOCK_SCRIPT(redis, keys, ["b", 5000]) == 0
+    assert await rl.RELEASE_LOCK_SCRIPT(redis, keys, ["a", 5000]) == 1
+    assert not await redis.exists(keys[0])
+    assert await redis.lrange(keys[1], 0, -1) == ["1"]
+
+
+async def log_entries(redis, key):
+    return [entry for _, entry in await redis.xrange(key)]
+
+
+async def check_reserve(redis, p):
+    meta, usage, log, event = f"{p}meta", f"{p}usage", f"{p}log", f"{p}event"
+    keys = [meta, usage, log, event]
+    now = int(time.time() * 1000)
+    await redis.hset(event, "vip", 5)
+    # Events without a booking record are not checked
+    assert await rl.RESERVE_SCRIPT(redis, keys, [now, "u1", 4, "vip"]) == [1, 1]
+    assert await rl.RESERVE_SCRIPT(redis, keys, [now, "u1", 2, "vip"]) == [0, 1, 1]
+    assert await rl.RESERVE_SCRIPT(redis, keys, [now, "u1", 1, "none"]) == [-1, 1, 0]
+    assert not await redis.exists(usage)
+    # Only the successful reservation is logged
+    assert await log_entries(redis, log) == [
+        {"op": "reserve", "t": "vip", "d": "-4", "r": "1", "by": "u1"}
+    ]
+
+    await redis.hset(meta, mapping={"opens": now, "closes": now + 1000, "type:vip": 1})
+    assert await rl.RESERVE_SCRIPT(redis, keys, [now - 1, "u1", 1, "vip"]) == [-3, 1, 0]
+    assert await rl.RESERVE_SCRIPT(redis, keys, [now + 1001, "u1", 1, "vip"]) == [-4, 1, 0]
+    assert await rl.RESERVE_SCRIPT(redis, keys, [now, "u1", 1, "none"]) == [-5, 1, 0]
+    assert await rl.RESERVE_SCRIPT(redis, keys, [now, "u1", 1, "vip"]) == [1, 0]
+    assert await redis.hgetall(usage) == {"total": "1", "vip": "1"}
+    assert await redis.pttl(usage) > 0
+
+    # Purchase caps count past purchases and earlier runs of the same call
+    await redis.hset(event, mapping={"vip": 5, "ga": 5})
+    await redis.hset(meta, mapping={"type:ga": 1, "user_cap": 4, "cap:vip": 2})
+    assert await rl.RESERVE_SCRIPT(redis, keys, [now, "u1", 2, "vip"]) == [-8, 1, 1]
+    args = [now, "u1", 1, "vip", 3, "ga"]
+    assert await rl.RESERVE_SCRIPT(redis, keys * 2, args) == [-8, 2, 2]
+    args = [now, "u1", 1, "vip", 2, "ga"]
+    assert await rl.RESERVE_SCRIPT(redis, keys * 2, args) == [1, 4, 3]
+    assert await redis.hgetall(usage) == {"total": "4", "vip": "2", "ga": "2"}
+    assert await redis.xlen(log) == 4
+
+
+async def check_release(redis, p):
+    usage, nobody, log, event = f"{p}usage", f"{p}nobody", f"{p}log", f"{p}event"
+    keys = [usage, log, event, nobody, log, event]
+    await redis.hset(event, "vip", 1)
+    await redis.hset(usage, mapping={"total": 3, "vip": 1})
+    args = ["refund", "u1", 2, "vip", 1, "none"]
+    assert await rl.RELEASE_SCRIPT(redis, keys, args) == [3, -1]
+    # Purchase counters never go below zero and are never created
+    assert await redis.hgetall(usage) == {"total": "1", "vip": "0"}
+    assert not await redis.exists(nobody)
+    assert await log_entries(redis, log) == [
+        {"op": "refund", "t": "vip", "d": "2", "r": "3", "by": "u1"}
+    ]
+
+
+async def check_adjust(redis, p):
+    log, event = f"{p}log", f"{p}event"
+    await redis.hset(event, mapping={"vip": 3, "ga": 1, "vvip": 2})
+    args = ["reconcile", -5, "vip", 4, "ga", 1, "none", 0, "vvip"]
+    result = await rl.ADJUST_SCRIPT(redis, [log, event] * 4, args)
+    assert result == [0, 5, -1, 2], result
+    # The applied delta is logged, not the requested one
+    assert await log_entries(redis, log) == [
+        {"op": "reconcile", "t": "vip", "d": "-3", "r": "0", "by": ""},
+        {"op": "reconcile", "t": "ga", "d": "4", "r": "5", "by": ""},
+    ]
+
+
+async def check_init(redis, p):
+    log, event = f"{p}log", f"{p}event"
+    await redis.hset(event, "ga", 4)
+    async with redis.pubsub() as pubsub:
+        await pubsub.subscribe(log)
+        result = await rl.INIT_SCRIPT(redis, [log, event], ["vip", 5, "ga", 2])
+        messages = [await pubsub.get_message(timeout=1) for _ in range(3)]
+    assert result == [1, 0], result
+    assert await redis.hgetall(event) == {"vip": "5", "ga": "4"}
+    assert await log_entries(redis, log) == [{"op": "set", "t": "vip", "r": "5", "by": ""}]
+    # Every logged change is published for the availability feed
+    published = [m["data"] for m in messages if m and m["type"] == "message"]
+    assert published == ["vip 5"], messages
+
+
+async def check_hold_create(redis, p):
+    keys = [f"{p}holds", f"{p}hold:h1", f"{p}meta", f"{p}usage", f"{p}log", f"{p}event"]
+    await redis.hset(keys[5], "vip", 2)
+    now = int(time.time() * 1000)
+    expires = now + 60_000
+    record = json.dumps({"user_id": "u1"})
+    args = ["h1", expires, record, 60, now, "u1", 2, "vip"]
+    assert await rl.HOLD_SCRIPT(redis, keys, args) == [1, 0]
+    assert await redis.zscore(keys[0], "h1") == expires
+    args = ["h2", expires, record, 60, now, "u1", 1, "vip"]
+    assert await rl.HOLD_SCRIPT(redis, keys, args) == [0, 1, 0]
+    await redis.hset(keys[2], mapping={"opens": now + 1, "closes": now + 2})
+    args = ["h3", expires, record, 60, now, "u1", 1, "vip"]
+    assert await rl.HOLD_SCRIPT(redis, keys, args) == [-3, 1, 0]
+    assert await log_entries(redis, keys[4]) == [
+        {"op": "hold", "t": "vip", "d": "-2", "r": "0", "by": "u1"}
+    ]
+
+
+async def check_hold_confirm(redis, p):
+    keys = [f"{p}holds", f"{p}hold:h1"]
+    now = int(time.time() * 1000)
+    await redis.zadd(keys[0], {"h1": now + 60_000})
+    await redis.set(keys[1], json.dumps({"user_id": "u1"}))
+    assert await rl.CONFIRM_HOLD_SCRIPT(redis, keys, ["h1", now, "u2"]) == [-2]
+    code, record = await rl.CONFIRM_HOLD_SCRIPT(redis, keys, ["h1", now, "u1"])
+    assert code == 1 and json.loads(record)["user_id"] == "u1"
+    assert await rl.CONFIRM_HOLD_SCRIPT(redis, keys, ["h1", now, "u1"]) == [-1]
+
+
+async def check_holds_release(redis, p):
+    holds, usage, log, event = f"{p}holds", f"{p}usage", f"{p}log", f"{p}event"
+    keys = [holds, f"{p}hold:h1", usage, log, event, f"{p}hold:h2", usage, log, event]
+    await redis.zadd(holds, {"h1": 1})
+    await redis.set(keys[1], "{}")
+    await redis.hset(event, "vip", 0)
+    await redis.hset(usage, mapping={"total": 7, "vip": 2})
+    args = ["hold_expired", "h1", "u1", 1, 2, "vip", "h2", "u1", 1, 5, "vip"]
+    assert await rl.RELEASE_HOLDS_SCRIPT(redis, keys, args) == ["h1"]
+    assert await redis.hget(event, "vip") == "2"
+    assert await redis.hgetall(usage) == {"total": "5", "vip": "0"}
+    assert not await redis.exists(keys[1])
+    assert await log_entries(redis, log) == [
+        {"op": "hold_expired", "t": "vip", "d": "2", "r": "2", "by": "u1"}
+    ]
+
+
+async def check_migrate(redis, p):
+    keys = [f"{p}legacy:a", f"{p}event", f"{p}legacy:b", f"{p}event"]
+    await redis.set(keys[0], 7)
+    await redis.set(keys[2], 9)
+    await redis.hset(keys[1], "b", 1)
+    assert await rl.MIGRATE_SCRIPT(redis, keys, ["a", "b"]) == 2
+    assert await redis.hgetall(keys[1]) == {"a": "7", "b": "1"}
+
+
+async def check_seats_init(redis, p):
+    keys = [f"{p}seats"]
+    assert await rl.SEAT_INIT_SCRIPT(redis, keys, [20, 3]) == 1
+    assert await rl.SEAT_INIT_SCRIPT(redis, keys, [20]) == 0
+    assert await redis.getbit(keys[0], 3) == 1
+    assert await redis.bitcount(keys[0]) == 1
+
+
+async def check_seats_claim(redis, p):
+    seats, meta, log, event = f"{p}seats", f"{p}meta", f"{p}log", f"{p}event"
+    keys = [seats, meta, f"{p}usage", log, event]
+    now = int(time.time() * 1000)
+    args = [now, "u1", 1, 0, 1, "vip"]
+    assert await rl.SEAT_CLAIM_SCRIPT(redis, keys, args) == [-7, 1, 0]
+    await rl.SEAT_INIT_SCRIPT(redis, [seats], [10, 2])
+    await redis.hset(event, "vip", 9)
+    args = [now, "u1", 2, 1, 2, 2, "vip"]
+    assert await rl.SEAT_CLAIM_SCRIPT(redis, keys, args) == [-6, 1, 0, 2]
+    args = [now, "u1", 2, 0, 1, 2, "vip"]
+    assert await rl.SEAT_CLAIM_SCRIPT(redis, keys, args) == [1, 7]
+    assert await redis.bitcount(seats) == 3
+    await redis.hset(meta, mapping={"opens": now + 1, "closes": now + 2, "type:vip": 1})
+    args = [now, "u1", 1, 5, 1, "vip"]
+    assert await rl.SEAT_CLAIM_SCRIPT(redis, keys, args) == [-3, 1, 0]
+    assert await redis.getbit(seats, 5) == 0
+    assert await log_entries(redis, log) == [
+        {"op": "seat", "t": "vip", "d": "-2", "r": "7", "by": "u1"}
+    ]
+
+
+async def check_seats_release(redis, p):
+    keys = [f"{p}seats", f"{p}usage", f"{p}log", f"{p}event"]
+    await rl.SEAT_INIT_SCRIPT(redis, keys[:1], [10, 1, 4])
+    await redis.hset(keys[1], mapping={"total": 3, "vip": 3})
+    await redis.hset(keys[3], "vip", 8)
+    args = ["cancelled", "u1", 3, 1, 4, 5, "vip"]
+    assert await rl.SEAT_RELEASE_SCRIPT(redis, keys, args) == [2, 10]
+    assert await redis.hgetall(keys[1]) == {"total": "1", "vip": "1"}
+    args = ["cancelled", "u1", 1, 1, "vip"]
+    assert await rl.SEAT_RELEASE_SCRIPT(redis, keys, args) == [0, 10]
+    args = ["cancelled", "u1", 0, "none"]
+    assert await rl.SEAT_RELEASE_SCRIPT(redis, keys, args) == [0, -1]
+    # Seats that were already free are not logged
+    assert await log_entries(redis, keys[2]) == [
+        {"op": "cancelled", "t": "vip", "d": "2", "r": "10", "by": "u1"}
+    ]
+
+
+async def check_idempotency_discard(redis, p):
+    keys = [f"{p}idempotency"]
+    await redis.set(keys[0], json.dumps({"state": "pending", "token": "t1"}))
+    assert await idempotency.DISCARD_SCRIPT(redis, keys, ["t2"]) == 0
+    assert await idempotency.DISCARD_SCRIPT(redis, keys, ["t1"]) == 1
+
+
+async def check_waitroom_advance(redis, p):
+    keys = [f"{p}state", f"{p}queue"]
+    advance = waiting_room.ADVANCE_SCRIPT
+    now = 1_000_000
+    # An idle room admits the first buyer at once, the rest at 2 per second
+    assert await advance(redis, keys, ["u1", now, 2, "1", 60]) == [1, 1]
+    assert await advance(redis, keys, ["u2", now, 2, "1", 60]) == [2, 1]
+    assert await advance(redis, keys, ["u3", now, 2, "1", 60]) == [3, 1]
+    assert await advance(redis, keys, ["u2", now, 2, "1", 60]) == [2, 1]
+    assert await advance(redis, keys, ["u3", now + 500, 2, "0", 60]) == [3, 2]
+    assert await advance(redis, keys, ["u4", now + 5000, 2, "0", 60]) == [0, 3]
+
+
+CASES = {
+    "lock.acquire": check_lock_acquire,
+    "lock.release": check_lock_release,
+    "inventory.reserve": check_reserve,
+    "inventory.release": check_release,
+    "inventory.adjust": check_adjust,
+    "inventory.init": check_init,
+    "inventory.migrate_legacy": check_migrate,
+    "holds.create": check_hold_create,
+    "holds.confirm": check_hold_confirm,
+    "holds.release": check_holds_release,
+    "seats.init": check_seats_init,
+    "seats.claim": check_seats_claim,
+    "seats.release": check_seats_release,
+    "idempotency.discard": check_idempotency_discard,
+    "waitroom.advance": check_waitroom_advance,
+}
+
+
+async def check_sync_keeps_holds(redis, event_id):
+    inventory = rl.TicketInventory(redis)
+    await inventory.initialize_event_inventory(event_id, {"vip": 5})
+    hold = await inventory.create_hold([(event_id, "vip", 2)], "u1", ttl=60)
+    assert hold["success"], hold
+    try:
+        written = await inventory.sync_event_from_database(
+            event_id, {"vip": 5}, subtract_holds=True
+        )
+        assert written == {"vip": 3}, written
+        result = await inventory.reserve_tickets(event_id, "vip", 4, "u2")
+        assert not result["success"], result
+        confirmed = await inventory.confirm_hold(hold["hold_id"], "u1")
+        assert confirmed["status"] == "confirmed", confirmed
+        assert await inventory.get_available_tickets(event_id, "vip") == 3
+    finally:
+        await redis.zrem(rl.HOLDS_KEY, hold["hold_id"])
+        await redis.delete(
+            inventory._get_hold_key(hold["hold_id"]),
+            inventory._get_event_key(event_id),
+            inventory._get_usage_key(event_id, "u1"),
+            inventory._get_usage_key(event_id, "u2"),
+            inventory._get_log_key(event_id),
+        )
+        await redis.srem(rl.LOG_INDEX_KEY, event_id)
+
+
+async def run(redis_url: str) -> bool:
+    redis = aioredis.from_url(redis_url, decode_responses=True)
+    await redis.ping()
+    print(f"✅ Connected to Redis at {redis_url}")
+    print(f"   Registered scripts: {len(scripts)}\n")
+
+    prefix = f"script-test:{uuid.uuid4().hex[:8]}:"
+    failed = 0
+    try:
+        await scripts.load_all(redis)
+        for script in scripts:
+            case = CASES.get(script.name)
+            label = f"{script.name}@{script.version} ({script.sha[:8]})"
+            if case is None:
+                print(f"❌ {label}: no test scenario")
+                failed += 1
+                continue
+            try:
+                await case(redis, f"{prefix}{script.name}:")
+                print(f"✅ {label}")
+            except Exception as e:
+                print(f"❌ {label}: {type(e).__name__} {e}")
+                failed += 1
+
+        # A server that lost its script cache must not break callers
+        await redis.script_flush()
+        try:
+            await check_lock_acquire(redis, f"{prefix}noscript:")
+            print("✅ Reload after NOSCRIPT")
+        except Exception as e:
+            print(f"❌ Reload after NOSCRIPT: {type(e).__name__} {e}")
+            failed += 1
+
+        try:
+            await check_sync_keeps_holds(redis, f"{prefix}event")
+            print("✅ Sync from database keeps holds")
+        except Exception as e:
+            print(f"❌ Sync from database keeps holds: {type(e).__name__} {e}")
+            failed += 1
+    finally:
+        keys = [key async for key in redis.scan_iter(match=f"{prefix}*")]
+        if keys:
+            await redis.delete(*keys)
+        await redis.aclose()
+
+    print(f"\n{'✅' if not failed else '❌'} {len(scripts) - failed}/{len(scripts)} scripts passed")
+    return not failed
+
+
+if __name__ == "__main__":
+    import sys
+
+    redis_url = sys.argv[1] if len(sys.argv) > 1 else settings.REDIS_URL
+    sys.exit(0 if asyncio.run(run(redis_url)) else 1)